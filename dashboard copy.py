@@ -5,18 +5,23 @@ from streamlit_modal import Modal
 import streamlit.components.v1 as components
 from streamlit.components.v1 import html
 
+from simulador.carga import DECIMAL_PLANILHAS, assinatura_planilha, carregar_planilha
+from simulador.formatacao import formatar_moeda
+
 st.set_page_config(layout="wide",page_title="Prefeitura de Fortaleza", page_icon='./logo.png')
 
-def formatar_moeda(valor):
-    valor_formatado = f'{valor:,.2f}'
-    # Substitui o separador decimal por uma letra que não seja dígito
-    valor_formatado = valor_formatado.replace('.', 'X').replace(',', '.').replace('X', ',')
-    return f'R$ {valor_formatado}'
+PLANILHA = "folha_geral.xlsx"
+
+# Função para carregar os dados do Excel (a partir da cópia colunar, refeita quando a planilha muda).
+# A folha geral é convertida em blocos, sem carregar a planilha inteira; para não esperar a conversão
+# no dashboard, rode antes python -m simulador.carga folha_geral.xlsx folha_geral
+# recriar=True refaz a cópia
+def ler_planilha(recriar=False):
+    return carregar_planilha(PLANILHA, "folha_geral", recriar=recriar, em_blocos=True, decimal=DECIMAL_PLANILHAS)
 
-# Função para carregar os dados do Excel
 @st.cache_data
-def carregar_dados():
-    return pd.read_excel("folha_geral.xlsx", sheet_name="folha_geral", decimal=',')
+def carregar_dados(assinatura):
+    return ler_planilha()
 
 # Função para substituir o ponto pela vírgula nos valores do DataFrame
 @st.cache_data
@@ -52,10 +57,10 @@ def exibir_tabela_salarios(TC, TR, num_classes, num_referencias, salario_base, n
 @st.cache_data
 def contar_pessoas(df):
     # Contar pessoas por cargo, carga horária e referência
-    quantidade_pessoas = df.groupby(['Cargo', 'CH', 'Ref'])['VENCIMENTO BASE'].size().reset_index(name='Quantidade')
+    quantidade_pessoas = df.groupby(['Cargo', 'CH', 'Ref'], observed=True)['VENCIMENTO BASE'].size().reset_index(name='Quantidade')
     
     # Calcular o consolidado do VENCIMENTO BASE
-    consolidado_vencimento_base = df.groupby(['Cargo', 'CH', 'Ref'])['VENCIMENTO BASE'].sum().reset_index(name='Consolidado VENCIMENTO BASE')
+    consolidado_vencimento_base = df.groupby(['Cargo', 'CH', 'Ref'], observed=True)['VENCIMENTO BASE'].sum().reset_index(name='Consolidado VENCIMENTO BASE')
     
     # Concatenar o consolidado com a tabela de quantidade de pessoas
     quantidade_pessoas = pd.merge(quantidade_pessoas, consolidado_vencimento_base, on=['Cargo', 'CH', 'Ref'])
@@ -71,7 +76,7 @@ def tabela_novo_salario(df):
 @st.cache_data
 def calcular_impacto(df):
     # Agrupar por cargo e calcular a quantidade de funcionários, a remuneração anterior e a remuneração nova
-    resumo_cargos = df.groupby('Cargo').agg({'Nome': 'count', 'VENCIMENTO BASE': 'sum', 'Novo Salário': 'sum'}).reset_index()
+    resumo_cargos = df.groupby('Cargo', observed=True).agg({'Nome': 'count', 'VENCIMENTO BASE': 'sum', 'Novo Salário': 'sum'}).reset_index()
 
     # Calcular o impacto
     resumo_cargos['Impacto'] = resumo_cargos['Novo Salário'] - resumo_cargos['VENCIMENTO BASE']
@@ -122,7 +127,12 @@ def main():
     st.header(' :orange[Prefeitura de Fortaleza] ', divider='rainbow')
     
     # Carregar dados
-    df = carregar_dados()
+    # Refaz a cópia colunar da planilha quando solicitado, fora do cache, que é esvaziado e volta a
+    # ler a folha uma vez só
+    if st.sidebar.button('Atualizar dados da planilha'):
+        ler_planilha(recriar=True)
+        carregar_dados.clear()
+    df = carregar_dados(assinatura_planilha(PLANILHA))
 
     # Adicionando imagem centralizada acima do título da sidebar
     st.sidebar.image('logo.png', width=150, use_column_width=True)
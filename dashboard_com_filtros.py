@@ -1,23 +1,72 @@
+import os
 import streamlit as st
 import pandas as pd
+import numpy as np
 import plotly.express as px
 from streamlit_modal import Modal
 import streamlit.components.v1 as components
 from streamlit.components.v1 import html
 import matplotlib.pyplot as plt
 
-st.set_page_config(layout="wide",page_title="Prefeitura de Fortaleza", page_icon='./logo.png')
+from simulador.acervo import PASTA_ACERVO, assinatura_acervo, ler_acervo, particoes_acervo
+from simulador.cache_cenarios import CacheCenarios, chave_cenario
+from simulador.carga import DECIMAL_PLANILHAS, assinatura_planilha, carregar_planilha
+from simulador.cubo import CuboFolha
+from simulador.execucao import ExecucaoEmFundo
+from simulador.formatacao import estilo_moeda, formatar_moeda
+from simulador.incremental import AvaliadorIncremental
+from simulador.irpf import ANO_IRPF_PADRAO, TABELAS_IRPF
+from simulador.montecarlo import INCERTEZAS_PADRAO, simular_monte_carlo
+from simulador.orcamento import REAJUSTE_SALARIOS_BASE, resolver_orcamento
+from simulador.paginacao import TAMANHO_PAGINA_PADRAO, paginar_servidores
+from simulador.projecao import projetar
+from simulador.rubricas import precalcular_fixos
+from simulador.sensibilidade import analisar_sensibilidade
+from simulador.simulacao import CONFIGURACOES_REGIME, SALARIOS_BASE
+from simulador.tabelas import gerar_grade_salarios
+from simulador.taxas import sobrescritas_por_chave
 
-def formatar_moeda(valor):
-    valor_formatado = f'{valor:,.2f}'
-    # Substitui o separador decimal por uma letra que não seja dígito
-    valor_formatado = valor_formatado.replace('.', 'X').replace(',', '.').replace('X', ',')
-    return f'R$ {valor_formatado}'
+st.set_page_config(layout="wide",page_title="Prefeitura de Fortaleza", page_icon='./logo.png')
 
-# Função para carregar os dados do Excel
-@st.cache_data
-def carregar_dados():
-    return pd.read_excel("planilha_impacto_salarial.xlsx", sheet_name="amc", decimal=',')
+PLANILHA = "planilha_impacto_salarial.xlsx"
+
+# Totais e parâmetros oferecidos na meta de orçamento: rótulo e intervalo inicial de cada parâmetro livre
+METAS = {'Impacto anual': 'impacto_anual', 'Impacto mensal': 'impacto_mensal',
+         'Impacto líquido anual': 'impacto_liquido_anual', 'Impacto líquido mensal': 'impacto_liquido_mensal'}
+PARAMETROS_LIVRES = {'Taxa de Classe (%)': ('TC', 0.0, 20.0), 'Taxa de Referência (%)': ('TR', 0.0, 20.0),
+                     'Reajuste dos salários-base (%)': (REAJUSTE_SALARIOS_BASE, 0.0, 30.0)}
+
+# Lê a aba 'amc' da planilha pela cópia colunar; recriar=True refaz a cópia
+def ler_planilha(recriar=False):
+    return carregar_planilha(PLANILHA, "amc", recriar=recriar, decimal=DECIMAL_PLANILHAS)
+
+# Função para carregar os dados do Excel (a partir da cópia colunar, refeita quando a planilha muda)
+# junto com as partes das rubricas que não dependem de nenhum parâmetro. A folha é uma só,
+# compartilhada entre as sessões e nunca alterada: cada cenário grava as suas colunas em uma
+# camada à parte (ver simulador.cenario), sem copiar a folha a cada execução do script
+@st.cache_resource
+def carregar_dados(assinatura):
+    return precalcular_fixos(ler_planilha(), 'amc')
+
+# Folha lida do acervo particionado (ver simulador.acervo): só as secretarias e meses escolhidos
+# (listas vazias leem todos), com as partes fixas das rubricas. A assinatura junta a versão do
+# acervo e a escolha, para servir de chave aos caches da folha, do cubo e dos cenários.
+@st.cache_resource
+def carregar_acervo(assinatura):
+    _, secretarias, meses = assinatura
+    return precalcular_fixos(ler_acervo(PASTA_ACERVO, list(secretarias) or None, list(meses) or None), 'amc')
+
+# Cubo de agregação da folha (ver simulador.cubo), montado uma vez por versão da planilha e
+# compartilhado entre as sessões, já que nenhum cenário o altera
+@st.cache_resource
+def carregar_cubo(assinatura, _df):
+    return CuboFolha(_df, 'amc')
+
+# Cache dos resultados de simulação, compartilhado entre as sessões: voltar a um cenário já visto
+# (ou pedir o mesmo cenário que outra sessão está calculando) não refaz o cálculo
+@st.cache_resource
+def cache_cenarios():
+    return CacheCenarios()
 
 # Função para substituir o ponto pela vírgula nos valores do DataFrame
 @st.cache_data
@@ -27,143 +76,16 @@ def substituir_ponto_por_virgula(df):
 # Função para criar e exibir a tabela de salários por classe e referência
 @st.cache_data
 def exibir_tabela_salarios(TC, TR, num_classes, num_referencias, salario_base, nome_tabela):
-    # Criando um DataFrame para armazenar os resultados
-    tabela = pd.DataFrame(index=range(1, num_referencias + 1), columns=range(1, num_classes + 1))
-    valores = {}  # Dicionário para armazenar os valores
-    # Preenchendo a tabela com os valores de salário
-    for j in range(1, num_classes + 1):
-        for i in range(1, num_referencias + 1):
-            if i == 1 and j == 1:
-                valor = salario_base
-            elif i == 1:
-                valor = float(tabela.loc[num_referencias, j - 1]) * (1+(TC/100))
-            else:
-                valor = float(tabela.loc[i - 1, j]) * (1+(TR/100))
+    # A tabela é numérica; as duas casas decimais são aplicadas só na exibição
+    tabela = pd.DataFrame(gerar_grade_salarios(TC, TR, num_classes, num_referencias, salario_base),
+                          index=range(1, num_referencias + 1), columns=range(1, num_classes + 1))
 
-            # Armazenando o valor no dicionário
-            valores[(i, j)] = valor, i + (j - 1) * num_referencias
-            tabela.loc[i, j] = f"{valor:.2f}"  # Atribuindo o índice da célula com duas casas decimais
-                        
     # Renomeando índices e colunas
     tabela.index.name = 'Referência'
     tabela.columns.name = 'Classe'
     
-    return tabela, valores
-
-@st.cache_data
-def contar_pessoas(df):
-    # Contar pessoas por cargo, carga horária e referência
-    quantidade_pessoas = df.groupby(['Cargo', 'CH', 'Ref'])['0996-TOT.PROVENTO'].size().reset_index(name='Quantidade')
-    
-    # Calcular o consolidado do VENCIMENTO BASE
-    consolidado_vencimento_base = df.groupby(['Cargo', 'CH', 'Ref'])['0996-TOT.PROVENTO'].sum().reset_index(name='Consolidado VENCIMENTO BASE')
-    
-    # Concatenar o consolidado com a tabela de quantidade de pessoas
-    quantidade_pessoas = pd.merge(quantidade_pessoas, consolidado_vencimento_base, on=['Cargo', 'CH', 'Ref'])
-
-    return quantidade_pessoas
-
-@st.cache_data
-def tabela_novo_salario(df):
-    # Contar pessoas por cargo, carga horária e referência
-    tabela_nome_novo_salario = df[['Nome','CH','Ref', '0996-TOT.PROVENTO', 'novo_0996-TOT.PROVENTO']]
-    return tabela_nome_novo_salario
-
-@st.cache_data
-def calcular_impacto(df):
-    # Agrupar por cargo e calcular a quantidade de funcionários, a remuneração anterior e a remuneração nova
-    resumo_cargos = df.groupby('Cargo').agg({'Nome': 'count', '0996-TOT.PROVENTO': 'sum', 'novo_0996-TOT.PROVENTO': 'sum'}).reset_index()
-
-    # Calcular o impacto
-    resumo_cargos['Impacto'] = resumo_cargos['novo_0996-TOT.PROVENTO'] - resumo_cargos['0996-TOT.PROVENTO']
-
-    # Renomear colunas
-    resumo_cargos.rename(columns={'Nome': 'Quantidade', '0996-TOT.PROVENTO': 'Remuneração Anterior', 'novo_0996-TOT.PROVENTO': 'Remuneração Nova'}, inplace=True)
-
-    return resumo_cargos
-
-def calcular_irpf(base_irpf):
-    if base_irpf > 4664.68:
-        return base_irpf * 0.275 - 869.36
-    elif base_irpf>3751.05:
-        return base_irpf *0.225-636.13
-    elif base_irpf>2826.65:
-        return base_irpf *0.15-354.8
-    elif base_irpf>1903.98:
-        return base_irpf*0.075-142.8
-    else:
-        return 0
-    
-def calcular_novo_salario(df, salario_base_b_180,salario_base_c_180,salario_base_d_180,salario_base_b_240,salario_base_c_240,salario_base_d_240, pular_indice=0):
-    novo_salario = []  
-    for indice_ref, ch, primeiro_caractere in zip(df['Ref'],df['CH'],df['primeiro_caractere']): 
-            indice_alvo = indice_ref #+ pular_indice
-            if ch == 180 and primeiro_caractere == 'B':
-                tabela = salario_base_b_180
-            elif ch == 180 and primeiro_caractere == 'C':
-                tabela = salario_base_c_180                
-            elif ch == 180 and primeiro_caractere == 'D':
-                tabela = salario_base_d_180     
-            elif ch == 240 and primeiro_caractere == 'B':
-                tabela = salario_base_b_240       
-            elif ch == 240 and primeiro_caractere == 'C':
-                tabela = salario_base_c_240       
-            elif ch == 240 and primeiro_caractere == 'D':
-                tabela = salario_base_d_240            
-            for chave, valor in tabela.items():
-                if indice_alvo == valor[1]:
-                    novo_salario.append(valor[0])
-                    break  #Encerrar o loop interno após encontrar a correspondência
-            else:
-                novo_salario.append(None)  # Adicionar None se não houver correspondência encontrada
-    return novo_salario
-
-def atualizar_ita(row, taxa):
-    if row['Grau de instrução'] == "Médio Profissionalizante":
-        return (taxa / 100)
-    elif row['Grau de instrução'] == "Médio Tecnólogo":
-        return (taxa / 100)
-    elif row['Grau de instrução'] == "Graduação":
-        return (taxa / 100)
-    elif row['Grau de instrução'] == "Especialização":
-        return (taxa / 100)
-    elif row['Grau de instrução'] == "Mestrado":
-        return (taxa / 100)
-    elif row['Grau de instrução'] == "Doutorado":
-        return (taxa / 100)
-    else:
-        return row['REF-ITA']
-    
-def atualizar_geef(row, taxa):
-    if row['Enquadramento do GEEF'] == "Inciso I":
-        return (taxa / 100)
-    elif row['Enquadramento do GEEF'] == "Incisos II e V":
-        return (taxa / 100)
-    elif row['Enquadramento do GEEF'] == "Inciso IV":
-        return (taxa / 100)
-    elif row['Enquadramento do GEEF'] == "Inciso III, VI e VII":
-        return (taxa / 100)
-    else:
-        return row['REF-GEEF-AMC']
-    
-def atualizar_gat(row, taxa):
-    if row['Cargo'] == "AGENTE MUNIC FISCALIZ DE TRANS":
-        return (taxa / 100)
-    else:
-        return row['REF-GAT']
-    
-def atualizar_gr_vida(row, taxa):
-    if row['Cargo'] == "AGENTE MUNIC FISCALIZ DE TRANS":
-        return (taxa / 100)
-    else:
-        return row['REF-GR.R.VIDA']    
+    return tabela
 
-def atualizar_ge_amc(row, taxa):
-    if row['Cargo'] == "AGENTE MUNIC FISCALIZ DE TRANS":
-        return (taxa / 100)
-    else:
-        return ((taxa/2)/100)
-    
     # Função para calcular o novo salário com a dedução da gratificação
 def calcular_novo_salario_com_deducao(df, gratificacao, porcentagem):
     # Deduz a porcentagem da gratificação escolhida
@@ -172,6 +94,37 @@ def calcular_novo_salario_com_deducao(df, gratificacao, porcentagem):
     df['Novo Salário'] = df['Novo Salário'] + df[gratificacao]
     return df
 
+# Tabela de servidores paginada no servidor: busca, filtro por cargo, ordenação e totais são
+# calculados aqui e só a página visível é enviada ao navegador
+def exibir_servidores(tabela, cargos, regime):
+    coluna_anterior, coluna_nova = CONFIGURACOES_REGIME[regime]['remuneracao']
+    col1, col2, col3, col4, col5 = st.columns([3, 3, 2, 1, 1])
+    busca = col1.text_input('Buscar pelo nome:', placeholder='Nome')
+    cargos_selecionados = col2.multiselect('Filtrar por cargo:', cargos, placeholder='Cargo')
+    ordenar_por = col3.selectbox('Ordenar por:', ['Nome', 'Cargo', 'CH', 'Ref', coluna_anterior, coluna_nova])
+    decrescente = col4.toggle('Decrescente')
+    numero = col5.number_input('Página:', min_value=1, value=1)
+    pagina = paginar_servidores(tabela, numero, TAMANHO_PAGINA_PADRAO, ordenar_por, decrescente, busca, cargos_selecionados,
+                                [coluna_anterior, coluna_nova])
+    st.dataframe(estilo_moeda(pagina['pagina'], [coluna_anterior, coluna_nova]), use_container_width=True)
+    st.caption(f"Página {pagina['numero']} de {pagina['paginas']} | {pagina['linhas']} servidores | "
+               f"Remuneração anterior: {formatar_moeda(pagina['totais'][coluna_anterior])} | "
+               f"Remuneração nova: {formatar_moeda(pagina['totais'][coluna_nova])}")
+
+# Análise pesada (projeção, sensibilidade...) calculada só quando o botão é clicado, pelo cache de
+# cenários. O resultado fica na sessão com a chave do cenário e só é devolvido enquanto o cenário
+# e os filtros forem os mesmos; depois de uma mudança, volta a esperar o botão.
+def analise_sob_demanda(nome, rotulo_botao, cache, chave, calcular):
+    if st.button(rotulo_botao, key=f'botao_{nome}'):
+        with st.spinner('Calculando...'):
+            st.session_state[nome] = (chave, cache.obter(chave, calcular))
+    chave_calculada, resultado = st.session_state.get(nome, (None, None))
+    if chave_calculada != chave:
+        if resultado is not None:
+            st.caption(f"O cenário mudou desde o último cálculo; clique em '{rotulo_botao}' para atualizar.")
+        return None
+    return resultado
+
 def main():
     
     st.header(' :orange[Prefeitura de Fortaleza] ', divider='rainbow')
@@ -180,32 +133,55 @@ def main():
     
     
     # Carregar dados
-    df = carregar_dados()
-    
-    df['primeiro_caractere'] = df['Niv'].str.slice(0, 1)
-    
-    ambientes_selecionados = st.sidebar.multiselect('Selecione o(s) Ambiente(s):', df['Ambiente'].unique(), placeholder="Ambiente", )
-    categorias_selecionados = st.sidebar.multiselect('Selecione a(s) Categoria(s):', df['Cat'].unique(), placeholder="Categoria")
-    niveis_selecionados = st.sidebar.multiselect('Selecione o(s) Nível(s):', df['Niv'].unique(), placeholder="Nível")
-    ch_selecionados = st.sidebar.multiselect('Selecione a(s) Carga Horária(s):', df['CH'].unique(), placeholder="Carga Horária")
-    
-    # Preencher com todos os valores possíveis se a lista estiver vazia
-    if not ambientes_selecionados:
-        ambientes_selecionados = df['Ambiente'].unique()
-    if not categorias_selecionados:
-        categorias_selecionados = df['Cat'].unique()
-    if not niveis_selecionados:
-        niveis_selecionados = df['Niv'].unique()
-    if not ch_selecionados:
-        ch_selecionados = df['CH'].unique()
-
-    # Aplicando filtro
-    df = df[
-        (df['Ambiente'].isin(ambientes_selecionados)) &
-        (df['Cat'].isin(categorias_selecionados)) &
-        (df['Niv'].isin(niveis_selecionados)) &
-        (df['CH'].isin(ch_selecionados))
-    ]
+    # Com um acervo montado (python -m simulador.acervo manifesto.json) a folha vem das secretarias
+    # e meses escolhidos nele; sem acervo, da aba 'amc' da planilha
+    usar_acervo = os.path.exists(os.path.join(PASTA_ACERVO, 'indice.json'))
+    # Refaz a cópia colunar da planilha quando solicitado, fora dos caches, que são esvaziados e
+    # voltam a ler a folha uma vez só
+    if st.sidebar.button('Atualizar dados da planilha'):
+        if not usar_acervo:
+            ler_planilha(recriar=True)
+        carregar_dados.clear()
+        carregar_acervo.clear()
+        carregar_cubo.clear()
+        cache_cenarios().limpar()
+    if usar_acervo:
+        particoes = particoes_acervo(PASTA_ACERVO)
+        secretarias = st.sidebar.multiselect('Selecione a(s) Secretaria(s):', particoes['secretaria'].unique(), placeholder="Secretaria")
+        meses = st.sidebar.multiselect('Selecione o(s) Mês(es):', particoes['mes'].unique(), placeholder="Mês")
+        assinatura = (assinatura_acervo(PASTA_ACERVO), tuple(secretarias), tuple(meses))
+        df = carregar_acervo(assinatura)
+    else:
+        assinatura = assinatura_planilha(PLANILHA)
+        df = carregar_dados(assinatura)
+    cubo = carregar_cubo(assinatura, df)
+    
+    ambientes_selecionados = st.sidebar.multiselect('Selecione o(s) Ambiente(s):', cubo.indice.opcoes('Ambiente'), placeholder="Ambiente", )
+    categorias_selecionados = st.sidebar.multiselect('Selecione a(s) Categoria(s):', cubo.indice.opcoes('Cat'), placeholder="Categoria")
+    niveis_selecionados = st.sidebar.multiselect('Selecione o(s) Nível(s):', cubo.indice.opcoes('Niv'), placeholder="Nível")
+    ch_selecionados = st.sidebar.multiselect('Selecione a(s) Carga Horária(s):', cubo.indice.opcoes('CH'), placeholder="Carga Horária")
+    
+    # Filtro aplicado sobre as células do cubo; listas vazias não filtram
+    selecoes = {'Ambiente': ambientes_selecionados, 'Cat': categorias_selecionados,
+                'Niv': niveis_selecionados, 'CH': ch_selecionados}
+
+    # Linhas da folha nos filtros em vigor (as análises por servidor não usam as células do cubo)
+    def servidores_filtrados():
+        return cubo.df.iloc[cubo.linhas(cubo.selecionar(selecoes))]
+
+    # Modo incremental: os resultados da execução anterior ficam na sessão e cada etapa (grades,
+    # busca de salários, taxas, rubricas e agregados) só é refeita se alguma entrada dela mudou
+    incremental = st.sidebar.toggle('Recalcular só o que mudou', value=True)
+    if incremental:
+        if 'avaliador' not in st.session_state:
+            st.session_state.avaliador = AvaliadorIncremental()
+        avaliador = st.session_state.avaliador
+    else:
+        avaliador = AvaliadorIncremental()
+
+    # Modo em lote: as alterações de filtros e parâmetros ficam pendentes até o botão Simular e a
+    # simulação roda em segundo plano, cancelada assim que chega um pedido mais novo
+    em_lote = st.sidebar.toggle('Simular só ao clicar em "Simular"', value=False)
     
     st.sidebar.subheader('Configurações de parâmetros: ')
     # Parâmetros Tabela 1
@@ -215,7 +191,9 @@ def main():
     num_referencias1 = st.sidebar.number_input('Número de Referências:', value=6, min_value=1)
         
     indice_tabela = st.sidebar.number_input('Enquadramento:', min_value=0, value=0)
-    df['Ref'] = df['Ref'] + indice_tabela
+
+    anos_irpf = sorted(TABELAS_IRPF)
+    ano_irpf = st.sidebar.selectbox('Tabela do IRPF (ano):', anos_irpf, index=anos_irpf.index(ANO_IRPF_PADRAO))
     
     gratificacoes = ['GAT','GEEF', 'GR.R.VIDA', 'GE AMC', 'HE NOTURNA']  
     
@@ -245,16 +223,9 @@ def main():
     taxa_gr_r_vida = st.sidebar.number_input('GR.R.VIDA (%)',min_value=0, max_value=100, value=default_values['GR.R.VIDA'])
     taxa_he_noturna = st.sidebar.number_input('HE NOTURNA (%)')
 
-    # Aplicando as atualizações na taxa de GE_AMC para que seja atualizado nas linhas de acordo com o INPUT
-    if taxa_ge_amc is not None:
-        df['REF-GE AMC'] = df.apply(lambda row: atualizar_ge_amc(row, taxa_ge_amc) if row['Cargo'] == "AGENTE MUNIC FISCALIZ DE TRANS" else row['REF-GE AMC'], axis=1)    
-    
-    # Aplicando as atualizações na taxa de GAT para que seja atualizado nas linhas de acordo com o INPUT
-    if taxa_gat is not None:
-        df['REF-GAT'] = df.apply(lambda row: atualizar_gat(row, taxa_gat) if row['Cargo'] == "AGENTE MUNIC FISCALIZ DE TRANS" else row['REF-GAT'], axis=1)
-
-    if taxa_gr_r_vida is not None:
-        df['REF-GR.R.VIDA'] = df.apply(lambda row: atualizar_gr_vida(row, taxa_gr_r_vida) if row['Cargo'] == "AGENTE MUNIC FISCALIZ DE TRANS" else row['REF-GR.R.VIDA'], axis=1)
+    # Sobrescritas de ITA e GEEF (rubrica, coluna chave, valor da chave, taxa %); as de GAT, GE AMC e
+    # GR.R.VIDA dos agentes de trânsito vêm das taxas acima
+    sobrescritas = []
     
     # Exibindo inputs quando o botão dos ITAs quando for acionado
     show_inputs = st.sidebar.button("Alterar ITA")
@@ -276,19 +247,14 @@ def main():
         taxa_especialização = st.sidebar.number_input('Especialização (%)', value=15)
         taxa_mestrado = st.sidebar.number_input('Mestrado(%)', value=35)
         taxa_doutorado = st.sidebar.number_input('Doutorado(%)', value=45)
-        # Aplicando as atualizações
-        if taxa_profissionalizante:
-            df['REF-ITA'] = df.apply(lambda row: atualizar_ita(row, taxa_profissionalizante) if row['Grau de instrução'] == "Médio Profissionalizante" else row['REF-ITA'], axis=1)
-        if taxa_tecnologo:
-            df['REF-ITA'] = df.apply(lambda row: atualizar_ita(row, taxa_tecnologo) if row['Grau de instrução'] == "Médio Tecnólogo" else row['REF-ITA'], axis=1)
-        if taxa_graduação:
-            df['REF-ITA'] = df.apply(lambda row: atualizar_ita(row, taxa_graduação) if row['Grau de instrução'] == "Graduação" else row['REF-ITA'], axis=1)
-        if taxa_especialização:
-            df['REF-ITA'] = df.apply(lambda row: atualizar_ita(row, taxa_especialização) if row['Grau de instrução'] == "Especialização" else row['REF-ITA'], axis=1)
-        if taxa_mestrado:
-            df['REF-ITA'] = df.apply(lambda row: atualizar_ita(row, taxa_mestrado) if row['Grau de instrução'] == "Mestrado" else row['REF-ITA'], axis=1)
-        if taxa_doutorado:
-            df['REF-ITA'] = df.apply(lambda row: atualizar_ita(row, taxa_doutorado) if row['Grau de instrução'] == "Doutorado" else row['REF-ITA'], axis=1)
+        sobrescritas += sobrescritas_por_chave('REF-ITA', 'Grau de instrução', {
+            "Médio Profissionalizante": taxa_profissionalizante,
+            "Médio Tecnólogo": taxa_tecnologo,
+            "Graduação": taxa_graduação,
+            "Especialização": taxa_especialização,
+            "Mestrado": taxa_mestrado,
+            "Doutorado": taxa_doutorado,
+        })
             
     # Exibindo inputs quando o botão dos GEEFs quando for acionado
     show_inputs_geef = st.sidebar.button("Alterar GEEF")
@@ -309,16 +275,12 @@ def main():
         taxa_inciso_iv = st.sidebar.number_input('Inciso IV  (%)', value=30)
         taxa_inciso_iii_vi_vii = st.sidebar.number_input('Inciso III, VI e VII (%)', value=25)
 
-        # Aplicando as atualizações
-        if taxa_inciso_i:
-            df['REF-GEEF-AMC'] = df.apply(lambda row: atualizar_geef(row, taxa_inciso_i) if row['Enquadramento do GEEF'] == "Inciso I" else row['REF-GEEF-AMC'], axis=1)
-        if taxa_inciso_i_v:
-            df['REF-GEEF-AMC'] = df.apply(lambda row: atualizar_geef(row, taxa_inciso_i_v) if row['Enquadramento do GEEF'] == "Incisos II e V" else row['REF-GEEF-AMC'], axis=1)
-        if taxa_inciso_iv:
-            df['REF-GEEF-AMC'] = df.apply(lambda row: atualizar_geef(row, taxa_inciso_iv) if row['Enquadramento do GEEF'] == "Inciso IV" else row['REF-GEEF-AMC'], axis=1)
-        if taxa_inciso_iii_vi_vii:
-            df['REF-GEEF-AMC'] = df.apply(lambda row: atualizar_geef(row, taxa_inciso_iii_vi_vii) if row['Enquadramento do GEEF'] == "Inciso III, VI e VII" else row['REF-GEEF-AMC'], axis=1)
-
+        sobrescritas += sobrescritas_por_chave('REF-GEEF-AMC', 'Enquadramento do GEEF', {
+            "Inciso I": taxa_inciso_i,
+            "Incisos II e V": taxa_inciso_i_v,
+            "Inciso IV": taxa_inciso_iv,
+            "Inciso III, VI e VII": taxa_inciso_iii_vi_vii,
+        })
 
     # salario_base1 = st.sidebar.number_input('Salário Base:', value=1160.66, min_value=0.0)
     st.sidebar.subheader('Configurações dos salários-base: ')      
@@ -332,118 +294,81 @@ def main():
 
                         
     # Calcular novo salário usando a Tabela 1
-    tabela_salarios_b_180, valores_b_180 = exibir_tabela_salarios(TC1, TR1, num_classes1, num_referencias1, salario_base_b_180, 'Tabela B - 180h')
-    tabela_salarios_c_180, valores_c_180 = exibir_tabela_salarios(TC1, TR1, num_classes1, num_referencias1, salario_base_c_180, 'Tabela C - 180h')
-    tabela_salarios_d_180, valores_d_180 = exibir_tabela_salarios(TC1, TR1, num_classes1, num_referencias1, salario_base_d_180, 'Tabela D - 180h')
-    tabela_salarios_b_240, valores_b_240 = exibir_tabela_salarios(TC1, TR1, num_classes1, num_referencias1, salario_base_b_240, 'Tabela B - 240h')
-    tabela_salarios_c_240, valores_c_240 = exibir_tabela_salarios(TC1, TR1, num_classes1, num_referencias1, salario_base_c_240, 'Tabela C - 240h')
-    tabela_salarios_d_240, valores_d_240 = exibir_tabela_salarios(TC1, TR1, num_classes1, num_referencias1, salario_base_d_240, 'Tabela D - 240h')
-
-    df['Novo Salário'] = calcular_novo_salario(df, valores_b_180,valores_c_180,valores_d_180,valores_b_240,valores_c_240,valores_d_240, pular_indice=indice_tabela)
-    
-        
-    # Adicionando novas colunas
-    df['novo_0085-ITA'] = (df['REF-ITA']  * df['Novo Salário'])
-    df['novo_0107-ANUENIO'] = ((df['REF-ANUENIO']) * df['Novo Salário'])
-    df['nova_105-INSALUBRIDAD'] = (( df['REF-INSALUBRIDAD']) * df['Novo Salário'])
-    df['nova_0118-GR.PRODUT_'] = ((df['REF-GR.PRODUT']) * df['Novo Salário'])
-    df['nova_0096-GAT'] = df['REF-GAT'] * df['Novo Salário']
-    df['nova_0097-GEEF-AMC'] = (df['REF-GEEF-AMC']) * df['Novo Salário']
-    df['nova_0159-GR.R.VIDA'] = ((df['REF-GR.R.VIDA']) * df['Novo Salário'])
-    df['nova_0318-GE AMC'] = (df['REF-GE AMC']) * df['Novo Salário']
-    df['novo_0817-B HR INC'] = df['0223-VP'] + df['0248-VPNI HEI'] + df['0001-G.F.INC-DNI1'] + df['0004-G.R.INC.DAS1'] + df['0005-G.R.INC.DAS2'] + df['0006-G.R.INC.DAS3'] + df['0007-G.R.INC.DNS1'] + df['0008-G.R.INC.DNS2'] + df['0009-G.R.INC.DNS3'] + df['0026-GR INC AT1'] + df['0027-GR INC AT2'] + df['Novo Salário'] + df['novo_0085-ITA'] + df['novo_0107-ANUENIO'] + df['nova_105-INSALUBRIDAD'] + df['nova_0118-GR.PRODUT_'] + df['nova_0159-GR.R.VIDA'] + df['nova_0318-GE AMC']
-    df['nova_0133-HR.EXTR.INCO'] = round(df['novo_0817-B HR INC'] / df['CH'] * 1.25 * df['REF-HR.EXTR.INCO'],2)
-    df['novo_0996-TOT.PROVENTO'] = df['Novo Salário'] + df['novo_0085-ITA'] + df['novo_0107-ANUENIO'] + df['nova_105-INSALUBRIDAD'] + df['nova_0118-GR.PRODUT_'] + df['nova_0096-GAT'] + df['nova_0097-GEEF-AMC'] + df['nova_0159-GR.R.VIDA'] + df['nova_0318-GE AMC'] + df['nova_0133-HR.EXTR.INCO'] + df['0223-VP'] + df['0248-VPNI HEI'] + df['0001-G.F.INC-DNI1'] + df['0004-G.R.INC.DAS1'] + df['0005-G.R.INC.DAS2'] + df['0006-G.R.INC.DAS3'] + df['0007-G.R.INC.DNS1'] + df['0008-G.R.INC.DNS2'] + df['0009-G.R.INC.DNS3'] + df['0026-GR INC AT1'] + df['0027-GR INC AT2'] + df['0308-DIF.AJ.PCCS'] + df['0320-GAJ 9903/12'] + df['0170-DIR.NIV.SUPE'] + df['0174-VRB.ESP.REP'] + df['0180-DIR.ASS.SUPE'] + df['0190-DIR.NIV.INT.'] + df['058-DIR GER 01'] + df['0326-GTRTC                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                           '] + df['0206-AB.PERMANENC']
-    df['nova_0872-B HR NOTURNA'] = df['nova_0133-HR.EXTR.INCO'] + df['0223-VP'] + df['0223-VP'] + df['0248-VPNI HEI'] + df['0001-G.F.INC-DNI1'] + df['0004-G.R.INC.DAS1'] + df['0005-G.R.INC.DAS2'] + df['0006-G.R.INC.DAS3'] + df['0007-G.R.INC.DNS1'] + df['0008-G.R.INC.DNS2'] + df['0009-G.R.INC.DNS3'] + df['0026-GR INC AT1'] + df['0027-GR INC AT2'] + df['Novo Salário'] + df['novo_0085-ITA'] + df['novo_0107-ANUENIO'] + df['nova_105-INSALUBRIDAD'] + df['nova_0118-GR.PRODUT_'] + df['nova_0096-GAT'] + df['nova_0097-GEEF-AMC'] + df['nova_0159-GR.R.VIDA'] + df['nova_0318-GE AMC']
-    df['nova_0099-HR NOTURNAS'] = df['nova_0872-B HR NOTURNA'] / df['CH'] * 0.2 * df['REF-HR NOTURNAS']
-    df['nova_0183-GR SER EXTRA'] = df['nova_0872-B HR NOTURNA'] / df['CH'] * 1.5 * df['REF-GR SER EXTRA']
-    df['nova_0383-HE NOTURNA'] = df['nova_0872-B HR NOTURNA'] / df['CH'] * 1.5 * 1.2 * ((1+ df['REF-HE NOTURNA                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                      ']) * ( 1+ taxa_he_noturna/100) - 1 )*100
-    df['nova_0801-IPM PREVFOR'] = df['Novo Salário'] + df['novo_0085-ITA'] + df['novo_0107-ANUENIO'] + df['nova_105-INSALUBRIDAD'] + df['nova_0118-GR.PRODUT_'] + df['nova_0096-GAT'] + df['nova_0097-GEEF-AMC'] + df['nova_0318-GE AMC'] + df['nova_0133-HR.EXTR.INCO'] + df['0223-VP'] + df['0248-VPNI HEI'] + df['0001-G.F.INC-DNI1'] + df['0004-G.R.INC.DAS1'] + df['0005-G.R.INC.DAS2'] + df['0006-G.R.INC.DAS3'] + df['0007-G.R.INC.DNS1'] + df['0008-G.R.INC.DNS2'] + df['0009-G.R.INC.DNS3'] + df['0026-GR INC AT1'] + df['0027-GR INC AT2'] + df['0308-DIF.AJ.PCCS'] 
-    df['nova_IPM PREVFOR-PATRONAL'] = df['nova_0801-IPM PREVFOR'] * 0.28
-    df['nova_IPM PREVFOR-SERVIDOR'] = df['nova_0801-IPM PREVFOR'] * 0.14
-    df['nova_base_IRPF'] = df['novo_0996-TOT.PROVENTO'] -  df['nova_IPM PREVFOR-SERVIDOR']            
-    df['nova_IRPF'] = df['nova_base_IRPF'].apply(calcular_irpf) 
-    
-    # Quantidade de pessoas por cargo, carga horária e referência
-    quantidade_pessoas = contar_pessoas(df)
-    
-    # Adicionando o totalizador geral
-    total_quantidade = quantidade_pessoas['Quantidade'].sum()
-    total_cons_venc_base = quantidade_pessoas['Consolidado VENCIMENTO BASE'].sum()
-    total_geral = pd.DataFrame({'Cargo': ['Total Geral'], 'Quantidade': [total_quantidade], 'Consolidado VENCIMENTO BASE': [total_cons_venc_base]})
-    
-    quantidade_pessoas = pd.concat([quantidade_pessoas, total_geral], ignore_index=True)
-    
-    tabela_com_novo_salario = tabela_novo_salario(df)
-    
-    # Calcular totais para a tabela do novo salário
-    total_vencimento_base = tabela_com_novo_salario['0996-TOT.PROVENTO'].sum()
-    total_novo_salario = tabela_com_novo_salario['novo_0996-TOT.PROVENTO'].sum()
-    subtracao = total_novo_salario - total_vencimento_base
-    total_impacto = total_novo_salario - total_vencimento_base
-    
-    # cálculo dos encargos
-    provisao_ferias_rem_anterior = (total_vencimento_base/12)/3
-    provisao_ferias_nova = (total_novo_salario/12)/3
-    provisao_ferias_impacto = (total_impacto/12)/3
-    provisao_decimo_rem_anterior = (total_vencimento_base/12)
-    provisao_decimo_nova = (total_novo_salario/12)
-    provisao_decimo_impacto = (total_impacto/12)
-    provisao_ipm_rem_anterior = (total_vencimento_base + provisao_ferias_rem_anterior + provisao_decimo_rem_anterior) * 0.04
-    provisao_ipm_nova = ((total_novo_salario + provisao_ferias_nova + provisao_decimo_nova) * 0.04)
-    provisao_ipm_impacto = provisao_ipm_nova - provisao_ipm_rem_anterior 
-    ipm_previfor_anterior = df['IPM PREVFOR-PATRONAL'].sum()
-
-    # Adicionar linha com totais à tabela do novo salário
-    tabela_com_novo_salario.loc['Total', ['VENCIMENTO BASE', 'Novo Salário']] = [total_vencimento_base, total_novo_salario]
-
-    # Calcular o resumo dos cargos
-    resumo_cargos = calcular_impacto(df)
-
-    # Totalizadores da tabela de impacto
-    resumo_cargos.loc['Total', ['Cargo', 'Quantidade', 'Remuneração Anterior', 'Remuneração Nova', 'Impacto']] = ['',total_quantidade, total_vencimento_base, total_novo_salario, total_impacto]
-    
-    # Adicionar linha com subtítulo "Encargos" logo abaixo dos totalizadores
-    resumo_cargos.loc[''] = ['Encargos', '', '', '', '']
-    resumo_cargos.loc[len(resumo_cargos)] = ['Provisão de férias', '', provisao_ferias_rem_anterior, provisao_ferias_nova, provisao_ferias_impacto]
-    resumo_cargos.loc[len(resumo_cargos)] = ['Provisão de 13º Salário', '', provisao_decimo_rem_anterior, provisao_decimo_nova, provisao_decimo_impacto]
-    resumo_cargos.loc[len(resumo_cargos)] = ['Fortaleza Saúde- IPM (4%)', '', provisao_ipm_rem_anterior,provisao_ipm_nova , provisao_ipm_impacto]
-    # resumo_cargos.loc['Total'] = []
-        
-    nova_ipm_previfor = df['nova_IPM PREVFOR-PATRONAL'].sum()    
-    ipm_previfor_impacto = nova_ipm_previfor - ipm_previfor_anterior
-    
-    resumo_cargos.loc[len(resumo_cargos)] = ['IPM – PREVIFOR-FIN (28%)', '', ipm_previfor_anterior, nova_ipm_previfor, ipm_previfor_impacto]
-    
-    impacto_mensal_ant = total_vencimento_base + provisao_ferias_rem_anterior + provisao_decimo_rem_anterior + provisao_ipm_rem_anterior + ipm_previfor_anterior
-    impacto_mensal_novo = total_novo_salario+provisao_ferias_nova + provisao_decimo_nova + provisao_ipm_nova + nova_ipm_previfor
-    impacto_mensal_impacto = impacto_mensal_novo - impacto_mensal_ant
-    resumo_cargos.loc[len(resumo_cargos)] = ['IMPACTO MENSAL', '', impacto_mensal_ant, impacto_mensal_novo, impacto_mensal_impacto]
-    resumo_cargos.loc[len(resumo_cargos)] = ['IMPACTO ANUAL', '', impacto_mensal_ant*12, impacto_mensal_novo*12, impacto_mensal_impacto*12]
-    
-    # Calcular imposto de renda para a Remuneração Anterior e Nova
-    imposto_renda_anterior = df['IRPF'].sum()
-    imposto_renda_novo = df['nova_IRPF'].sum()
-    impacto_imposto_renda = imposto_renda_novo - imposto_renda_anterior
-
-    # Calcular IPM-PREVIFOR (Patronal) para a Remuneração Anterior e Nova
-    ipm_previfor_patronal_anterior = df['IPM PREVFOR-PATRONAL'].sum()
-    ipm_previfor_patronal_novo = df['nova_IPM PREVFOR-PATRONAL'].sum()
-    impacto_ipm_previfor_patronal = ipm_previfor_patronal_novo - ipm_previfor_patronal_anterior
-
-    # Calcular IPM PREVFOR-SERVIDOR para a Remuneração Anterior e Nova
-    ipm_previfor_servidor_anterior = df['IPM PREVFOR-SERVIDOR'].sum()
-    ipm_previfor_servidor_novo = df['nova_IPM PREVFOR-SERVIDOR'].sum()
-    impacto_ipm_previfor_servidor = ipm_previfor_servidor_novo - ipm_previfor_servidor_anterior
-
-    # Calcular valores totais
-    valor_mensal_anterior = imposto_renda_anterior + ipm_previfor_patronal_anterior + ipm_previfor_servidor_anterior
-    valor_mensal_novo = imposto_renda_novo + ipm_previfor_patronal_novo + ipm_previfor_servidor_novo
-    impacto_mensal = valor_mensal_novo - valor_mensal_anterior
-
+    parametros = {
+        'TC': TC1, 'TR': TR1, 'num_classes': num_classes1, 'num_referencias': num_referencias1, 'enquadramento': indice_tabela,
+        **dict(zip(SALARIOS_BASE, [salario_base_b_180, salario_base_c_180, salario_base_d_180,
+                                   salario_base_b_240, salario_base_c_240, salario_base_d_240])),
+        'taxa_gat': taxa_gat, 'taxa_ge_amc': taxa_ge_amc, 'taxa_gr_r_vida': taxa_gr_r_vida, 'taxa_he_noturna': taxa_he_noturna,
+        'ano_irpf': ano_irpf, 'sobrescritas': sobrescritas,
+    }
+    # Meta de orçamento: procura os parâmetros livres que levam o total escolhido até o limite, a
+    # partir dos parâmetros acima e sobre os servidores dos filtros (ver simulador.orcamento)
+    with st.sidebar.expander('Meta de orçamento'):
+        nome_meta = st.selectbox('Total limitado:', list(METAS))
+        limite = st.number_input('Limite (R$):', value=1_000_000.0, step=100_000.0)
+        livres = st.multiselect('Parâmetros livres:', list(PARAMETROS_LIVRES), default=['Taxa de Classe (%)'])
+        intervalos = {}
+        for rotulo in livres:
+            nome, minimo, maximo = PARAMETROS_LIVRES[rotulo]
+            col1, col2 = st.columns(2)
+            intervalos[nome] = (col1.number_input(f'{rotulo} de:', value=minimo), col2.number_input('até:', value=maximo, key=f'maximo_{nome}'))
+        cargos_minimo = st.multiselect('Cargos com aumento mínimo:', sorted(cubo.df['Cargo'].unique()), placeholder="Cargo")
+        aumento_minimo = st.number_input('Aumento mínimo da remuneração (%):', value=0.0)
+        if st.button('Resolver', disabled=not livres):
+            with st.spinner('Procurando...'):
+                st.session_state.solucao_orcamento = resolver_orcamento(
+                    servidores_filtrados(), limite, intervalos, parametros, METAS[nome_meta], 'amc',
+                    dict.fromkeys(cargos_minimo, aumento_minimo))
+        solucao = st.session_state.get('solucao_orcamento')
+        if solucao is not None:
+            if solucao['viavel']:
+                st.success(f"{nome_meta}: {formatar_moeda(solucao['valor'])} em {solucao['avaliacoes']} avaliações")
+            else:
+                st.warning(f"Nenhum cenário respeita o limite e os mínimos; o mais próximo dá {formatar_moeda(solucao['valor'])}")
+            st.dataframe(pd.Series({campo: solucao['parametros'][campo] for campo in ['TC', 'TR', *SALARIOS_BASE]}, name='Valor').round(4),
+                         use_container_width=True)
+
+    cache = cache_cenarios()
+    if 'execucao' not in st.session_state:
+        st.session_state.execucao = ExecucaoEmFundo()
+    if em_lote:
+        if st.sidebar.button('Simular', type='primary') or 'cenario_aplicado' not in st.session_state:
+            st.session_state.cenario_aplicado = (parametros, selecoes)
+        elif st.session_state.cenario_aplicado != (parametros, selecoes):
+            st.sidebar.warning('Há alterações ainda não simuladas.')
+        parametros, selecoes = st.session_state.cenario_aplicado
+        chave = chave_cenario(parametros, 'amc', assinatura, selecoes)
+
+        def simular_em_fundo(tarefa):
+            with tarefa.acompanhar(avaliador):
+                return cache.obter(chave, lambda: cubo.simular(parametros, selecoes, avaliador, assinatura))
+
+        # Se a página for executada de novo durante a espera, a próxima execução pede a tarefa de
+        # novo: com o mesmo cenário ela continua, com outro ela é cancelada
+        tarefa = st.session_state.execucao.pedir(chave, simular_em_fundo)
+        barra = st.progress(tarefa.progresso, 'Simulando...')
+        while not tarefa.aguardar(0.1):
+            barra.progress(tarefa.progresso, 'Simulando...')
+        barra.empty()
+        resultados = tarefa.resultado()
+    else:
+        # Uma simulação em segundo plano deixada pelo modo em lote não pode usar o avaliador junto
+        st.session_state.execucao.cancelar()
+        resultados = cache.obter(chave_cenario(parametros, 'amc', assinatura, selecoes),
+                                 lambda: cubo.simular(parametros, selecoes, avaliador, assinatura))
+    grades = resultados['grades']
+    tabela_com_novo_salario = resultados['tabela_novo_salario']
+    resumo_cargos = resultados['resumo_cargos']
+    totais = resultados['totais']
+    impacto_mensal_ant = totais['folha_mensal_anterior']
+    impacto_mensal_novo = totais['folha_mensal_nova']
+    impacto_mensal_impacto = totais['impacto_mensal']
+    valor_mensal_anterior = totais['suavizacoes_mensal_anterior']
+    valor_mensal_novo = totais['suavizacoes_mensal_nova']
+    impacto_mensal = totais['impacto_suavizacoes_mensal']
     valor_anual_anterior = valor_mensal_anterior * 12
     valor_anual_novo = valor_mensal_novo * 12
-    impacto_anual = valor_anual_novo - valor_anual_anterior
+    impacto_anual = totais['impacto_suavizacoes_anual']
     
    # ------------------------------------------------------------------ TABELAS, GRÁFICOS E DATAFRAMES ------------------------------------------------------------ #
    
@@ -473,30 +398,18 @@ def main():
     
     col1,col2, col3, col4 = st.columns(4)
     col1.text('Taxa GAT')
-    col1.info(f'{taxa_gat} %')
+    col1.info(f"{parametros['taxa_gat']} %")
     col2.text('Taxa GE AMC')
-    col2.info(f'{taxa_ge_amc} %')
+    col2.info(f"{parametros['taxa_ge_amc']} %")
     col3.text('Taxa GR R Vida')
-    col3.info(f'{taxa_gr_r_vida} %')
+    col3.info(f"{parametros['taxa_gr_r_vida']} %")
     col4.text('Taxa HE Noturna ')
-    col4.info(f'{taxa_he_noturna} %')
+    col4.info(f"{parametros['taxa_he_noturna']} %")
     
-    # Criando um dicionário com as diferenças antes e depois do Ita
-    diferencas_antes = {
-        'ITA': df['0085-ITA'].sum(),
-        'GAT': df['0096-GAT'].sum(),
-        'GEEF-AMC': df['0097-GEEF-AMC'].sum(),
-        'GR.R.VIDA': df['0159-GR.R.VIDA'].sum(),
-        'GE AMC': df['0318-GE AMC'].sum()
-    }
-
-    diferencas_depois = {
-        'ITA': df['novo_0085-ITA'].sum(),
-        'GAT': df['nova_0096-GAT'].sum(),
-        'GEEF-AMC': df['nova_0097-GEEF-AMC'].sum(),
-        'GR.R.VIDA': df['nova_0159-GR.R.VIDA'].sum(),
-        'GE AMC': df['nova_0318-GE AMC'].sum()
-    }
+    # Totais das gratificações antes e depois
+    df_diferencas = resultados['gratificacoes']
+    diferencas_antes = df_diferencas['Antes'].to_dict()
+    diferencas_depois = df_diferencas['Depois'].to_dict()
     
     diferencas = {}
     diferencas_real = {}
@@ -516,13 +429,6 @@ def main():
     col5.text('Impacto % GE AMC')
     col5.info(f"{diferencas_real['GE AMC']}   |   {round(diferencas['GE AMC'], 2)} %")
 
-    # Convertendo os dicionários em DataFrames
-    df_diferencas_antes = pd.DataFrame.from_dict(diferencas_antes, orient='index', columns=['Antes'])
-    df_diferencas_depois = pd.DataFrame.from_dict(diferencas_depois, orient='index', columns=['Depois'])
-
-    # Concatenando os DataFrames de antes e depois
-    df_diferencas = pd.concat([df_diferencas_antes, df_diferencas_depois], axis=1)
-
     # Plotando o gráfico de barras
     fig_gratificacoes, ax = plt.subplots(figsize=(8, 3))
     df_diferencas.plot(kind='bar', ax=ax)
@@ -530,12 +436,8 @@ def main():
     ax.set_ylabel('Gratificações')
     # st.pyplot(fig_gratificacoes)  
     
-    # Calculando as somas das colunas relevantes
-    salarios_antes = df.groupby('Cargo')['0996-TOT.PROVENTO'].sum()
-    salarios_depois = df.groupby('Cargo')['novo_0996-TOT.PROVENTO'].sum()
-
-    # Criando um DataFrame com as somas antes e depois
-    df_salarios = pd.DataFrame({'Antes': salarios_antes, 'Depois': salarios_depois})
+    # Somas por cargo antes e depois
+    df_salarios = resultados['salarios_por_cargo']
 
     # Plotando o gráfico de barras
     fig_por_cargos, ax = plt.subplots(figsize=(8, 3))  # Definindo o tamanho da figura (largura, altura)
@@ -554,46 +456,27 @@ def main():
     col1, col2 = st.columns(2)
     option_tabela = col1.selectbox('Mostrar tabela: ', tabelas,)
     col1, col2 = st.columns(2)
-    if option_tabela == 'tabela_salarios_b_180': 
-        st.dataframe(tabela_salarios_b_180, use_container_width=False)
-    elif option_tabela == 'tabela_salarios_c_180': 
-        st.dataframe(tabela_salarios_c_180, use_container_width=False) 
-    elif option_tabela == 'tabela_salarios_d_180': 
-        st.dataframe(tabela_salarios_d_180, use_container_width=False) 
-    elif option_tabela == 'tabela_salarios_b_240': 
-        st.dataframe(tabela_salarios_b_240, use_container_width=False) 
-    elif option_tabela == 'tabela_salarios_c_240': 
-        st.dataframe(tabela_salarios_c_240, use_container_width=False) 
-    elif option_tabela == 'tabela_salarios_d_240': 
-        st.dataframe(tabela_salarios_d_240, use_container_width=False) 
-        
+    # As seis grades já foram calculadas juntas; aqui só montamos a tabela escolhida para exibição
+    tabela_salarios = pd.DataFrame(grades[tabelas.index(option_tabela)], index=range(1, parametros['num_referencias'] + 1), columns=range(1, parametros['num_classes'] + 1))
+    tabela_salarios.index.name = 'Referência'
+    tabela_salarios.columns.name = 'Classe'
+    st.dataframe(tabela_salarios.style.format('{:.2f}'), use_container_width=False)
 
     # Nova tabela com o novo salário calculado
     st.write("Servidores:")
-    st.dataframe(tabela_com_novo_salario.round(2), use_container_width=True)
+    exibir_servidores(tabela_com_novo_salario, resultados['salarios_por_cargo'].index, 'amc')
     
 
     
     # Exibir a tabela de resumo de cargos
     st.header("Impacto da Reestruturação do PCCS da Gestão do Trânsito:",)
-    st.dataframe(resumo_cargos.map(lambda x: formatar_moeda(x) if isinstance(x, (int, float)) else x),use_container_width=True)
-    
-    # Criar DataFrame com os resultados
-    dados = {
-        'Item': ['IMPOSTO DE RENDA', 'IPM-PREVIFOR (Patronal)', 'IPM-PREVIFOR (Servidor)', 'VALOR MENSAL', 'VALOR ANUAL'],
-        'Remuneração Anterior': [imposto_renda_anterior, ipm_previfor_patronal_anterior, ipm_previfor_servidor_anterior, valor_mensal_anterior, valor_anual_anterior],
-        'Remuneração Nova': [imposto_renda_novo, ipm_previfor_patronal_novo, ipm_previfor_servidor_novo, valor_mensal_novo, valor_anual_novo],
-        'Impacto': [impacto_imposto_renda, impacto_ipm_previfor_patronal, impacto_ipm_previfor_servidor, impacto_mensal, impacto_anual]
-    }
-
-    tabela = pd.DataFrame(dados)
-
-    # Formatando valores para exibição
-    tabela['Remuneração Anterior'] = tabela['Remuneração Anterior'].apply(lambda x: formatar_moeda(x))
-    tabela['Remuneração Nova'] = tabela['Remuneração Nova'].apply(lambda x: formatar_moeda(x))
-    tabela['Impacto'] = tabela['Impacto'].apply(lambda x: formatar_moeda(x))
+    st.dataframe(estilo_moeda(resumo_cargos), use_container_width=True)
+    st.write("Encargos:")
+    st.dataframe(estilo_moeda(resultados['encargos']), hide_index=True, use_container_width=True)
     
-    styled_table = tabela.style.apply(lambda s: ['background-color: #dcdcdc; font-weight: bold' if s.name == 3 or s.name == 4 else '' for i in s], axis=1)
+    # Tabela das suavizações (imposto de renda e IPM-PREVIFOR)
+    # Valores numéricos, formatados em R$ só na exibição
+    styled_table = estilo_moeda(resultados['suavizacoes']).apply(lambda s: ['background-color: #dcdcdc; font-weight: bold' if s.name == 3 or s.name == 4 else '' for i in s], axis=1)
 
     st.header("Suavizações:")
     st.dataframe(styled_table, use_container_width=True)
@@ -607,14 +490,78 @@ def main():
     }
         
     tabela_dados_totais = pd.DataFrame(dados_totais)
-
-    # Formatando valores para exibição
-    tabela_dados_totais['Remuneração Anterior'] = tabela_dados_totais['Remuneração Anterior'].apply(lambda x: formatar_moeda(x))
-    tabela_dados_totais['Remuneração Nova'] = tabela_dados_totais['Remuneração Nova'].apply(lambda x: formatar_moeda(x))
-    tabela_dados_totais['Impacto'] = tabela_dados_totais['Impacto'].apply(lambda x: formatar_moeda(x))
     
     st.header("Totais Líquidos:")
-    st.dataframe(tabela_dados_totais, use_container_width=True)
+    st.dataframe(estilo_moeda(tabela_dados_totais), use_container_width=True)
+
+    # Projeção mês a mês com as progressões de Ref e o anuênio (ver simulador.projecao), sobre os
+    # servidores dos filtros escolhidos; calculada só ao clicar em 'Projetar'
+    st.header("Projeção:")
+    meses_projecao = st.slider('Meses projetados', 12, 60, 24, step=6)
+    projecao = analise_sob_demanda('projecao', 'Projetar', cache,
+                                   chave_cenario(parametros, 'amc', (assinatura, 'projecao', meses_projecao), selecoes),
+                                   lambda: projetar(parametros, servidores_filtrados(), 'amc', meses_projecao))
+    if projecao is not None:
+        col1, col2 = st.columns(2)
+        col1.text(f'Impacto Acumulado em {meses_projecao} meses:')
+        col1.info(formatar_moeda(projecao['Impacto Acumulado'].iloc[-1]))
+        col2.text(f'Impacto no mês {meses_projecao}:')
+        col2.info(formatar_moeda(projecao['Impacto'].iloc[-1]))
+        st.plotly_chart(px.line(projecao.reset_index(), x='Mês', y=['Folha Anterior', 'Folha Nova'], labels={'value': 'Folha Mensal', 'variable': ''}),
+                        use_container_width=True)
+        st.dataframe(estilo_moeda(projecao), use_container_width=True)
+
+    # Sensibilidade: variação do total escolhido com cada parâmetro 10% abaixo e acima do cenário
+    # (ver simulador.sensibilidade), em um gráfico de tornado com os maiores efeitos no topo;
+    # calculada só ao clicar em 'Analisar sensibilidade'
+    st.header("Sensibilidade:")
+    nome_meta = st.selectbox('Total analisado:', list(METAS))
+    meta = METAS[nome_meta]
+    sensibilidade = analise_sob_demanda('sensibilidade', 'Analisar sensibilidade', cache,
+                                        chave_cenario(parametros, 'amc', (assinatura, 'sensibilidade'), selecoes),
+                                        lambda: analisar_sensibilidade(servidores_filtrados(), parametros, 'amc'))
+    if sensibilidade is not None:
+        tornado = sensibilidade[[f'{meta}_baixo', f'{meta}_alto']].set_axis(['10% abaixo', '10% acima'], axis=1)
+        tornado = tornado.loc[(tornado['10% acima'] - tornado['10% abaixo']).abs().sort_values().index]
+        fig_tornado = px.bar(tornado.reset_index(), y='Parâmetro', x=['10% abaixo', '10% acima'], orientation='h', barmode='overlay',
+                             labels={'value': f'Variação do {nome_meta.lower()}', 'variable': ''}, height=max(400, 25 * len(tornado)))
+        st.plotly_chart(fig_tornado, use_container_width=True)
+        st.dataframe(estilo_moeda(sensibilidade[['Valor', 'Baixo', 'Alto', f'{meta}_baixo', f'{meta}_alto', f'{meta}_marginal']],
+                                  [f'{meta}_baixo', f'{meta}_alto', f'{meta}_marginal']), use_container_width=True)
+
+    # Monte Carlo: faixas do total escolhido com o enquadramento negociado, deslocamentos de Ref e
+    # novas titulações sorteados (ver simulador.montecarlo); as probabilidades são editáveis e as
+    # amostras só são sorteadas ao clicar em 'Rodar Monte Carlo'
+    st.header("Monte Carlo:")
+    col1, col2 = st.columns(2)
+    amostras = col1.slider('Amostras', 200, 5000, 1000, step=200)
+    semente = col2.number_input('Semente:', min_value=0, value=0)
+    with st.expander('Probabilidades (%)'):
+        incertezas = {
+            'enquadramento': {refs: st.number_input(f'Enquadramento negociado de +{refs} Ref:', min_value=0.0, max_value=100.0,
+                                                    value=probabilidade * 100) / 100
+                              for refs, probabilidade in INCERTEZAS_PADRAO['enquadramento'].items()},
+            'deslocamentos_referencia': {refs: st.number_input(f'Deslocamento individual de +{refs} Ref:', min_value=0.0,
+                                                               max_value=100.0, value=probabilidade * 100) / 100
+                                         for refs, probabilidade in INCERTEZAS_PADRAO['deslocamentos_referencia'].items()},
+            'transicoes_instrucao': {origem: {destino: st.number_input(f'Titulação de {origem} para {destino}:', min_value=0.0,
+                                                                       max_value=100.0, value=probabilidade * 100) / 100
+                                              for destino, probabilidade in destinos.items()}
+                                     for origem, destinos in INCERTEZAS_PADRAO['transicoes_instrucao'].items()},
+        }
+    monte_carlo = analise_sob_demanda('monte_carlo', 'Rodar Monte Carlo', cache,
+                                      chave_cenario(parametros, 'amc', (assinatura, 'monte_carlo', amostras, semente, incertezas), selecoes),
+                                      lambda: simular_monte_carlo(servidores_filtrados(), parametros, 'amc', amostras, incertezas, semente))
+    if monte_carlo is not None:
+        col1, col2, col3 = st.columns(3)
+        for coluna, percentil in zip((col1, col2, col3), ('P5', 'P50', 'P95')):
+            coluna.text(f'{nome_meta} ({percentil}):')
+            coluna.info(formatar_moeda(monte_carlo['percentis'].loc[percentil, meta]))
+        st.plotly_chart(px.histogram(monte_carlo['amostras'], x=meta, nbins=50, labels={meta: nome_meta, 'count': 'Amostras'}),
+                        use_container_width=True)
+        st.dataframe(estilo_moeda(monte_carlo['percentis'], list(monte_carlo['percentis'].columns)), use_container_width=True)
+
+    st.sidebar.caption(f'Etapas recalculadas nesta execução: {len(avaliador.recalculados)} de {len(avaliador.ativos)}')
     
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,29 @@
+# Motor de simulação da folha: funções de cálculo sem dependência do Streamlit
+from simulador.acervo import (CHAVES_ACERVO, PASTA_ACERVO, assinatura_acervo, importar_manifesto, ler_acervo,
+                               ler_manifesto, particoes_acervo)
+from simulador.cache_cenarios import CacheCenarios, chave_cenario
+from simulador.carga import (TAMANHO_BLOCO, assinatura_planilha, carregar_planilha, converter_em_blocos, converter_planilha,
+                             hash_planilha, ler_arrow)
+from simulador.cenario import FolhaCenario
+from simulador.cubo import CuboFolha
+from simulador.encargos import calcular_encargos
+from simulador.esquema import ESQUEMAS, aplicar_esquema, colunas_esquema, memoria, registrar_esquema
+from simulador.execucao import Cancelado, ExecucaoEmFundo, Tarefa
+from simulador.filtros import COLUNAS_FILTRO, IndiceFiltros
+from simulador.formatacao import COLUNAS_MOEDA, estilo_moeda, formatar_moeda
+from simulador.incremental import AvaliadorIncremental
+from simulador.irpf import ANO_IRPF_PADRAO, TABELAS_IRPF, calcular_irpf, registrar_tabela_irpf
+from simulador.montecarlo import INCERTEZAS_PADRAO, PERCENTIS_PADRAO, simular_monte_carlo
+from simulador.orcamento import METAS_ORCAMENTO, REAJUSTE_SALARIOS_BASE, resolver_orcamento
+from simulador.paginacao import TAMANHO_PAGINA_PADRAO, paginar_servidores
+from simulador.projecao import REGRAS_PROGRESSAO_PADRAO, projetar
+from simulador.rubricas import (ENTRADAS_VARIAVEIS, REGIMES, GrafoRubricas, Rubrica, calcular_rubricas, compilar_regime,
+                                funcao, ponto_percentual, precalcular_fixos, produto, registrar_regime, soma)
+from simulador.sensibilidade import ROTULOS_SENSIBILIDADE, TAXAS_POR_FAIXA, analisar_sensibilidade
+from simulador.simulacao import (CONFIGURACOES_REGIME, PARAMETROS_PADRAO, SALARIOS_BASE, TAXAS_CARGO_AMC, simular,
+                                 sobrescritas_cenario)
+from simulador.sintetico import gerar_folha
+from simulador.tabelas import (CARGAS_HORARIAS, LETRAS_TABELA, TABELAS_SALARIAIS, buscar_salarios,
+                               buscar_salarios_codigos, buscar_salarios_lote, empacotar_tabelas, gerar_grade_salarios)
+from simulador.taxas import CARGO_AMC, aplicar_sobrescritas, sobrescritas_por_chave, taxas_sobrescritas
+from simulador.varredura import grade_cenarios, varrer_cenarios
@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from simulador.carga import DECIMAL_PLANILHAS, carregar_planilha
+from simulador.irpf import ANO_IRPF_PADRAO
+from simulador.rubricas import precalcular_fixos
+from simulador.simulacao import PARAMETROS_PADRAO, simular
+
+
+# Lê os cenários de um arquivo JSON (um objeto ou uma lista de objetos) ou CSV (um cenário por
+# linha, com os parâmetros nas colunas; células vazias ficam com o valor padrão)
+def ler_cenarios(caminho):
+    caminho = Path(caminho)
+    if caminho.suffix.lower() == '.csv':
+        return [{nome: valor for nome, valor in cenario.items() if pd.notna(valor)}
+                for cenario in pd.read_csv(caminho).to_dict('records')]
+    with open(caminho, encoding='utf-8') as arquivo:
+        cenarios = json.load(arquivo)
+    return cenarios if isinstance(cenarios, list) else [cenarios]
+
+
+# Grava uma linha por cenário (nome, parâmetros e totais da simulação) em CSV ou JSON,
+# conforme a extensão do arquivo de saída; sem arquivo, escreve CSV na saída padrão
+def gravar_resultados(linhas, caminho=None):
+    tabela = pd.DataFrame(linhas)
+    if caminho is None:
+        tabela.to_csv(sys.stdout, index=False)
+    elif Path(caminho).suffix.lower() == '.json':
+        tabela.to_json(caminho, orient='records', force_ascii=False, indent=2)
+    else:
+        tabela.to_csv(caminho, index=False)
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog='python -m simulador', description='Simula cenários de reestruturação salarial sem a interface.')
+    parser.add_argument('cenarios', help='arquivo JSON ou CSV com os parâmetros de cada cenário')
+    parser.add_argument('--planilha', default='planilha_impacto_salarial.xlsx', help='planilha da folha')
+    parser.add_argument('--aba', default='amc', help='aba da planilha')
+    parser.add_argument('--regime', default='amc', help="regime das rubricas ('amc' ou 'amc_percentual')")
+    parser.add_argument('--saida', help='arquivo de resultados (.csv ou .json); sem ele, CSV na saída padrão')
+    opcoes = parser.parse_args(argumentos)
+
+    # A cópia junta as colunas lidas do arquivo colunar em poucos blocos antes das rubricas novas
+    df = precalcular_fixos(carregar_planilha(opcoes.planilha, opcoes.aba, decimal=DECIMAL_PLANILHAS), opcoes.regime).copy()
+    linhas = []
+    for i, cenario in enumerate(ler_cenarios(opcoes.cenarios)):
+        cenario = dict(cenario)
+        nome = cenario.pop('nome', str(i + 1))
+        resultados = simular(cenario, df, opcoes.regime)
+        parametros = {chave: valor for chave, valor in {**PARAMETROS_PADRAO, 'ano_irpf': ANO_IRPF_PADRAO, **cenario}.items()
+                      if chave != 'sobrescritas'}
+        linhas.append({'cenario': nome, **parametros, **resultados['totais']})
+    gravar_resultados(linhas, opcoes.saida)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+
+from simulador.carga import _hash_com_indice, _preparar_para_arrow
+from simulador.esquema import ESQUEMAS, aplicar_esquema, colunas_esquema
+
+# Pasta padrão do acervo, ao lado dos dashboards
+PASTA_ACERVO = 'acervo_folhas'
+
+# Colunas das partições do acervo: cada aba importada fica em secretaria=<...>/mes=<AAAA-MM>/
+CHAVES_ACERVO = ('secretaria', 'mes')
+PARTICIONAMENTO = ds.partitioning(pa.schema([(chave, pa.string()) for chave in CHAVES_ACERVO]), flavor='hive')
+
+
+# Lê o manifesto do acervo: um JSON com a lista de abas (ou um objeto com a chave 'abas') ou um CSV
+# com uma aba por linha. Cada entrada tem 'planilha', 'aba', 'secretaria' e 'mes' (AAAA-MM) e,
+# opcionalmente, 'esquema' (nome em ESQUEMAS; por padrão o da aba, se houver) e 'decimal'. Os
+# caminhos das planilhas são relativos à pasta do manifesto.
+def ler_manifesto(caminho):
+    if os.path.splitext(caminho)[1].lower() == '.csv':
+        entradas = [{chave: valor for chave, valor in entrada.items() if pd.notna(valor)}
+                    for entrada in pd.read_csv(caminho, dtype=str).to_dict('records')]
+    else:
+        with open(caminho, encoding='utf-8') as arquivo:
+            entradas = json.load(arquivo)
+        if isinstance(entradas, dict):
+            entradas = entradas['abas']
+
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    for entrada in entradas:
+        faltando = [campo for campo in ('planilha', 'aba') + CHAVES_ACERVO if not entrada.get(campo)]
+        if faltando:
+            raise ValueError(f'Entrada do manifesto sem {faltando}: {entrada}')
+        entrada['planilha'] = os.path.join(pasta, entrada['planilha'])
+        entrada['mes'] = str(entrada['mes'])
+    return entradas
+
+
+def _esquema_entrada(entrada):
+    nome = entrada.get('esquema', entrada['aba'])
+    if nome not in ESQUEMAS and 'esquema' in entrada:
+        raise ValueError(f"Esquema desconhecido: {nome}")
+    return ESQUEMAS.get(nome)
+
+
+# Leva uma aba ao esquema comum: nomes sem espaços nas pontas, só as colunas do esquema (as que
+# faltam entram vazias), números como float e colunas sem nenhum valor como nulas. Assim os arquivos
+# de abas diferentes formam um único acervo; os tipos do esquema são aplicados na leitura.
+def _normalizar(df, esquema):
+    df = _preparar_para_arrow(df)
+    df.columns = [nome.strip() for nome in df.columns]
+    df = df.loc[:, ~df.columns.duplicated()]
+    colunas = colunas_esquema(esquema) if esquema else list(df.columns)
+    normalizado = {}
+    for coluna in colunas:
+        valores = df[coluna] if coluna in df else pd.Series(None, index=df.index, dtype=object)
+        if valores.isna().all():
+            valores = pd.Series(None, index=df.index, dtype=object)
+        elif valores.dtype.kind in 'iuf':
+            valores = valores.astype(float)
+        normalizado[coluna] = valores
+    return pd.DataFrame(normalizado, index=df.index).reset_index(drop=True)
+
+
+def _pasta_particao(pasta, entrada):
+    return os.path.join(pasta, 'dados', *(f'{chave}={quote(str(entrada[chave]), safe="")}' for chave in CHAVES_ACERVO))
+
+
+# Converte uma entrada do manifesto em um arquivo Arrow da sua partição (roda em um processo do
+# pool: a leitura do openpyxl é CPU e não libera o GIL). Devolve o caminho gravado e as linhas.
+def _importar_aba(entrada, pasta):
+    opcoes_leitura = {'decimal': entrada['decimal']} if 'decimal' in entrada else {}
+    df = _normalizar(pd.read_excel(entrada['planilha'], sheet_name=entrada['aba'], **opcoes_leitura), _esquema_entrada(entrada))
+    destino = os.path.join(_pasta_particao(pasta, entrada),
+                           f"{os.path.splitext(os.path.basename(entrada['planilha']))[0]}__{entrada['aba']}.arrow")
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    # Temporário começando com '.', que a leitura do acervo ignora
+    temporario = os.path.join(os.path.dirname(destino), '.' + os.path.basename(destino) + '.tmp')
+    feather.write_feather(df, temporario, compression='uncompressed')
+    os.replace(temporario, destino)
+    return destino, len(df)
+
+
+def _ler_indice(pasta):
+    try:
+        with open(os.path.join(pasta, 'indice.json'), encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return {}
+
+
+# Monta (ou atualiza) o acervo a partir do manifesto: as abas são lidas em paralelo em 'processos'
+# processos (por padrão um por núcleo) e gravadas nas partições secretaria/mês. O índice do
+# acervo guarda o hash de cada planilha, então só as abas de planilhas alteradas (ou novas no
+# manifesto) são relidas; recriar=True relê todas. Entradas que saíram do manifesto saem do acervo.
+# Devolve o índice: {'<planilha>::<aba>': {secretaria, mes, hash, arquivo, linhas}}.
+def importar_manifesto(manifesto, pasta=PASTA_ACERVO, processos=None, recriar=False):
+    entradas = ler_manifesto(manifesto) if isinstance(manifesto, str) else list(manifesto)
+    indice_anterior = _ler_indice(pasta)
+    indice, pendentes = {}, []
+    for entrada in entradas:
+        chave = f"{os.path.abspath(entrada['planilha'])}::{entrada['aba']}"
+        registro = {'secretaria': entrada['secretaria'], 'mes': str(entrada['mes']), 'hash': _hash_com_indice(entrada['planilha'])}
+        anterior = indice_anterior.get(chave, {})
+        if (not recriar and all(anterior.get(campo) == valor for campo, valor in registro.items())
+                and os.path.exists(anterior.get('arquivo', ''))):
+            indice[chave] = anterior
+        else:
+            indice[chave] = registro
+            pendentes.append((chave, entrada))
+
+    if pendentes:
+        with ProcessPoolExecutor(processos) as executor:
+            futuros = [(chave, executor.submit(_importar_aba, entrada, pasta)) for chave, entrada in pendentes]
+            for chave, futuro in futuros:
+                indice[chave]['arquivo'], indice[chave]['linhas'] = futuro.result()
+
+    # Arquivos que não pertencem mais a nenhuma entrada (aba removida ou mudada de partição)
+    em_uso = {os.path.abspath(registro['arquivo']) for registro in indice.values()}
+    for registro in indice_anterior.values():
+        arquivo = registro.get('arquivo', '')
+        if os.path.exists(arquivo) and os.path.abspath(arquivo) not in em_uso:
+            os.remove(arquivo)
+            # Partições que ficaram vazias também saem
+            try:
+                os.removedirs(os.path.dirname(arquivo))
+            except OSError:
+                pass
+
+    os.makedirs(pasta, exist_ok=True)
+    with open(os.path.join(pasta, 'indice.json'), 'w', encoding='utf-8') as arquivo:
+        json.dump(indice, arquivo, indent=2, ensure_ascii=False)
+    return indice
+
+
+# Assinatura do acervo (data de modificação e tamanho do índice), para os caches do Streamlit
+def assinatura_acervo(pasta=PASTA_ACERVO):
+    info = os.stat(os.path.join(pasta, 'indice.json'))
+    return info.st_mtime_ns, info.st_size
+
+
+# Partições do acervo (secretaria e mês de cada aba importada), sem ler os dados
+def particoes_acervo(pasta=PASTA_ACERVO):
+    particoes = pd.DataFrame([{chave: registro[chave] for chave in CHAVES_ACERVO} for registro in _ler_indice(pasta).values()],
+                             columns=list(CHAVES_ACERVO))
+    return particoes.drop_duplicates().sort_values(list(CHAVES_ACERVO), ignore_index=True)
+
+
+# Lê do acervo só as partições das secretarias e meses pedidos (None lê todos) e só as colunas do
+# esquema, mais 'secretaria' e 'mes'. Os arquivos são mapeados na memória, como em ler_arrow, e
+# os tipos do esquema são aplicados no fim.
+def ler_acervo(pasta=PASTA_ACERVO, secretarias=None, meses=None, esquema='amc'):
+    esquema = ESQUEMAS[esquema] if isinstance(esquema, str) else esquema
+    dados = ds.dataset(os.path.join(pasta, 'dados'), format='ipc', partitioning=PARTICIONAMENTO)
+    # As abas podem ter colunas vazias (tipo nulo) onde outras têm valores; o esquema unificado resolve
+    esquema_arrow = pa.unify_schemas([fragmento.physical_schema for fragmento in dados.get_fragments()]
+                                     + [PARTICIONAMENTO.schema])
+    dados = ds.dataset(os.path.join(pasta, 'dados'), format='ipc', partitioning=PARTICIONAMENTO, schema=esquema_arrow)
+
+    filtro = None
+    for chave, valores in zip(CHAVES_ACERVO, (secretarias, meses)):
+        if valores is not None:
+            condicao = ds.field(chave).isin([str(valor) for valor in valores])
+            filtro = condicao if filtro is None else filtro & condicao
+    # Colunas do esquema que nenhuma aba trouxe (nulas em todos os arquivos) ficam de fora
+    colunas = None
+    if esquema:
+        colunas = [nome for nome in colunas_esquema(esquema)
+                   if nome in esquema_arrow.names and esquema_arrow.field(nome).type != pa.null()] + list(CHAVES_ACERVO)
+    df = dados.to_table(columns=colunas, filter=filtro).to_pandas(split_blocks=True)
+    df = df.astype({chave: 'category' for chave in CHAVES_ACERVO})
+    return aplicar_esquema(df, esquema) if esquema else df
+
+
+# Linha de comando: python -m simulador.acervo manifesto.json [--pasta acervo_folhas] [--processos 4]
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog='python -m simulador.acervo',
+                                     description='Importa as abas de um manifesto para o acervo particionado por secretaria e mês.')
+    parser.add_argument('manifesto', help='arquivo JSON ou CSV com planilha, aba, secretaria e mes de cada aba')
+    parser.add_argument('--pasta', default=PASTA_ACERVO, help='pasta do acervo')
+    parser.add_argument('--processos', type=int, help='processos de leitura (padrão: um por núcleo)')
+    parser.add_argument('--recriar', action='store_true', help='relê todas as abas, mesmo as que não mudaram')
+    opcoes = parser.parse_args(argumentos)
+
+    indice = importar_manifesto(opcoes.manifesto, opcoes.pasta, opcoes.processos, opcoes.recriar)
+    for registro in indice.values():
+        print(f"{registro['secretaria']:<20} {registro['mes']:<8} {registro['linhas']:>9} linhas  {registro['arquivo']}",
+              file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from simulador.carga import DECIMAL_PLANILHAS, _preparar_para_arrow, carregar_planilha, ler_arrow
+from simulador.cubo import CuboFolha
+from simulador.esquema import ESQUEMAS, aplicar_esquema, colunas_esquema, memoria
+from simulador.filtros import COLUNAS_FILTRO, IndiceFiltros
+from simulador.formatacao import estilo_moeda
+from simulador.irpf import ANO_IRPF_PADRAO, calcular_irpf
+from simulador.paginacao import paginar_servidores
+from simulador.rubricas import calcular_rubricas, precalcular_fixos
+from simulador.simulacao import PARAMETROS_PADRAO, SALARIOS_BASE, calcular_impacto, contar_pessoas, simular
+from simulador.sintetico import gerar_folha
+from simulador.tabelas import buscar_salarios, empacotar_tabelas, gerar_grade_salarios
+
+TAMANHOS_PADRAO = (1_000, 10_000, 100_000, 1_000_000)
+
+
+# Roda a função 'repeticoes' vezes e devolve o último resultado e os tempos (em segundos)
+def _medir(funcao, repeticoes):
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return resultado, tempos
+
+
+# Mede cada etapa do cálculo sobre uma folha sintética de n linhas gerada a partir do modelo (lido
+# sem esquema, com todas as colunas da aba). Devolve os tempos de cada etapa e a memória da folha
+# lida por inteiro e com o esquema da aba 'amc'.
+def medir_etapas(modelo, n, repeticoes=3, semente=0):
+    etapas = {}
+    parametros = PARAMETROS_PADRAO
+
+    inicio = time.perf_counter()
+    sintetica = _preparar_para_arrow(gerar_folha(modelo, n, semente))
+    etapas['geracao'] = [time.perf_counter() - inicio]
+
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'folha.arrow')
+        feather.write_feather(sintetica, caminho, compression='uncompressed')
+        del sintetica
+        esquema = ESQUEMAS['amc']
+        memoria_antes = memoria(ler_arrow(caminho))
+        df, etapas['carga'] = _medir(lambda: aplicar_esquema(ler_arrow(caminho, colunas_esquema(esquema)), esquema), repeticoes)
+        uso_memoria = {'linhas': n, 'antes_bytes': memoria_antes, 'depois_bytes': memoria(df)}
+        df, etapas['fixos'] = _medir(lambda: precalcular_fixos(df, 'amc'), repeticoes)
+        indice, etapas['indice_filtros'] = _medir(lambda: IndiceFiltros(df), repeticoes)
+        # Filtro da barra lateral com todas as opções de cada coluna selecionadas
+        linhas, etapas['filtro'] = _medir(lambda: indice.linhas({coluna: indice.opcoes(coluna) for coluna in COLUNAS_FILTRO}),
+                                          repeticoes)
+        df = df.iloc[linhas].copy()
+
+        grades, etapas['grade_salarios'] = _medir(lambda: gerar_grade_salarios(
+            parametros['TC'], parametros['TR'], parametros['num_classes'], parametros['num_referencias'],
+            [parametros[campo] for campo in SALARIOS_BASE]), repeticoes)
+        df['Novo Salário'], etapas['novo_salario'] = _medir(lambda: buscar_salarios(
+            empacotar_tabelas(grades), df['Niv'].str.slice(0, 1), df['CH'], df['Ref']), repeticoes)
+        _, etapas['rubricas'] = _medir(lambda: calcular_rubricas(df, 'amc', {'taxa_he_noturna': parametros['taxa_he_noturna']}),
+                                       repeticoes)
+        _, etapas['irpf'] = _medir(lambda: calcular_irpf(np.column_stack([df['BASE IRPF'], df['nova_base_IRPF']]), ANO_IRPF_PADRAO),
+                                   repeticoes)
+        (_, resumo_cargos), etapas['agregados'] = _medir(lambda: (
+            contar_pessoas(df, '0996-TOT.PROVENTO'),
+            calcular_impacto(df, '0996-TOT.PROVENTO', 'novo_0996-TOT.PROVENTO')), repeticoes)
+        _, etapas['formatacao'] = _medir(lambda: (
+            estilo_moeda(resumo_cargos).to_html(),
+            estilo_moeda(paginar_servidores(df[['Nome', 'Cargo', 'CH', 'Ref', '0996-TOT.PROVENTO', 'novo_0996-TOT.PROVENTO']], 1,
+                                            ordenar_por='novo_0996-TOT.PROVENTO', decrescente=True)['pagina'],
+                         ['0996-TOT.PROVENTO', 'novo_0996-TOT.PROVENTO']).to_html()), repeticoes)
+        _, etapas['simular'] = _medir(lambda: simular({}, df), repeticoes)
+        cubo, etapas['cubo_montagem'] = _medir(lambda: CuboFolha(df), repeticoes)
+        _, etapas['cubo_simular'] = _medir(lambda: cubo.simular({}), repeticoes)
+
+    return [{'linhas': n, 'etapa': etapa, 'mediana_s': statistics.median(tempos), 'minimo_s': min(tempos),
+             'repeticoes': len(tempos)} for etapa, tempos in etapas.items()], uso_memoria
+
+
+def _ambiente():
+    return {
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+# Linha de comando: python -m simulador.benchmark [--linhas 1000 10000 ...] [--saida benchmark.json]
+# Grava o arquivo de saída depois de cada tamanho, para não perder o que já foi medido.
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog='python -m simulador.benchmark', description='Mede cada etapa do cálculo em folhas sintéticas.')
+    parser.add_argument('--linhas', type=int, nargs='+', default=list(TAMANHOS_PADRAO), help='tamanhos das folhas sintéticas')
+    parser.add_argument('--repeticoes', type=int, default=3, help='repetições de cada etapa')
+    parser.add_argument('--planilha', default='planilha_impacto_salarial.xlsx', help='planilha usada como modelo')
+    parser.add_argument('--aba', default='amc', help='aba da planilha usada como modelo')
+    parser.add_argument('--saida', default='benchmark.json', help='arquivo JSON com os resultados')
+    opcoes = parser.parse_args(argumentos)
+
+    modelo = carregar_planilha(opcoes.planilha, opcoes.aba, esquema=False, decimal=DECIMAL_PLANILHAS)
+    relatorio = {'ambiente': _ambiente(), 'resultados': [], 'memoria': []}
+    for n in opcoes.linhas:
+        resultados, uso_memoria = medir_etapas(modelo, n, opcoes.repeticoes)
+        relatorio['resultados'] += resultados
+        relatorio['memoria'].append(uso_memoria)
+        for resultado in resultados:
+            print(f"{n:>9} {resultado['etapa']:<15} {resultado['mediana_s'] * 1000:10.2f} ms", file=sys.stderr)
+        print(f"{n:>9} {'memoria':<15} {uso_memoria['antes_bytes'] / 2**20:10.2f} MB -> {uso_memoria['depois_bytes'] / 2**20:.2f} MB",
+              file=sys.stderr)
+        with open(opcoes.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+
+from simulador.execucao import Cancelado
+from simulador.irpf import ANO_IRPF_PADRAO
+from simulador.simulacao import PARAMETROS_PADRAO
+
+CAPACIDADE_PADRAO = 32
+
+
+# Forma canônica de um valor de entrada: dicionários com as chaves ordenadas, listas viram tuplas e
+# números viram float (2 e 2.0 são o mesmo cenário)
+def _canonico(valor):
+    if isinstance(valor, dict):
+        return tuple(sorted((str(chave), _canonico(item)) for chave, item in valor.items()))
+    if isinstance(valor, (list, tuple)):
+        return tuple(_canonico(item) for item in valor)
+    if isinstance(valor, (bool, np.bool_)):
+        return bool(valor)
+    if isinstance(valor, (int, float, np.number)):
+        return float(valor)
+    return valor
+
+
+# Chave de um cenário: hash de todos os parâmetros (com os padrões preenchidos, como em simular),
+# do regime, da versão da folha (por exemplo assinatura_planilha) e dos filtros. Nos filtros, a
+# ordem dos valores escolhidos não importa e uma coluna sem valores é o mesmo que coluna ausente.
+def chave_cenario(parametros, regime='amc', chave_folha=None, selecoes=None):
+    parametros = {**PARAMETROS_PADRAO, 'ano_irpf': ANO_IRPF_PADRAO, **parametros}
+    selecoes = {coluna: sorted(map(repr, valores)) for coluna, valores in (selecoes or {}).items() if valores is not None and len(valores)}
+    conteudo = repr((_canonico(parametros), regime, _canonico(chave_folha), _canonico(selecoes)))
+    return hashlib.blake2b(conteudo.encode(), digest_size=16).hexdigest()
+
+
+# Cache dos resultados completos de simulação, compartilhado pelo processo (por exemplo com
+# st.cache_resource): guarda até 'capacidade' cenários e descarta o usado há mais tempo. Pedidos
+# simultâneos da mesma chave calculam uma vez só; os demais esperam o primeiro e recebem o mesmo
+# resultado (ou o mesmo erro, exceto Cancelado, que faz o próximo da fila calcular). Os resultados
+# são compartilhados e não devem ser alterados.
+class CacheCenarios:
+
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        self.capacidade = capacidade
+        self.resultados = OrderedDict()
+        self.em_calculo = {}
+        self.trava = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def __len__(self):
+        return len(self.resultados)
+
+    def __contains__(self, chave):
+        return chave in self.resultados
+
+    # Resultado da chave, calculado com funcao() só se ainda não estiver no cache nem em cálculo
+    def obter(self, chave, funcao):
+        with self.trava:
+            if chave in self.resultados:
+                self.resultados.move_to_end(chave)
+                self.acertos += 1
+                return self.resultados[chave]
+            futuro = self.em_calculo.get(chave)
+            calcular = futuro is None
+            if calcular:
+                futuro = self.em_calculo[chave] = Future()
+                self.faltas += 1
+        if not calcular:
+            try:
+                return futuro.result()
+            except Cancelado:
+                # Quem calculava desistiu (ver simulador.execucao); o cálculo passa para esta chamada
+                return self.obter(chave, funcao)
+
+        try:
+            resultado = funcao()
+        except BaseException as erro:
+            with self.trava:
+                del self.em_calculo[chave]
+            futuro.set_exception(erro)
+            raise
+        with self.trava:
+            del self.em_calculo[chave]
+            self.resultados[chave] = resultado
+            while len(self.resultados) > self.capacidade:
+                self.resultados.popitem(last=False)
+        futuro.set_result(resultado)
+        return resultado
+
+    # Esvazia o cache (por exemplo quando a planilha é recarregada); cálculos em andamento terminam
+    # normalmente, mas seus resultados entram no cache já vazio
+    def limpar(self):
+        with self.trava:
+            self.resultados.clear()
@@ -0,0 +1,325 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from pandas.io.parsers import TextParser
+
+from simulador.esquema import ESQUEMAS, aplicar_esquema, colunas_esquema
+
+# Pasta, ao lado da planilha, onde ficam as cópias colunares (Arrow IPC) de cada aba
+PASTA_CACHE = '.cache_planilhas'
+
+# Linhas da planilha convertidas por vez na conversão em blocos
+TAMANHO_BLOCO = 50_000
+
+# Separador decimal dos números guardados como texto nas planilhas da prefeitura. Entra no nome da
+# cópia colunar: a linha de comando e os dashboards precisam usar o mesmo para reaproveitá-la.
+DECIMAL_PLANILHAS = ','
+
+
+# Assinatura barata da planilha (data de modificação e tamanho). Serve como chave do cache do
+# Streamlit para que uma planilha alterada seja relida sem reiniciar o servidor.
+def assinatura_planilha(caminho):
+    info = os.stat(caminho)
+    return info.st_mtime_ns, info.st_size
+
+
+# Hash SHA-256 do conteúdo da planilha, lido em blocos para não carregar o arquivo inteiro
+def hash_planilha(caminho):
+    sha = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(1 << 20), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _pasta_cache(caminho):
+    return os.path.join(os.path.dirname(os.path.abspath(caminho)), PASTA_CACHE)
+
+
+def _prefixo_cache(caminho, aba):
+    return f'{os.path.splitext(os.path.basename(caminho))[0]}__{aba}__'
+
+
+# Nome da cópia colunar de uma versão da planilha: além da aba e do hash do conteúdo, um resumo das
+# opções de leitura (decimal, thousands...), já que a mesma aba lida com opções diferentes dá
+# tabelas diferentes. Devolve o caminho e o início comum às cópias dessa versão, com qualquer opção.
+def _destino_cache(caminho, aba, hash_atual, opcoes_leitura):
+    versao = f'{_prefixo_cache(caminho, aba)}{hash_atual[:16]}__'
+    resumo_opcoes = hashlib.sha256(repr(sorted(opcoes_leitura.items())).encode()).hexdigest()[:8]
+    return os.path.join(_pasta_cache(caminho), f'{versao}{resumo_opcoes}.arrow'), versao
+
+
+# Apaga as cópias (e conversões em blocos interrompidas) de versões antigas da aba; as da versão
+# atual, com outras opções de leitura, ficam
+def _apagar_versoes_antigas(caminho, aba, versao):
+    pasta = _pasta_cache(caminho)
+    prefixo = _prefixo_cache(caminho, aba)
+    for nome in os.listdir(pasta):
+        if nome.startswith(prefixo) and not nome.startswith(versao):
+            caminho_antigo = os.path.join(pasta, nome)
+            if os.path.isdir(caminho_antigo):
+                shutil.rmtree(caminho_antigo, ignore_errors=True)
+            elif nome.endswith('.arrow'):
+                os.remove(caminho_antigo)
+
+
+# Devolve o hash da planilha reaproveitando o último valor calculado enquanto a assinatura
+# (mtime e tamanho) não mudar; assim só relemos o arquivo inteiro quando ele é alterado
+def _hash_com_indice(caminho):
+    pasta = _pasta_cache(caminho)
+    caminho_indice = os.path.join(pasta, 'indice.json')
+    try:
+        with open(caminho_indice, encoding='utf-8') as arquivo:
+            indice = json.load(arquivo)
+    except (OSError, ValueError):
+        indice = {}
+
+    chave = os.path.basename(caminho)
+    assinatura = list(assinatura_planilha(caminho))
+    if indice.get(chave, {}).get('assinatura') == assinatura:
+        return indice[chave]['hash']
+
+    hash_atual = hash_planilha(caminho)
+    indice[chave] = {'assinatura': assinatura, 'hash': hash_atual}
+    os.makedirs(pasta, exist_ok=True)
+    _gravar_json(caminho_indice, indice)
+    return hash_atual
+
+
+# O formato Arrow exige nomes de coluna em texto e colunas de um único tipo; colunas de texto
+# com números misturados (por exemplo 0 em 'Grau de instrução') viram texto
+def _preparar_para_arrow(df):
+    df = df.rename(columns=str)
+    for coluna in df.columns[df.dtypes == object]:
+        valores = df[coluna].dropna()
+        if valores.map(type).nunique() > 1:
+            df[coluna] = df[coluna].where(df[coluna].isna(), df[coluna].astype(str))
+    return df
+
+
+# Converte a aba da planilha em um arquivo Arrow ao lado dela, identificado pelo nome da aba, pelo
+# hash do conteúdo e pelas opções de leitura (ver _destino_cache), e apaga as cópias de versões
+# antigas da mesma aba
+def converter_planilha(caminho, aba, hash_atual=None, **opcoes_leitura):
+    hash_atual = hash_atual or hash_planilha(caminho)
+    pasta = _pasta_cache(caminho)
+    destino, versao = _destino_cache(caminho, aba, hash_atual, opcoes_leitura)
+
+    df = _preparar_para_arrow(pd.read_excel(caminho, sheet_name=aba, **opcoes_leitura))
+    os.makedirs(pasta, exist_ok=True)
+    temporario = destino + '.tmp'
+    # Sem compressão para que a leitura possa mapear o arquivo na memória sem cópia
+    feather.write_feather(df, temporario, compression='uncompressed')
+    os.replace(temporario, destino)
+    _apagar_versoes_antigas(caminho, aba, versao)
+    return destino
+
+
+# Valor de uma célula como o pandas o lê (ver OpenpyxlReader do pandas): vazia vira '', erro vira
+# NaN e número inteiro guardado como float vira int
+def _valor_celula(celula):
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    if celula.value is None:
+        return ''
+    if celula.data_type == TYPE_ERROR:
+        return np.nan
+    if celula.data_type == TYPE_NUMERIC:
+        inteiro = int(celula.value)
+        return inteiro if inteiro == celula.value else float(celula.value)
+    return celula.value
+
+
+# Tipo final de uma coluna a partir dos tipos que ela teve em cada bloco: blocos vazios (tipo nulo)
+# não contam, números inteiros e reais viram float e tipos incompatíveis viram texto, como faz
+# _preparar_para_arrow com a aba lida inteira
+def _unificar_tipos(tipos):
+    tipos = {tipo for tipo in tipos if tipo != pa.null()}
+    if len(tipos) <= 1:
+        return tipos.pop() if tipos else pa.null()
+    if all(pa.types.is_integer(tipo) or pa.types.is_floating(tipo) for tipo in tipos):
+        return pa.float64()
+    return pa.string()
+
+
+# Grava o JSON em um temporário próprio da thread e o troca pelo arquivo de uma vez: uma falha no
+# meio ou outra sessão gravando ao mesmo tempo não deixam o arquivo pela metade
+def _gravar_json(caminho, conteudo):
+    temporario = f'{caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporario, 'w', encoding='utf-8') as arquivo:
+        json.dump(conteudo, arquivo, ensure_ascii=False)
+    os.replace(temporario, caminho)
+
+
+# Converte a aba da planilha no mesmo arquivo Arrow de converter_planilha, mas sem carregar a aba
+# inteira: as linhas são lidas uma a uma pelo modo somente leitura do openpyxl e convertidas em
+# blocos de 'tamanho_bloco' linhas, cada um gravado em um arquivo parcial. No fim os blocos são
+# reunidos no arquivo final, um de cada vez, com os tipos unificados. A memória usada depende do
+# tamanho do bloco, não da planilha.
+#
+# O andamento fica em estado.json, na pasta dos blocos; se a conversão for interrompida, a próxima
+# chamada (para a mesma versão da planilha e as mesmas opções) continua do último bloco gravado.
+# ao_progredir(linhas, total), se informado, é chamado a cada bloco com as linhas já convertidas e
+# o total de linhas declarado na planilha (None se ela não declarar). As opções de leitura são as
+# do read_excel aceitas pelo leitor de texto do pandas (decimal, thousands, na_values...); as
+# células além da última coluna do cabeçalho são ignoradas.
+def converter_em_blocos(caminho, aba, hash_atual=None, tamanho_bloco=TAMANHO_BLOCO, ao_progredir=None, **opcoes_leitura):
+    import openpyxl
+
+    hash_atual = hash_atual or hash_planilha(caminho)
+    destino, versao = _destino_cache(caminho, aba, hash_atual, opcoes_leitura)
+    pasta_blocos = destino + '.blocos'
+    caminho_estado = os.path.join(pasta_blocos, 'estado.json')
+
+    try:
+        with open(caminho_estado, encoding='utf-8') as arquivo:
+            estado = json.load(arquivo)
+    except (OSError, ValueError):
+        estado = None
+    if estado is None or estado['opcoes'] != repr(sorted(opcoes_leitura.items())):
+        shutil.rmtree(pasta_blocos, ignore_errors=True)
+        estado = {'opcoes': repr(sorted(opcoes_leitura.items())), 'linhas': 0, 'blocos': 0, 'concluido': False}
+    os.makedirs(pasta_blocos, exist_ok=True)
+
+    if not estado['concluido']:
+        livro = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+        try:
+            planilha = livro[aba]
+            total = planilha.max_row - 1 if planilha.max_row else None
+            # As dimensões declaradas podem estar erradas; sem elas o openpyxl lê até a última linha
+            planilha.reset_dimensions()
+            linhas_planilha = planilha.rows
+            cabecalho = [_valor_celula(celula) for celula in next(linhas_planilha, ())]
+            while cabecalho and cabecalho[-1] == '':
+                cabecalho.pop()
+            nomes = estado['nomes'] = list(TextParser([cabecalho], header=0).read().columns)
+            # Linhas já convertidas antes da interrupção (o openpyxl ainda as percorre, mas sem converter)
+            linhas_planilha = islice(linhas_planilha, estado['linhas'], None)
+
+            bloco, vazias, lidas = [], 0, estado['linhas']
+            for linha in linhas_planilha:
+                lidas += 1
+                valores = [_valor_celula(celula) for celula in linha[:len(nomes)]]
+                if not any(valor != '' for valor in valores):
+                    # Linhas vazias só entram se houver dados depois delas, como no read_excel
+                    vazias += 1
+                    continue
+                bloco += [[''] * len(nomes)] * vazias + [valores + [''] * (len(nomes) - len(valores))]
+                vazias = 0
+                if len(bloco) >= tamanho_bloco:
+                    _gravar_bloco(bloco, nomes, pasta_blocos, estado, lidas, opcoes_leitura)
+                    bloco = []
+                    if ao_progredir:
+                        ao_progredir(estado['linhas'], total)
+            if bloco:
+                _gravar_bloco(bloco, nomes, pasta_blocos, estado, lidas - vazias, opcoes_leitura)
+        finally:
+            livro.close()
+        estado['concluido'] = True
+        _gravar_json(caminho_estado, estado)
+        if ao_progredir:
+            ao_progredir(estado['linhas'], total)
+
+    _reunir_blocos(pasta_blocos, estado['blocos'], estado['nomes'], destino)
+    shutil.rmtree(pasta_blocos, ignore_errors=True)
+    _apagar_versoes_antigas(caminho, aba, versao)
+    return destino
+
+
+# Grava um bloco de linhas já convertidas em células e registra no estado até que linha da planilha
+# a conversão chegou. Os tipos de cada coluna são inferidos como no read_excel.
+def _gravar_bloco(bloco, nomes, pasta_blocos, estado, lidas, opcoes_leitura):
+    df = _preparar_para_arrow(TextParser(bloco, names=nomes, header=None, skip_blank_lines=False, **opcoes_leitura).read())
+    arquivo = os.path.join(pasta_blocos, f"{estado['blocos']:06d}.arrow")
+    feather.write_feather(df, arquivo + '.tmp', compression='uncompressed')
+    os.replace(arquivo + '.tmp', arquivo)
+    estado['blocos'] += 1
+    estado['linhas'] = lidas
+    _gravar_json(os.path.join(pasta_blocos, 'estado.json'), estado)
+
+
+# Junta os blocos gravados em um único arquivo Arrow, convertendo cada coluna para o tipo unificado
+# de todos os blocos. Cada bloco é mapeado na memória e escrito antes do próximo ser lido.
+def _reunir_blocos(pasta_blocos, quantidade, nomes, destino):
+    arquivos = [os.path.join(pasta_blocos, f'{numero:06d}.arrow') for numero in range(quantidade)]
+    esquemas = [feather.read_table(arquivo, memory_map=True).schema for arquivo in arquivos]
+    esquema = pa.schema([(str(nome), _unificar_tipos(esquema_bloco.field(str(nome)).type for esquema_bloco in esquemas))
+                         for nome in nomes])
+    temporario = destino + '.tmp'
+    with pa.OSFile(temporario, 'wb') as saida, pa.ipc.new_file(saida, esquema) as escritor:
+        for arquivo in arquivos:
+            tabela = feather.read_table(arquivo, memory_map=True).select(esquema.names)
+            escritor.write_table(tabela.replace_schema_metadata(None).cast(esquema))
+    os.replace(temporario, destino)
+
+
+# Carrega uma aba da planilha a partir da cópia colunar, criando-a na primeira vez ou quando a
+# planilha muda. recriar=True força a conversão mesmo com o cache em dia. O esquema (ver
+# simulador.esquema) define as colunas lidas e os tipos; por padrão é o declarado para a aba em
+# ESQUEMAS e, se não houver, todas as colunas são lidas como estão (esquema=False faz o mesmo).
+# em_blocos=True faz a conversão com converter_em_blocos, para planilhas grandes demais para a
+# memória (ou que tiveram a conversão interrompida).
+def carregar_planilha(caminho, aba, recriar=False, esquema=None, em_blocos=False, **opcoes_leitura):
+    hash_atual = _hash_com_indice(caminho)
+    destino, _ = _destino_cache(caminho, aba, hash_atual, opcoes_leitura)
+    if recriar or not os.path.exists(destino):
+        if em_blocos:
+            converter_em_blocos(caminho, aba, hash_atual, **opcoes_leitura)
+        else:
+            converter_planilha(caminho, aba, hash_atual, **opcoes_leitura)
+    if esquema is None:
+        esquema = ESQUEMAS.get(aba)
+    if not esquema:
+        return ler_arrow(destino)
+    return aplicar_esquema(ler_arrow(destino, colunas_esquema(esquema)), esquema)
+
+
+# Lê um arquivo Arrow mapeando-o na memória; cada coluna vira um bloco próprio do pandas, sem
+# juntar tudo em uma cópia consolidada. Os nomes das colunas perdem os espaços das pontas (a
+# planilha traz alguns completados com centenas de espaços) e, com 'colunas', só essas são
+# convertidas para o pandas, na ordem do arquivo.
+def ler_arrow(caminho, colunas=None):
+    tabela = feather.read_table(caminho, memory_map=True)
+    tabela = tabela.rename_columns([str(nome).strip() for nome in tabela.column_names])
+    if colunas is not None:
+        colunas = set(colunas)
+        tabela = tabela.select([i for i, nome in enumerate(tabela.column_names) if nome in colunas])
+    return tabela.to_pandas(split_blocks=True)
+
+
+# Linha de comando: python -m simulador.carga folha_geral.xlsx folha_geral
+# Converte a aba em blocos antes de abrir o dashboard, mostrando o andamento; interrompida, a
+# conversão continua de onde parou na próxima execução.
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(prog='python -m simulador.carga',
+                                     description='Converte uma aba da planilha para a cópia colunar lida pelos dashboards.')
+    parser.add_argument('planilha', help='arquivo .xlsx')
+    parser.add_argument('aba', help='nome da aba')
+    parser.add_argument('--bloco', type=int, default=TAMANHO_BLOCO, help='linhas convertidas por vez')
+    parser.add_argument('--decimal', default=DECIMAL_PLANILHAS, help='separador decimal dos números guardados como texto')
+    parser.add_argument('--recriar', action='store_true', help='converte de novo mesmo com a cópia em dia')
+    opcoes = parser.parse_args(argumentos)
+
+    def mostrar(linhas, total):
+        print(f'\r{linhas} de {total if total is not None else "?"} linhas', end='', file=sys.stderr, flush=True)
+
+    hash_atual = _hash_com_indice(opcoes.planilha)
+    destino, _ = _destino_cache(opcoes.planilha, opcoes.aba, hash_atual, {'decimal': opcoes.decimal})
+    if opcoes.recriar or not os.path.exists(destino):
+        destino = converter_em_blocos(opcoes.planilha, opcoes.aba, hash_atual, opcoes.bloco, mostrar, decimal=opcoes.decimal)
+        print(file=sys.stderr)
+    print(destino, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
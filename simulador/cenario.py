@@ -0,0 +1,49 @@
+import pandas as pd
+
+
+# Folha de um cenário: a folha base, compartilhada entre cenários (e entre sessões do dashboard) e
+# nunca alterada, mais uma camada só com as colunas que o cenário sobrescreve ou calcula (Ref com o
+# enquadramento, taxas REF-*, Novo Salário, rubricas novas, IRPF). A leitura de uma coluna procura
+# primeiro na camada e depois na base; a gravação só mexe na camada. Um cenário ocupa então
+# memória proporcional às colunas alteradas, e não à folha inteira.
+class FolhaCenario:
+
+    def __init__(self, base):
+        self.base = base
+        self.camada = {}
+
+    @property
+    def index(self):
+        return self.base.index
+
+    @property
+    def columns(self):
+        return self.base.columns.append(pd.Index([nome for nome in self.camada if nome not in self.base.columns]))
+
+    def __len__(self):
+        return len(self.base)
+
+    def __contains__(self, nome):
+        return nome in self.camada or nome in self.base
+
+    # Uma coluna (Series) ou, com uma lista de nomes, um DataFrame só com essas colunas
+    def __getitem__(self, nome):
+        if isinstance(nome, list):
+            return self.quadro(nome)
+        if nome in self.camada:
+            return self.camada[nome]
+        return self.base[nome]
+
+    def __setitem__(self, nome, valores):
+        if not isinstance(valores, pd.Series):
+            valores = pd.Series(valores, index=self.base.index, name=nome, copy=False)
+        self.camada[nome] = valores
+
+    # DataFrame com as colunas pedidas (todas, por padrão), sem copiar os dados da base nem da camada
+    def quadro(self, colunas=None):
+        if colunas is None:
+            df = self.base.copy(deep=False)
+            for nome, valores in self.camada.items():
+                df[nome] = valores
+            return df
+        return pd.DataFrame({nome: self[nome] for nome in colunas}, copy=False)
@@ -0,0 +1,334 @@
+import numpy as np
+import pandas as pd
+
+from simulador.filtros import COLUNAS_FILTRO, IndiceFiltros
+from simulador.incremental import AvaliadorIncremental
+from simulador.irpf import ANO_IRPF_PADRAO, calcular_irpf
+from simulador.rubricas import REGIMES, GrafoRubricas, _calcular_rubrica
+from simulador.simulacao import (CONFIGURACOES_REGIME, GRATIFICACOES_COMPARADAS, PARAMETROS_PADRAO, SALARIOS_BASE, TAXAS_CARGO_AMC,
+                                 calcular_impacto, contar_pessoas, montar_resultados, simular, sobrescritas_cenario)
+from simulador.tabelas import _codigos_tabela, buscar_salarios_codigos, empacotar_tabelas, gerar_grade_salarios
+from simulador.taxas import taxas_sobrescritas
+
+# Colunas que definem uma célula do cubo: as dos filtros, as das tabelas por cargo, carga horária
+# e Ref e as chaves das sobrescritas de taxa (grau de instrução para o ITA, enquadramento do GEEF)
+CHAVES_CUBO = ('Ambiente', 'Cat', 'Niv', 'CH', 'Ref', 'Cargo', 'Grau de instrução', 'Enquadramento do GEEF')
+
+# Taxas que um cenário pode sobrescrever. O valor atual de cada uma também entra na chave da
+# célula, então depois das sobrescritas a taxa continua igual para todos os servidores da célula.
+TAXAS_CUBO = tuple(TAXAS_CARGO_AMC.values()) + ('REF-ITA', 'REF-GEEF-AMC')
+
+# Linhas expandidas de cada vez na montagem do cubo (limita a memória dos coeficientes)
+TAMANHO_BLOCO_CUBO = 50_000
+
+# Termo constante de um polinômio
+CONSTANTE = ((), None)
+
+
+# Os polinômios das rubricas são dicionários {(variáveis, rubrica não linear): coeficiente}. As
+# variáveis ('Novo Salário', taxas de TAXAS_CUBO, taxa_he_noturna) são constantes dentro de uma
+# célula; o coeficiente é um escalar ou um array com um valor por linha, vindo das colunas fixas
+# da folha. A rubrica não linear (arredondamento, função, produto de duas delas) é calculada
+# linha a linha em cada cenário e entra no termo como mais um fator.
+def _somar_polinomios(polinomios, pesos):
+    resultado = {}
+    for polinomio, peso in zip(polinomios, pesos):
+        for termo, coeficiente in polinomio.items():
+            resultado[termo] = resultado.get(termo, 0) + (coeficiente if peso == 1 else coeficiente * peso)
+    return resultado
+
+
+# Produto de dois polinômios; None se algum termo juntaria duas rubricas não lineares
+def _multiplicar_polinomios(a, b):
+    resultado = {}
+    for (variaveis_a, nao_linear_a), coeficiente_a in a.items():
+        for (variaveis_b, nao_linear_b), coeficiente_b in b.items():
+            if nao_linear_a and nao_linear_b:
+                return None
+            termo = (tuple(sorted(variaveis_a + variaveis_b)), nao_linear_a or nao_linear_b)
+            resultado[termo] = resultado.get(termo, 0) + coeficiente_a * coeficiente_b
+    return resultado
+
+
+# Polinômio de uma rubrica a partir dos polinômios das entradas, ou None quando a rubrica não é
+# polinomial nas variáveis (arredondamento, função, divisor variável)
+def _expandir(rubrica, polinomio_de):
+    if rubrica.operacao == 'soma':
+        return _somar_polinomios([polinomio_de(entrada) for entrada in rubrica.entradas], rubrica.pesos)
+    if rubrica.operacao != 'produto' or rubrica.casas is not None:
+        return None
+    fator = rubrica.constante
+    for divisor in rubrica.divisores:
+        polinomio = polinomio_de(divisor)
+        if set(polinomio) != {CONSTANTE}:
+            return None
+        fator = fator / polinomio[CONSTANTE]
+    resultado = {termo: coeficiente * fator for termo, coeficiente in polinomio_de(rubrica.entradas[0]).items()}
+    for entrada in rubrica.entradas[1:]:
+        resultado = _multiplicar_polinomios(resultado, polinomio_de(entrada))
+        if resultado is None:
+            return None
+    return resultado
+
+
+# Linhas em que o polinômio pode ser diferente de zero
+def _nao_nulo(polinomio, n):
+    mascara = np.zeros(n, dtype=bool)
+    for coeficiente in polinomio.values():
+        mascara |= np.broadcast_to(np.asarray(coeficiente) != 0, (n,))
+    return mascara
+
+
+# Coeficientes do polinômio só nas linhas da máscara, sempre como arrays
+def _restringir(polinomio, mascara):
+    return {termo: np.broadcast_to(coeficiente, mascara.shape)[mascara] for termo, coeficiente in polinomio.items()}
+
+
+# Variáveis e rubricas não lineares de que um polinômio depende
+def _dependencias(polinomio):
+    return sorted({nome for variaveis, nao_linear in polinomio for nome in variaveis + ((nao_linear,) if nao_linear else ())})
+
+
+# Cubo de agregação da folha: os servidores são agrupados em células com os mesmos valores de
+# CHAVES_CUBO, das taxas de TAXAS_CUBO e da tabela salarial efetiva. Dentro de uma célula o novo
+# salário e as taxas sobrescritas são iguais para todos, então cada rubrica somada na célula é um
+# polinômio nessas variáveis com coeficientes somados uma vez na carga; a cada cenário as somas de
+# todas as células saem de poucas operações sobre alguns milhares de células. Os totais filtrados
+# e as tabelas por cargo vêm das células; o IRPF (faixas), as rubricas arredondadas e a tabela de
+# servidores continuam linha a linha.
+class CuboFolha:
+
+    def __init__(self, df, regime='amc', tamanho_bloco=TAMANHO_BLOCO_CUBO):
+        self.df = df
+        self.regime = regime
+        self.coluna_anterior, self.coluna_nova = CONFIGURACOES_REGIME[regime]['remuneracao']
+        self.taxas = [coluna for coluna in TAXAS_CUBO if coluna in df]
+        self.variaveis = ('Novo Salário', 'taxa_he_noturna') + tuple(self.taxas)
+
+        codigo_letra, codigo_ch = _codigos_tabela(df['Niv'].str.slice(0, 1), df['CH'])
+        chaves = df[list(CHAVES_CUBO) + self.taxas].assign(_letra=codigo_letra, _ch=codigo_ch)
+        self.celula = chaves.groupby(list(chaves.columns), dropna=False, sort=False, observed=True).ngroup().to_numpy()
+        _, primeiras = np.unique(self.celula, return_index=True)
+        self.celulas = chaves.iloc[primeiras].reset_index(drop=True)
+        self.n_celulas = len(self.celulas)
+
+        # Quantidade de servidores, nomes preenchidos e somas das colunas atuais de cada célula
+        self.celulas['Quantidade'] = np.bincount(self.celula, minlength=self.n_celulas)
+        self.celulas['Nome'] = np.bincount(self.celula, df['Nome'].notna().to_numpy(), minlength=self.n_celulas).astype(np.int64)
+        for coluna in [self.coluna_anterior, 'IPM PREVFOR-PATRONAL', 'IPM PREVFOR-SERVIDOR'] + \
+                [anterior for anterior, _ in GRATIFICACOES_COMPARADAS.values()]:
+            self.celulas[coluna] = self._somar_linhas(df[coluna].to_numpy(dtype=float))
+
+        self.indice = IndiceFiltros(self.celulas, [coluna for coluna in COLUNAS_FILTRO if coluna in self.celulas])
+        self._expandir_rubricas(tamanho_bloco)
+        self._irpf_anterior = {}
+
+    def _somar_linhas(self, valores, linhas=None):
+        celulas = self.celula if linhas is None else self.celula[linhas]
+        return np.bincount(celulas, np.nan_to_num(valores), minlength=self.n_celulas)
+
+    # Expande as rubricas do regime em polinômios, bloco a bloco de linhas, e guarda:
+    #  - somas: para cada rubrica somada nas células, os coeficientes já somados por célula (os
+    #    termos com rubrica não linear ficam por linha, só nas linhas em que ela pode ser != 0)
+    #  - por_linha: os polinômios da base do IRPF e da remuneração nova, com coeficientes por linha
+    #  - nao_lineares: rubrica, linhas e polinômios das entradas de cada rubrica não linear
+    def _expandir_rubricas(self, tamanho_bloco):
+        grafo = GrafoRubricas(REGIMES[self.regime])
+        self.saidas = [self.coluna_nova, 'nova_IPM PREVFOR-PATRONAL', 'nova_IPM PREVFOR-SERVIDOR'] + \
+            [nova for _, nova in GRATIFICACOES_COMPARADAS.values()]
+        saidas_linha = ['nova_base_IRPF', self.coluna_nova]
+        blocos_somas = {saida: {} for saida in self.saidas}
+        blocos_linha = {saida: {} for saida in saidas_linha}
+        blocos_nao_lineares = {}
+
+        n = len(self.df)
+        for inicio in range(0, n, tamanho_bloco):
+            fim = min(inicio + tamanho_bloco, n)
+            celula = self.celula[inicio:fim]
+            polinomios, suportes = {}, {}
+
+            def polinomio_de(nome):
+                nome = grafo.apelidos.get(nome, nome)
+                if nome not in polinomios:
+                    if nome in self.variaveis:
+                        polinomios[nome] = {((nome,), None): 1.0}
+                    else:
+                        polinomios[nome] = {CONSTANTE: self.df[nome].iloc[inicio:fim].to_numpy(dtype=float)}
+                return polinomios[nome]
+
+            for rubrica in grafo.ordem:
+                polinomio = _expandir(rubrica, polinomio_de)
+                if polinomio is None:
+                    suporte = np.ones(fim - inicio, dtype=bool)
+                    if rubrica.operacao == 'produto':
+                        for entrada in rubrica.entradas:
+                            suporte &= _nao_nulo(polinomio_de(entrada), fim - inicio)
+                    suportes[rubrica.nome] = suporte
+                    bloco = blocos_nao_lineares.setdefault(rubrica.nome, (rubrica, [], {}))
+                    bloco[1].append(inicio + np.flatnonzero(suporte))
+                    for entrada in dict.fromkeys(rubrica.entradas + rubrica.divisores):
+                        for termo, coeficientes in _restringir(polinomio_de(entrada), suporte).items():
+                            bloco[2].setdefault(entrada, {}).setdefault(termo, []).append(coeficientes)
+                    polinomio = {((), rubrica.nome): 1.0}
+                polinomios[rubrica.nome] = polinomio
+
+            for saida in self.saidas:
+                polinomio = polinomio_de(saida)
+                # Linhas com algum coeficiente NaN ficam fora da soma, como no sum() do pandas
+                validas = ~np.logical_or.reduce([np.isnan(np.broadcast_to(c, celula.shape)) for c in polinomio.values()])
+                for termo, coeficiente in polinomio.items():
+                    coeficiente = np.where(validas, coeficiente, 0.0)
+                    if termo[1] is None:
+                        soma = np.bincount(celula, coeficiente, minlength=self.n_celulas)
+                        blocos_somas[saida][termo] = blocos_somas[saida].get(termo, 0) + soma
+                    else:
+                        blocos_somas[saida].setdefault(termo, []).append(coeficiente[suportes[termo[1]]])
+            for saida in saidas_linha:
+                for termo, coeficiente in polinomio_de(saida).items():
+                    blocos_linha[saida].setdefault(termo, []).append(np.broadcast_to(coeficiente, celula.shape))
+
+        def juntar(partes):
+            return np.concatenate(partes) if isinstance(partes, list) else partes
+
+        self.somas = {saida: {termo: juntar(partes) for termo, partes in termos.items()} for saida, termos in blocos_somas.items()}
+        self.por_linha = {saida: {termo: np.concatenate(partes) for termo, partes in termos.items()}
+                          for saida, termos in blocos_linha.items()}
+        self.nao_lineares = {nome: (rubrica, np.concatenate(linhas), {entrada: {termo: np.concatenate(partes) for termo, partes in termos.items()}
+                                                                     for entrada, termos in entradas.items()})
+                             for nome, (rubrica, linhas, entradas) in blocos_nao_lineares.items()}
+
+    # Máscara das células selecionadas por um dicionário {coluna: valores aceitos}; colunas sem
+    # valores (lista vazia ou None) não filtram. As colunas de COLUNAS_FILTRO usam o índice de
+    # bitsets das células; as demais, isin sobre as células.
+    def selecionar(self, selecoes=None):
+        selecoes = selecoes or {}
+        mascara = self.indice.selecionar({coluna: valores for coluna, valores in selecoes.items() if coluna in self.indice.categorias})
+        for coluna, valores in selecoes.items():
+            if coluna not in self.indice.categorias and valores is not None and len(valores):
+                mascara &= self.celulas[coluna].isin(valores).to_numpy()
+        return mascara
+
+    # Linhas da folha que estão nas células selecionadas, na ordem da folha
+    def linhas(self, mascara):
+        if mascara.all():
+            return np.arange(len(self.df))
+        return np.flatnonzero(mascara[self.celula])
+
+    # O cubo só resolve sobrescritas de taxas de TAXAS_CUBO por colunas que fazem parte da chave
+    def suporta(self, sobrescritas):
+        return all(rubrica in self.taxas and coluna_chave in self.celulas for rubrica, coluna_chave, _, _ in sobrescritas)
+
+    # Valor de um polinômio nas linhas informadas; os coeficientes já vêm alinhados com elas
+    def _avaliar_linhas(self, polinomio, linhas, variaveis, nao_lineares):
+        celulas = self.celula[linhas]
+        valor = np.zeros(len(linhas))
+        for (nomes, nao_linear), coeficiente in polinomio.items():
+            termo = np.asarray(coeficiente, dtype=float)
+            for nome in nomes:
+                termo = termo * (variaveis[nome][celulas] if np.ndim(variaveis[nome]) else variaveis[nome])
+            if nao_linear:
+                termo = termo * nao_lineares[nao_linear][linhas]
+            valor += termo
+        return valor
+
+    # Soma de uma rubrica em cada célula
+    def _somar_celulas(self, saida, variaveis, nao_lineares):
+        soma = np.zeros(self.n_celulas)
+        for termo, coeficiente in self.somas[saida].items():
+            nomes, nao_linear = termo
+            if nao_linear is None:
+                for nome in nomes:
+                    coeficiente = coeficiente * variaveis[nome]
+                soma += coeficiente
+            else:
+                linhas = self.nao_lineares[nao_linear][1]
+                soma += self._somar_linhas(self._avaliar_linhas({termo: coeficiente}, linhas, variaveis, nao_lineares), linhas)
+        return soma
+
+    # Rubrica não linear calculada nas linhas em que pode ser != 0 (zero nas demais)
+    def _calcular_nao_linear(self, nome, variaveis, nao_lineares):
+        rubrica, linhas, entradas = self.nao_lineares[nome]
+        valores = {entrada: self._avaliar_linhas(polinomio, linhas, variaveis, nao_lineares) for entrada, polinomio in entradas.items()}
+        saida = np.empty(len(linhas))
+        _calcular_rubrica(rubrica, valores.__getitem__, saida)
+        resultado = np.zeros(len(self.df))
+        resultado[linhas] = saida
+        return resultado
+
+    # Simula um cenário sobre as células selecionadas (ver selecionar) e devolve o mesmo
+    # dicionário de simulador.simulacao.simular, sem 'df'. Sobrescritas que o cubo não resolve
+    # (ver suporta) caem em simular sobre as linhas selecionadas. Com um AvaliadorIncremental,
+    # chave_folha identifica a folha do cubo (a seleção é acompanhada aqui) e só são refeitas as
+    # etapas cujas entradas mudaram.
+    def simular(self, parametros, selecoes=None, avaliador=None, chave_folha=None):
+        parametros = {**PARAMETROS_PADRAO, 'ano_irpf': ANO_IRPF_PADRAO, **parametros}
+        if avaliador is None:
+            avaliador, chave_folha = AvaliadorIncremental(), id(self)
+        elif chave_folha is None:
+            raise ValueError('chave_folha é obrigatória quando um avaliador incremental é informado')
+        mascara = self.selecionar(selecoes)
+        chave_selecao = sorted((coluna, sorted(map(str, valores))) for coluna, valores in (selecoes or {}).items()
+                               if valores is not None and len(valores))
+
+        sobrescritas = sobrescritas_cenario(parametros, self.regime)
+        if not self.suporta(sobrescritas):
+            return simular(parametros, self.df.iloc[self.linhas(mascara)], self.regime, avaliador, (chave_folha, chave_selecao))
+
+        avaliador.iniciar()
+        avaliador.entrada('cubo', (self.regime, chave_folha))
+        avaliador.entrada('selecao', chave_selecao)
+        avaliador.entrada('enquadramento', parametros['enquadramento'])
+        avaliador.entrada('taxa_he_noturna', parametros['taxa_he_noturna'])
+
+        # Variáveis de cada célula: novo salário e taxas (com as sobrescritas do cenário)
+        configuracao_tabela = (parametros['TC'], parametros['TR'], int(parametros['num_classes']), int(parametros['num_referencias']),
+                               [parametros[campo] for campo in SALARIOS_BASE])
+        grades = avaliador.calcular('grades', [], lambda: gerar_grade_salarios(*configuracao_tabela), configuracao_tabela)
+        variaveis = {'taxa_he_noturna': float(parametros['taxa_he_noturna'])}
+        variaveis['Novo Salário'] = avaliador.calcular('Novo Salário', ['cubo', 'enquadramento', 'grades'], lambda: buscar_salarios_codigos(
+            empacotar_tabelas(grades), self.celulas['_letra'].to_numpy(), self.celulas['_ch'].to_numpy(),
+            self.celulas['Ref'] + parametros['enquadramento']))
+        for rubrica in self.taxas:
+            entradas = [entrada for entrada in sobrescritas if entrada[0] == rubrica]
+            variaveis[rubrica] = avaliador.calcular(rubrica, ['cubo'], lambda: taxas_sobrescritas(
+                self.celulas, rubrica, entradas).to_numpy(dtype=float), entradas)
+
+        nao_lineares = {}
+        for nome, (_, _, entradas) in self.nao_lineares.items():
+            dependencias = ['cubo'] + sorted({d for polinomio in entradas.values() for d in _dependencias(polinomio)})
+            nao_lineares[nome] = avaliador.calcular(nome, dependencias, lambda: self._calcular_nao_linear(nome, variaveis, nao_lineares))
+
+        # Somas por célula: colunas atuais (da carga), rubricas novas e IRPF, linha a linha
+        celulas = self.celulas.copy()
+        for saida in self.saidas:
+            celulas[saida] = avaliador.calcular(('celulas', saida), ['cubo'] + _dependencias(self.somas[saida]),
+                                                lambda: self._somar_celulas(saida, variaveis, nao_lineares))
+        ano = parametros['ano_irpf']
+        if ano not in self._irpf_anterior:
+            self._irpf_anterior[ano] = self._somar_linhas(calcular_irpf(self.df['BASE IRPF'], ano))
+        celulas['IRPF_calculado'] = self._irpf_anterior[ano]
+        base_irpf = self.por_linha['nova_base_IRPF']
+        celulas['nova_IRPF'] = avaliador.calcular('nova_IRPF', ['cubo'] + _dependencias(base_irpf), lambda: self._somar_linhas(
+            calcular_irpf(self._avaliar_linhas(base_irpf, np.arange(len(self.df)), variaveis, nao_lineares), ano)), ano)
+        celulas = celulas[mascara]
+        celulas['Ref'] = celulas['Ref'] + parametros['enquadramento']
+
+        # Tabela de servidores: a remuneração nova é calculada só nas linhas selecionadas
+        def tabela_servidores():
+            remuneracao = self.por_linha[self.coluna_nova]
+            linhas = self.linhas(mascara)
+            tabela = self.df[['Nome', 'Cargo', 'CH', 'Ref', self.coluna_anterior]].iloc[linhas]
+            tabela['Ref'] = tabela['Ref'] + parametros['enquadramento']
+            tabela[self.coluna_nova] = self._avaliar_linhas({termo: coeficientes[linhas] for termo, coeficientes in remuneracao.items()},
+                                                            linhas, variaveis, nao_lineares)
+            return tabela
+        tabela_novo_salario = avaliador.calcular('tabela_novo_salario', ['cubo', 'selecao', 'enquadramento'] + _dependencias(
+            self.por_linha[self.coluna_nova]), tabela_servidores)
+
+        salarios_por_cargo = pd.DataFrame({
+            'Antes': celulas.groupby('Cargo', observed=True)[self.coluna_anterior].sum(),
+            'Depois': celulas.groupby('Cargo', observed=True)[self.coluna_nova].sum(),
+        })
+        return montar_resultados(grades, contar_pessoas(celulas, self.coluna_anterior, 'Quantidade'), tabela_novo_salario,
+                                 calcular_impacto(celulas, self.coluna_anterior, self.coluna_nova, 'sum'), salarios_por_cargo,
+                                 lambda coluna: celulas[coluna].sum(), self.regime)
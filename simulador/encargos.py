@@ -0,0 +1,21 @@
+ALIQUOTA_IPM_SAUDE = 0.04
+
+
+# Encargos mensais sobre a remuneração total, como no resumo de impacto dos dashboards:
+# provisão de férias (1/3 de 1/12), provisão de 13º (1/12), Fortaleza Saúde-IPM (4% sobre a
+# remuneração mais as provisões) e a contribuição patronal ao IPM-PREVIFOR, que já vem somada da
+# folha. Aceita números ou arrays (um valor por cenário). 'impacto_mensal' é a remuneração mais
+# todos os encargos.
+def calcular_encargos(remuneracao, ipm_previfor_patronal):
+    provisao_ferias = remuneracao / 12 / 3
+    provisao_decimo = remuneracao / 12
+    ipm_saude = (remuneracao + provisao_ferias + provisao_decimo) * ALIQUOTA_IPM_SAUDE
+    encargos = provisao_ferias + provisao_decimo + ipm_saude + ipm_previfor_patronal
+    return {
+        'provisao_ferias': provisao_ferias,
+        'provisao_decimo': provisao_decimo,
+        'ipm_saude': ipm_saude,
+        'ipm_previfor_patronal': ipm_previfor_patronal,
+        'encargos': encargos,
+        'impacto_mensal': remuneracao + encargos,
+    }
@@ -0,0 +1,57 @@
+from simulador.rubricas import REGIMES, GrafoRubricas
+from simulador.simulacao import GRATIFICACOES_COMPARADAS
+
+# Colunas de texto com poucos valores distintos, guardadas como categóricas
+COLUNAS_CATEGORICAS = ('Cargo', 'Niv', 'Ambiente', 'Cat', 'Grau de instrução', 'Enquadramento do GEEF')
+
+# Tipos das colunas de uma folha: categóricas e inteiros pequenos (carga horária e referência)
+TIPOS_FOLHA = {**{coluna: 'category' for coluna in COLUNAS_CATEGORICAS}, 'CH': 'int16', 'Ref': 'int16'}
+
+# Esquema de carga de cada aba, com os nomes já normalizados (sem espaços nas pontas):
+#  - 'colunas': colunas lidas, além das entradas das rubricas dos regimes listados em 'regimes'
+#  - 'tipos': tipo de cada coluna depois da leitura
+# Colunas declaradas que não existem na aba são ignoradas.
+ESQUEMAS = {
+    'amc': {
+        'colunas': ['Prontuario', 'Nome', 'Cat', 'Cargo', 'Ambiente', 'Niv', 'Ref', 'CH', 'Grau de instrução',
+                    'Enquadramento do GEEF', 'VENCIMENTO BASE', '0996-TOT.PROVENTO', 'IPM PREVFOR-SERVIDOR',
+                    'IPM PREVFOR-PATRONAL', 'BASE IRPF'] + [anterior for anterior, _ in GRATIFICACOES_COMPARADAS.values()],
+        'regimes': ('amc', 'amc_percentual'),
+        'tipos': TIPOS_FOLHA,
+    },
+    'folha_geral': {
+        'colunas': ['Nome', 'Orgao', 'Cat', 'Cargo', 'Ambiente', 'Tab', 'Pla', 'Niv', 'Ref', 'CH', '0100-VENCIMENTO',
+                    'VENCIMENTO BASE'],
+        'tipos': {**TIPOS_FOLHA, 'Orgao': 'category', 'Tab': 'category', 'Pla': 'category'},
+    },
+}
+
+
+def registrar_esquema(aba, colunas, tipos=None, regimes=()):
+    ESQUEMAS[aba] = {'colunas': list(colunas), 'regimes': tuple(regimes), 'tipos': dict(tipos or {})}
+
+
+# Colunas lidas por um esquema: as declaradas e as entradas externas das rubricas dos regimes
+# (lidas na hora, para valer também para regimes registrados depois)
+def colunas_esquema(esquema):
+    colunas = list(esquema['colunas'])
+    for regime in esquema.get('regimes', ()):
+        colunas += GrafoRubricas(REGIMES[regime]).entradas_externas
+    return list(dict.fromkeys(colunas))
+
+
+# Converte as colunas para os tipos do esquema. Inteiros com células vazias ficam como estão
+# (float), para não perder as linhas incompletas. Altera o DataFrame e o devolve.
+def aplicar_esquema(df, esquema):
+    for coluna, tipo in esquema.get('tipos', {}).items():
+        if coluna not in df or df[coluna].dtype == tipo:
+            continue
+        if tipo != 'category' and df[coluna].isna().any():
+            continue
+        df[coluna] = df[coluna].astype(tipo)
+    return df
+
+
+# Memória ocupada pelo DataFrame, contando o conteúdo das strings (em bytes)
+def memoria(df):
+    return int(df.memory_usage(deep=True).sum())
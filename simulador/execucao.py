@@ -0,0 +1,104 @@
+import threading
+from contextlib import contextmanager
+
+# Quantidade de etapas suposta para a primeira execução de um avaliador, que ainda não tem a
+# contagem da execução anterior
+ETAPAS_ESTIMADAS = 25
+
+
+class Cancelado(Exception):
+    pass
+
+
+# Uma simulação rodando em uma thread de fundo. funcao recebe a própria tarefa e devolve o
+# resultado; ela pode chamar verificar() entre as etapas (ou usar acompanhar com um
+# AvaliadorIncremental) para parar logo que a tarefa for cancelada.
+class Tarefa:
+
+    def __init__(self, chave, funcao):
+        self.chave = chave
+        self.progresso = 0.0
+        self.concluida = threading.Event()
+        self.cancelamento = threading.Event()
+        self._resultado = None
+        self._erro = None
+        self._thread = threading.Thread(target=self._executar, args=(funcao,), daemon=True)
+        self._thread.start()
+
+    def _executar(self, funcao):
+        try:
+            self._resultado = funcao(self)
+            self.progresso = 1.0
+        except BaseException as erro:
+            self._erro = erro
+        finally:
+            self.concluida.set()
+
+    @property
+    def cancelada(self):
+        return self.cancelamento.is_set()
+
+    def cancelar(self):
+        self.cancelamento.set()
+
+    def verificar(self):
+        if self.cancelamento.is_set():
+            raise Cancelado(self.chave)
+
+    # Durante o bloco, cada etapa do avaliador incremental atualiza o progresso (contado sobre as
+    # etapas da execução anterior) e interrompe a simulação se a tarefa foi cancelada
+    @contextmanager
+    def acompanhar(self, avaliador):
+        estimadas = len(avaliador.ativos) or ETAPAS_ESTIMADAS
+        etapas = 0
+
+        def ao_calcular(nome):
+            nonlocal etapas
+            self.verificar()
+            etapas += 1
+            self.progresso = min(etapas / estimadas, 0.99)
+
+        avaliador.ao_calcular = ao_calcular
+        try:
+            yield self
+        finally:
+            avaliador.ao_calcular = None
+
+    # Espera a tarefa terminar (no máximo 'espera' segundos, se informado); devolve True se terminou
+    def aguardar(self, espera=None):
+        return self.concluida.wait(espera)
+
+    # Resultado da tarefa concluída; repassa o erro se ela falhou (Cancelado, se foi cancelada)
+    def resultado(self):
+        self.concluida.wait()
+        if self._erro is not None:
+            raise self._erro
+        return self._resultado
+
+
+# Execução em segundo plano de uma simulação por vez (por exemplo uma por sessão do dashboard):
+# pedir uma chave diferente da tarefa atual cancela a atual, espera ela parar na próxima etapa e
+# começa a nova; pedir a mesma chave devolve a tarefa que já está rodando (ou já terminou). Assim
+# uma execução abandonada não continua gastando CPU e nunca há duas usando o mesmo avaliador.
+class ExecucaoEmFundo:
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.atual = None
+
+    def pedir(self, chave, funcao):
+        with self.trava:
+            if self.atual is not None and self.atual.chave == chave and not self.atual.cancelada:
+                return self.atual
+            if self.atual is not None:
+                self.atual.cancelar()
+                self.atual.aguardar()
+            self.atual = Tarefa(chave, funcao)
+            return self.atual
+
+    # Cancela a tarefa atual e espera ela parar
+    def cancelar(self):
+        with self.trava:
+            if self.atual is not None:
+                self.atual.cancelar()
+                self.atual.aguardar()
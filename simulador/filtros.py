@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+# Colunas dos filtros da barra lateral do dashboard com filtros
+COLUNAS_FILTRO = ('Ambiente', 'Cat', 'Niv', 'CH')
+
+
+# Índice dos filtros, montado uma vez na carga: cada coluna vira um categórico (categorias na
+# ordem em que aparecem, a mesma de unique()) e cada par (coluna, valor) guarda um bitset com as
+# posições em que o valor aparece. Uma seleção é resolvida com OR dos bitsets dos valores de cada
+# coluna e AND entre as colunas, sem passar pelas strings da folha.
+class IndiceFiltros:
+
+    def __init__(self, df, colunas=COLUNAS_FILTRO):
+        self.tamanho = len(df)
+        self.categorias = {}
+        self.bitsets = {}
+        for coluna in colunas:
+            # list(): com a coluna já categórica, o unique() devolve um Categorical e as categorias
+            # viriam na ordem dele (alfabética), não na ordem em que aparecem
+            categorico = pd.Categorical(df[coluna], categories=list(pd.unique(df[coluna].dropna())))
+            self.categorias[coluna] = categorico.categories
+            codigos = categorico.codes
+            self.bitsets[coluna] = np.stack([np.packbits(codigos == codigo) for codigo in range(len(categorico.categories))]) \
+                if len(categorico.categories) else np.zeros((0, (self.tamanho + 7) // 8), dtype=np.uint8)
+        self._opcoes = {coluna: list(categorias) for coluna, categorias in self.categorias.items()}
+        self._todos = np.packbits(np.ones(self.tamanho, dtype=bool))
+
+    # Valores possíveis de uma coluna, na ordem em que aparecem na folha (lista guardada no índice)
+    def opcoes(self, coluna):
+        return self._opcoes[coluna]
+
+    # Bitset das posições que atendem à seleção {coluna: valores aceitos}; colunas sem valores
+    # (lista vazia ou None) não filtram e valores desconhecidos não selecionam nada
+    def bitset(self, selecoes=None):
+        resultado = self._todos.copy()
+        for coluna, valores in (selecoes or {}).items():
+            if valores is None or not len(valores):
+                continue
+            codigos = self.categorias[coluna].get_indexer(list(valores))
+            codigos = codigos[codigos >= 0]
+            np.bitwise_and(resultado, np.bitwise_or.reduce(self.bitsets[coluna][codigos], axis=0)
+                           if len(codigos) else 0, out=resultado)
+        return resultado
+
+    # Máscara booleana (uma posição por linha indexada) da seleção
+    def selecionar(self, selecoes=None):
+        return np.unpackbits(self.bitset(selecoes), count=self.tamanho).view(bool)
+
+    # Posições selecionadas, em ordem; servem para df.iloc ou np.take sem copiar a folha inteira
+    def linhas(self, selecoes=None):
+        return np.flatnonzero(self.selecionar(selecoes))
@@ -0,0 +1,18 @@
+# Colunas em R$ das tabelas de resultados (resumo dos cargos, encargos, suavizações, totais, projeção)
+COLUNAS_MOEDA = ('Remuneração Anterior', 'Remuneração Nova', 'Impacto', 'Consolidado VENCIMENTO BASE', 'Encargos Anteriores',
+                 'Encargos Novos', 'Folha Anterior', 'Folha Nova', 'Impacto Acumulado')
+
+
+def formatar_moeda(valor):
+    valor_formatado = f'{valor:,.2f}'
+    # Substitui o separador decimal por uma letra que não seja dígito
+    valor_formatado = valor_formatado.replace('.', 'X').replace(',', '.').replace('X', ',')
+    return f'R$ {valor_formatado}'
+
+
+# Formatação em R$ aplicada só na exibição: devolve um Styler da tabela em que as colunas de moeda
+# (por padrão, as de COLUNAS_MOEDA presentes na tabela) aparecem como formatar_moeda, mas os
+# valores continuam numéricos e a tabela segue ordenável pelos números. Vazios ficam em branco.
+def estilo_moeda(df, colunas=None):
+    colunas = [coluna for coluna in (COLUNAS_MOEDA if colunas is None else colunas) if coluna in df.columns]
+    return df.style.format('R$ {:,.2f}', subset=colunas, thousands='.', decimal=',', na_rep='')
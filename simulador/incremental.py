@@ -0,0 +1,73 @@
+import hashlib
+
+
+# Gera uma versão curta e estável a partir de qualquer valor com repr determinístico
+def _versao(valor):
+    return hashlib.blake2b(repr(valor).encode(), digest_size=16).hexdigest()
+
+
+# Avaliador incremental: guarda, para cada nó (coluna derivada, taxa, agregado...), a versão das
+# suas dependências e o último resultado. A versão de um nó é derivada das versões dos nós de que
+# ele depende e dos parâmetros que usa, então uma mudança em uma entrada só invalida os nós que
+# estão abaixo dela. Pensado para ficar em st.session_state entre as execuções do script.
+class AvaliadorIncremental:
+    def __init__(self):
+        self.versoes = {}
+        self.resultados = {}
+        self.dependencias = {}
+        self.ativos = set()
+        self.recalculados = set()
+        # Função chamada com o nome de cada nó antes de ele ser avaliado (por exemplo para mostrar o
+        # progresso ou interromper uma execução cancelada levantando uma exceção)
+        self.ao_calcular = None
+
+    # Marca o início de uma nova execução. Os resultados anteriores continuam guardados, mas só
+    # os nós declarados de novo nesta execução contam como conhecidos.
+    def iniciar(self):
+        self.ativos = set()
+        self.recalculados = set()
+
+    def conhece(self, nome):
+        return nome in self.ativos
+
+    def versao(self, nome):
+        return self.versoes[nome]
+
+    # Declara uma entrada externa (por exemplo a folha já filtrada) identificada por 'chave'
+    def entrada(self, nome, chave):
+        self.versoes[nome] = _versao(('entrada', chave))
+        self.dependencias[nome] = ()
+        self.ativos.add(nome)
+
+    # Declara 'nome' como outro nome do nó 'original' (mesma versão e mesmo resultado)
+    def apelido(self, nome, original):
+        self.versoes[nome] = self.versoes[original]
+        self.dependencias[nome] = (original,)
+        self.ativos.add(nome)
+
+    # Devolve o resultado do nó, recalculando-o com 'funcao' só se a versão das dependências
+    # ou dos parâmetros mudou desde a última vez
+    def calcular(self, nome, dependencias, funcao, parametros=()):
+        if self.ao_calcular is not None:
+            self.ao_calcular(nome)
+        dependencias = tuple(dependencias)
+        versao = _versao((tuple(self.versoes[d] for d in dependencias), parametros))
+        self.dependencias[nome] = dependencias
+        self.ativos.add(nome)
+        if self.versoes.get(nome) != versao or nome not in self.resultados:
+            self.resultados[nome] = funcao()
+            self.versoes[nome] = versao
+            self.recalculados.add(nome)
+        return self.resultados[nome]
+
+    # Nós que dependem, direta ou indiretamente, de 'nome'
+    def dependentes(self, nome):
+        encontrados = set()
+        pendentes = [nome]
+        while pendentes:
+            atual = pendentes.pop()
+            for no, dependencias in self.dependencias.items():
+                if atual in dependencias and no not in encontrados:
+                    encontrados.add(no)
+                    pendentes.append(no)
+        return encontrados
@@ -0,0 +1,36 @@
+import numpy as np
+
+# Tabelas progressivas mensais do IRPF por ano de vigência. Cada tabela guarda os limites
+# inferiores das faixas tributáveis, as alíquotas e as parcelas a deduzir de cada faixa.
+TABELAS_IRPF = {}
+
+
+# Registra (ou substitui) a tabela do IRPF de um ano; os limites devem estar em ordem crescente
+def registrar_tabela_irpf(ano, limites, aliquotas, deducoes):
+    limites = np.asarray(limites, dtype=float)
+    aliquotas = np.asarray(aliquotas, dtype=float)
+    deducoes = np.asarray(deducoes, dtype=float)
+    if not (len(limites) == len(aliquotas) == len(deducoes)):
+        raise ValueError(f'Tabela do IRPF de {ano}: limites, alíquotas e deduções devem ter o mesmo tamanho')
+    if np.any(np.diff(limites) <= 0):
+        raise ValueError(f'Tabela do IRPF de {ano}: os limites das faixas devem ser crescentes')
+    # A faixa 0 (isenta) fica na frente para que o índice devolvido pelo searchsorted sirva direto
+    TABELAS_IRPF[ano] = (limites, np.concatenate(([0.0], aliquotas)), np.concatenate(([0.0], deducoes)))
+
+
+registrar_tabela_irpf(2015, [1903.98, 2826.65, 3751.05, 4664.68], [0.075, 0.15, 0.225, 0.275], [142.80, 354.80, 636.13, 869.36])
+registrar_tabela_irpf(2023, [2112.00, 2826.65, 3751.05, 4664.68], [0.075, 0.15, 0.225, 0.275], [158.40, 370.40, 651.73, 884.96])
+registrar_tabela_irpf(2024, [2259.20, 2826.65, 3751.05, 4664.68], [0.075, 0.15, 0.225, 0.275], [169.44, 381.44, 662.77, 896.00])
+
+# Tabela usada na planilha da folha (coluna IRPF)
+ANO_IRPF_PADRAO = 2015
+
+
+# Calcula o IRPF de todas as bases de uma vez. bases pode ter qualquer forma, por exemplo
+# (servidores, 2) com a base anterior e a nova lado a lado. Bases vazias (NaN) não pagam imposto.
+def calcular_irpf(bases, ano=ANO_IRPF_PADRAO):
+    limites, aliquotas, deducoes = TABELAS_IRPF[ano]
+    bases = np.nan_to_num(np.asarray(bases, dtype=float), nan=0.0)
+    # Quantidade de limites estritamente menores que a base = faixa da base
+    faixa = np.searchsorted(limites, bases, side='left')
+    return bases * aliquotas[faixa] - deducoes[faixa]
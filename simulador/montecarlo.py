@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from simulador.irpf import ANO_IRPF_PADRAO
+from simulador.orcamento import METAS_ORCAMENTO
+from simulador.rubricas import compilar_regime, precalcular_fixos
+from simulador.simulacao import PARAMETROS_PADRAO
+from simulador.taxas import aplicar_sobrescritas
+from simulador.varredura import LIMITE_MEMORIA_LOTE, _rubricas_lote, _totais_lote
+
+# Incertezas sorteadas em cada amostra da simulação de Monte Carlo:
+#  - 'enquadramento': {Refs: probabilidade} do enquadramento negociado, somado ao do cenário e igual
+#    para todos os servidores da amostra
+#  - 'deslocamentos_referencia': {Refs: probabilidade} do deslocamento individual de cada servidor,
+#    limitado às Refs da tabela
+#  - 'transicoes_instrucao': {grau atual: {novo grau: probabilidade}} de cada servidor obter uma nova
+#    titulação (no máximo uma por amostra); o restante da probabilidade mantém o grau atual
+#  - 'taxas_instrucao': {grau: taxa do ITA (%)} de quem chega ao grau; os graus que faltam usam a
+#    mediana de REF-ITA dos servidores que já têm o grau na folha
+#  - 'coluna_instrucao': coluna da folha com o grau de instrução
+INCERTEZAS_PADRAO = {
+    'enquadramento': {0: 0.6, 1: 0.3, 2: 0.1},
+    'deslocamentos_referencia': {0: 0.9, 1: 0.1},
+    'transicoes_instrucao': {
+        '0': {'Médio Tecnólogo': 0.02, 'Graduação': 0.03},
+        'Médio Tecnólogo': {'Graduação': 0.05},
+        'Graduação': {'Especialização': 0.05},
+        'Especialização': {'Mestrado': 0.02},
+    },
+    'taxas_instrucao': {},
+    'coluna_instrucao': 'Grau de instrução',
+}
+
+PERCENTIS_PADRAO = (5, 25, 50, 75, 95)
+
+
+# Sorteia valores de uma distribuição {valor: probabilidade} a partir de sorteios uniformes em [0, 1)
+# (as probabilidades são normalizadas para somar 1)
+def _sortear(distribuicao, uniformes):
+    valores = np.array(list(distribuicao), dtype=float)
+    limites = np.cumsum(np.array(list(distribuicao.values()), dtype=float))
+    if len(valores) == 0 or limites[-1] <= 0 or (np.diff(limites, prepend=0) < 0).any():
+        raise ValueError(f'Distribuição inválida: {distribuicao}')
+    return valores[np.minimum(np.searchsorted(limites / limites[-1], uniformes, side='right'), len(valores) - 1)]
+
+
+# Transições de grau de instrução: (máscara dos servidores no grau de origem, [(limite inferior,
+# limite superior do sorteio, taxa do ITA do novo grau)]) para cada grau de origem
+def _transicoes(df, incertezas):
+    coluna = incertezas['coluna_instrucao']
+    transicoes = []
+    for origem, destinos in incertezas['transicoes_instrucao'].items():
+        if sum(destinos.values()) > 1 + 1e-9 or any(probabilidade < 0 for probabilidade in destinos.values()):
+            raise ValueError(f'Probabilidades de transição inválidas a partir de {origem}: {destinos}')
+        faixas, inferior = [], 0.0
+        for destino, probabilidade in destinos.items():
+            if destino in incertezas['taxas_instrucao']:
+                taxa = incertezas['taxas_instrucao'][destino] / 100
+            else:
+                taxa = df.loc[(df[coluna] == destino).to_numpy(), 'REF-ITA'].median()
+                if pd.isna(taxa):
+                    raise ValueError(f"Informe a taxa do ITA de '{destino}' em taxas_instrucao: nenhum servidor da folha tem o grau")
+            faixas.append((inferior, inferior + probabilidade, taxa))
+            inferior += probabilidade
+        transicoes.append(((df[coluna] == origem).to_numpy(), faixas))
+    return transicoes
+
+
+# Simulação de Monte Carlo da incerteza do enquadramento e da titulação sobre o cenário 'parametros':
+# cada amostra sorteia o enquadramento negociado, os deslocamentos individuais de Ref e as novas
+# titulações dos servidores (ver INCERTEZAS_PADRAO; as que faltam em 'incertezas' ficam com o valor
+# padrão) e passa a folha resultante pela busca de salários e pelas rubricas do regime. As amostras
+# são avaliadas em lotes vetorizados (ver varredura; por padrão, o que cabe em LIMITE_MEMORIA_LOTE),
+# então a memória não cresce com o número de amostras. Os sorteios de cada amostra vêm em sequência
+# do gerador com a 'semente': o resultado não depende do tamanho do lote. As sobrescritas de
+# 'parametros' valem para todas as amostras.
+#
+# Devolve um dicionário com 'percentis' (tabela indexada pelo percentil, com os totais de
+# METAS_ORCAMENTO, mais a média) e 'amostras' (os totais de cada amostra, com o enquadramento
+# sorteado e a quantidade de servidores deslocados e titulados).
+def simular_monte_carlo(df, parametros=None, regime='amc', amostras=1000, incertezas=None, semente=0,
+                        percentis=PERCENTIS_PADRAO, tamanho_lote=None):
+    if amostras < 1:
+        raise ValueError('A simulação precisa de pelo menos uma amostra')
+    incertezas = {**INCERTEZAS_PADRAO, **(incertezas or {})}
+    parametros = {**PARAMETROS_PADRAO, 'ano_irpf': ANO_IRPF_PADRAO, **(parametros or {})}
+    grafo_carga, grafo_cenario = compilar_regime(regime)
+    if any(nome not in df for nome in grafo_carga.posicao):
+        df = precalcular_fixos(df.copy(), regime)
+    if parametros.get('sobrescritas'):
+        df = aplicar_sobrescritas(df.copy(), [tuple(entrada) for entrada in parametros['sobrescritas']])
+
+    transicoes = _transicoes(df, incertezas)
+    base = {nome: valor for nome, valor in parametros.items() if nome in PARAMETROS_PADRAO}
+    taxa_ita = df['REF-ITA'].to_numpy(dtype=float)
+    referencias = df['Ref'].to_numpy(dtype=float)
+    ultima_referencia = int(parametros['num_classes']) * int(parametros['num_referencias'])
+    servidores = len(df)
+
+    if tamanho_lote is None:
+        tamanho_lote = max(1, LIMITE_MEMORIA_LOTE // (8 * len(grafo_cenario.ordem) * max(servidores, 1)))
+    gerador = np.random.default_rng(semente)
+    resultados = []
+    for inicio in range(0, amostras, tamanho_lote):
+        quantidade = min(tamanho_lote, amostras - inicio)
+        # Uma linha de sorteios por amostra: enquadramento, deslocamento de cada servidor e titulação
+        uniformes = gerador.random((quantidade, 1 + 2 * servidores))
+        enquadramentos = parametros['enquadramento'] + _sortear(incertezas['enquadramento'], uniformes[:, 0])
+
+        # Deslocamentos não tiram o servidor da tabela (quem já está fora pelo enquadramento fica onde está)
+        enquadradas = referencias + enquadramentos[:, None]
+        deslocadas = enquadradas + _sortear(incertezas['deslocamentos_referencia'], uniformes[:, 1:1 + servidores])
+        deslocadas = np.clip(deslocadas, np.minimum(enquadradas, 1), np.maximum(enquadradas, ultima_referencia))
+        deslocamentos = deslocadas - enquadradas
+
+        sorteio_instrucao = uniformes[:, 1 + servidores:]
+        taxas = np.broadcast_to(taxa_ita, sorteio_instrucao.shape).copy()
+        titulados = np.zeros(sorteio_instrucao.shape, dtype=bool)
+        for origem, faixas in transicoes:
+            for inferior, superior, taxa in faixas:
+                sorteados = origem & (sorteio_instrucao >= inferior) & (sorteio_instrucao < superior)
+                taxas[sorteados] = taxa
+                titulados |= sorteados
+
+        lote = pd.DataFrame([base] * quantidade).assign(enquadramento=enquadramentos)
+        rubricas, formato = _rubricas_lote(df, regime, lote, {'REF-ITA': taxas}, deslocamentos)
+        totais = _totais_lote(df, regime, parametros['ano_irpf'], rubricas, formato)[list(METAS_ORCAMENTO)]
+        resultados.append(totais.assign(enquadramento=enquadramentos, servidores_deslocados=(deslocamentos != 0).sum(axis=-1),
+                                        servidores_titulados=titulados.sum(axis=-1)))
+    resultados = pd.concat(resultados, ignore_index=True).rename_axis('Amostra')
+
+    tabela = resultados[list(METAS_ORCAMENTO)].quantile(np.array(percentis) / 100)
+    tabela.index = pd.Index([f'P{percentil:g}' for percentil in percentis], name='Percentil')
+    tabela.loc['Média'] = resultados[list(METAS_ORCAMENTO)].mean()
+    return {'percentis': tabela, 'amostras': resultados}
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+
+from simulador.irpf import ANO_IRPF_PADRAO
+from simulador.rubricas import compilar_regime, precalcular_fixos
+from simulador.simulacao import CONFIGURACOES_REGIME, PARAMETROS_PADRAO, SALARIOS_BASE
+from simulador.taxas import aplicar_sobrescritas
+from simulador.varredura import _rubricas_lote, _totais_lote
+
+# Totais que podem ser limitados pelo orçamento (colunas de varrer_cenarios)
+METAS_ORCAMENTO = ('impacto_anual', 'impacto_mensal', 'impacto_liquido_anual', 'impacto_liquido_mensal')
+
+# Parâmetro livre extra: reajuste (%) aplicado igualmente aos seis salários-base do cenário
+REAJUSTE_SALARIOS_BASE = 'reajuste_salarios_base'
+
+# Parâmetros inteiros não entram na busca
+PARAMETROS_INTEIROS = ('num_classes', 'num_referencias', 'enquadramento')
+
+
+# Avaliação em lote dos cenários da busca, guardada por valores dos parâmetros livres: um ponto já
+# visitado não é calculado de novo. Devolve, para cada cenário, o total da meta e o aumento (%) da
+# remuneração de cada cargo (somada por código do cargo, sem matriz servidores x cargos).
+class _Avaliador:
+
+    def __init__(self, df, regime, parametros, livres, meta):
+        self.regime = regime
+        self.parametros = parametros
+        self.livres = livres
+        self.meta = meta
+        self.ano_irpf = parametros['ano_irpf']
+        self.resultados = {}
+        self.avaliacoes = 0
+
+        # Sobrescritas extras (ITA, GEEF...) valem para todos os cenários: aplicadas uma vez só
+        if parametros.get('sobrescritas'):
+            df = aplicar_sobrescritas(df.copy(), [tuple(entrada) for entrada in parametros['sobrescritas']])
+        self.df = df
+        coluna_anterior, self.coluna_nova = CONFIGURACOES_REGIME[regime]['remuneracao']
+        cargos = df['Cargo'].astype('category')
+        # Código do cargo de cada servidor; servidores sem cargo (código -1) não entram em nenhum
+        codigos = cargos.cat.codes.to_numpy()
+        self.com_cargo = codigos >= 0
+        self.codigos = codigos[self.com_cargo]
+        self.anterior_por_cargo = df[coluna_anterior].groupby(cargos, observed=False).sum()
+
+    # Parâmetros completos de um ponto da busca (valores na ordem de 'livres')
+    def cenario(self, valores):
+        cenario = {nome: valor for nome, valor in self.parametros.items() if nome in PARAMETROS_PADRAO}
+        for nome, valor in zip(self.livres, valores):
+            if nome == REAJUSTE_SALARIOS_BASE:
+                for campo in SALARIOS_BASE:
+                    cenario[campo] = self.parametros[campo] * (1 + valor / 100)
+            else:
+                cenario[nome] = valor
+        return cenario
+
+    def avaliar(self, pontos):
+        pendentes = list(dict.fromkeys(ponto for ponto in pontos if ponto not in self.resultados))
+        if pendentes:
+            lote = pd.DataFrame([self.cenario(ponto) for ponto in pendentes])
+            rubricas, formato = _rubricas_lote(self.df, self.regime, lote)
+            totais = _totais_lote(self.df, self.regime, self.ano_irpf, rubricas, formato)[self.meta].to_numpy()
+            remuneracoes = np.nan_to_num(np.broadcast_to(rubricas[self.coluna_nova], formato)[:, self.com_cargo])
+            por_cargo = np.stack([np.bincount(self.codigos, weights=remuneracao, minlength=len(self.anterior_por_cargo))
+                                  for remuneracao in remuneracoes])
+            aumentos = (por_cargo / self.anterior_por_cargo.to_numpy() - 1) * 100
+            for ponto, total, aumento in zip(pendentes, totais, aumentos):
+                self.resultados[ponto] = (total, pd.Series(aumento, index=self.anterior_por_cargo.index))
+            self.avaliacoes += len(pendentes)
+        return [self.resultados[ponto] for ponto in pontos]
+
+
+# Procura os parâmetros livres que levam a meta (por exemplo o impacto anual, ver METAS_ORCAMENTO)
+# o mais perto possível do limite do orçamento sem ultrapassá-lo, respeitando os intervalos de cada
+# parâmetro e o aumento mínimo (%) da remuneração de cada cargo.
+#  - livres: {parâmetro: (mínimo, máximo)} com parâmetros contínuos de PARAMETROS_PADRAO (TC, TR,
+#    salários-base, taxas) ou REAJUSTE_SALARIOS_BASE; os demais ficam como em 'parametros'
+#  - aumento_minimo: um número para todos os cargos ou {cargo: %}; cargos fora do dicionário não
+#    têm mínimo
+# A busca é por coordenadas, na ordem de 'livres': cada parâmetro é procurado com os outros fixos,
+# avaliando 'pontos' valores do intervalo em um só lote vetorizado (ver varredura) e estreitando o
+# intervalo em volta do melhor ponto até 'precisao' do intervalo original, e as voltas se repetem
+# enquanto melhorarem o resultado. Como o primeiro parâmetro livre consome o orçamento antes dos
+# outros, a ordem de 'livres' é a prioridade entre eles. Para no máximo em max_avaliacoes cenários.
+#
+# Devolve um dicionário com 'parametros' (o cenário encontrado, pronto para simular), 'valor' (a
+# meta nesse cenário), 'viavel' (False se nenhum ponto respeitou o limite e os mínimos; nesse caso
+# o cenário é o que menos os violou), 'aumentos' (% por cargo) e 'avaliacoes'.
+def resolver_orcamento(df, limite, livres, parametros=None, meta='impacto_anual', regime='amc', aumento_minimo=None,
+                       pontos=17, precisao=1e-4, max_avaliacoes=400):
+    if meta not in METAS_ORCAMENTO:
+        raise ValueError(f'Meta desconhecida: {meta}')
+    desconhecidos = [nome for nome in livres
+                     if nome != REAJUSTE_SALARIOS_BASE and (nome not in PARAMETROS_PADRAO or nome in PARAMETROS_INTEIROS)]
+    if desconhecidos:
+        raise ValueError(f'Parâmetros livres desconhecidos ou inteiros: {desconhecidos}')
+    if not livres:
+        raise ValueError('Informe ao menos um parâmetro livre')
+    parametros = {**PARAMETROS_PADRAO, 'ano_irpf': ANO_IRPF_PADRAO, **(parametros or {})}
+    grafo_carga, _ = compilar_regime(regime)
+    if any(nome not in df for nome in grafo_carga.posicao):
+        df = precalcular_fixos(df.copy(), regime)
+
+    nomes = list(livres)
+    avaliador = _Avaliador(df, regime, parametros, nomes, meta)
+    minimos = aumento_minimo if isinstance(aumento_minimo, dict) else dict.fromkeys(avaliador.anterior_por_cargo.index, aumento_minimo)
+    minimos = pd.Series({cargo: minimo for cargo, minimo in minimos.items() if minimo is not None}, dtype=float)
+
+    # Pontuação de um ponto: viáveis antes dos inviáveis; entre os viáveis, a meta mais alta; entre
+    # os inviáveis, a menor violação (excesso sobre o limite e falta nos aumentos mínimos)
+    def pontuacao(resultado):
+        total, aumentos = resultado
+        excesso = max(total - limite, 0) / max(abs(limite), 1)
+        falta = (minimos - aumentos.reindex(minimos.index)).clip(lower=0).fillna(0).sum() / 100
+        if excesso == 0 and falta <= 1e-9:
+            return (1, total)
+        return (0, -(excesso + falta))
+
+    inicial = tuple(float(np.clip(0 if nome == REAJUSTE_SALARIOS_BASE else parametros[nome], *livres[nome])) for nome in nomes)
+    melhor = inicial
+    melhor_pontuacao = pontuacao(avaliador.avaliar([inicial])[0])
+    while avaliador.avaliacoes < max_avaliacoes:
+        pontuacao_volta = melhor_pontuacao
+        for posicao, nome in enumerate(nomes):
+            minimo, maximo = livres[nome]
+            inferior, superior = float(minimo), float(maximo)
+            while superior - inferior > precisao * (maximo - minimo) and avaliador.avaliacoes < max_avaliacoes:
+                valores = np.linspace(inferior, superior, pontos)
+                candidatos = [melhor[:posicao] + (float(valor),) + melhor[posicao + 1:] for valor in valores]
+                pontuacoes = [pontuacao(resultado) for resultado in avaliador.avaliar(candidatos)]
+                indice = max(range(len(candidatos)), key=pontuacoes.__getitem__)
+                if pontuacoes[indice] > melhor_pontuacao:
+                    melhor, melhor_pontuacao = candidatos[indice], pontuacoes[indice]
+                inferior, superior = valores[max(indice - 1, 0)], valores[min(indice + 1, pontos - 1)]
+        if len(nomes) == 1 or melhor_pontuacao <= pontuacao_volta:
+            break
+
+    total, aumentos = avaliador.resultados[melhor]
+    return {
+        'parametros': {**parametros, **avaliador.cenario(melhor)},
+        'valor': total,
+        'viavel': melhor_pontuacao[0] == 1,
+        'aumentos': aumentos,
+        'avaliacoes': avaliador.avaliacoes,
+    }
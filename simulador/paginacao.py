@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+TAMANHO_PAGINA_PADRAO = 50
+
+
+# Uma página da tabela de servidores (resultados['tabela_novo_salario']), montada no servidor para
+# que só as linhas visíveis sejam enviadas ao navegador. A linha 'Total' é descartada; as linhas
+# são filtradas por um trecho do nome (sem diferenciar maiúsculas) e pelos cargos escolhidos,
+# ordenadas por uma coluna (ordem estável, vazios no fim) e cortadas na página pedida, contada a
+# partir de 1 (números fora do intervalo vão para a primeira ou a última página). Devolve um
+# dicionário com:
+#  - 'pagina': DataFrame só com as linhas da página
+#  - 'numero' e 'paginas': página devolvida e quantidade de páginas
+#  - 'linhas': quantidade de linhas que passaram pelos filtros
+#  - 'totais': soma de cada coluna de valores sobre todas as linhas filtradas, não só as da página
+def paginar_servidores(tabela, numero=1, tamanho=TAMANHO_PAGINA_PADRAO, ordenar_por=None, decrescente=False, busca='',
+                       cargos=None, colunas_total=()):
+    tabela = tabela.drop(index='Total', errors='ignore')
+    mascara = np.ones(len(tabela), dtype=bool)
+    if busca:
+        mascara &= tabela['Nome'].astype(str).str.contains(busca, case=False, regex=False).to_numpy()
+    if cargos:
+        mascara &= tabela['Cargo'].isin(cargos).to_numpy()
+    posicoes = np.flatnonzero(mascara)
+
+    if ordenar_por is not None:
+        chaves = pd.Series(tabela[ordenar_por].to_numpy()[posicoes])
+        posicoes = posicoes[chaves.sort_values(ascending=not decrescente, kind='stable', na_position='last').index.to_numpy()]
+
+    paginas = max(1, -(-len(posicoes) // tamanho))
+    numero = min(max(int(numero), 1), paginas)
+    return {
+        'pagina': tabela.iloc[posicoes[(numero - 1) * tamanho:numero * tamanho]],
+        'numero': numero,
+        'paginas': paginas,
+        'linhas': len(posicoes),
+        'totais': {coluna: tabela[coluna].iloc[posicoes].sum() for coluna in colunas_total},
+    }
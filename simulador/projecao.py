@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+
+from simulador.encargos import calcular_encargos
+from simulador.irpf import ANO_IRPF_PADRAO
+from simulador.rubricas import _Fontes, compilar_regime, ponto_percentual, precalcular_fixos
+from simulador.simulacao import CONFIGURACOES_REGIME, PARAMETROS_PADRAO, SALARIOS_BASE, sobrescritas_cenario
+from simulador.tabelas import buscar_salarios_lote, empacotar_tabelas, gerar_grade_salarios
+from simulador.taxas import taxas_sobrescritas
+from simulador.varredura import LIMITE_MEMORIA_LOTE
+
+# Regras de progressão da projeção:
+#  - 'meses_por_referencia': interstício, em meses, entre uma Ref e a seguinte
+#  - 'mudanca_de_classe': se a progressão passa da última referência de uma classe para a primeira
+#    da classe seguinte (False para na última referência da classe atual)
+#  - 'anuenio_por_ano' e 'anuenio_maximo': pontos percentuais somados a REF-ANUENIO a cada ano e
+#    teto do adicional
+#  - 'coluna_meses_referencia' e 'coluna_meses_anuenio': colunas da folha com os meses já cumpridos
+#    do interstício atual e do ano atual de cada servidor. Sem elas, os servidores são espalhados
+#    igualmente pelo interstício (e pelo ano), na ordem da folha.
+REGRAS_PROGRESSAO_PADRAO = {
+    'meses_por_referencia': 24,
+    'mudanca_de_classe': True,
+    'anuenio_por_ano': 1,
+    'anuenio_maximo': 35,
+    'coluna_meses_referencia': None,
+    'coluna_meses_anuenio': None,
+}
+
+
+# Meses já cumpridos de um ciclo por servidor: da coluna informada (limitados ao ciclo) ou
+# espalhados igualmente pelo ciclo
+def _fases(df, coluna, ciclo):
+    if coluna is None:
+        return np.arange(len(df)) % ciclo
+    return np.clip(df[coluna].fillna(0).to_numpy(dtype=np.int64), 0, ciclo - 1)
+
+
+# Estado inicial de um cenário na projeção: tabela empacotada, Ref no mês 1 (com o enquadramento),
+# Ref máxima alcançável por servidor e as taxas com as sobrescritas do cenário
+def _preparar_cenario(df, parametros, regime, regras):
+    parametros = {**PARAMETROS_PADRAO, 'ano_irpf': ANO_IRPF_PADRAO, **parametros}
+    num_classes, num_referencias = int(parametros['num_classes']), int(parametros['num_referencias'])
+    pacote = empacotar_tabelas(gerar_grade_salarios(parametros['TC'], parametros['TR'], num_classes, num_referencias,
+                                                    [parametros[campo] for campo in SALARIOS_BASE]))
+    referencias = df['Ref'].to_numpy(dtype=float) + parametros['enquadramento']
+    if regras['mudanca_de_classe']:
+        teto = np.full(len(df), float(num_classes * num_referencias))
+    else:
+        teto = np.minimum((np.floor((referencias - 1) / num_referencias) + 1) * num_referencias, num_classes * num_referencias)
+    # Quem já está além do teto (ou fora da tabela) não progride
+    teto = np.maximum(teto, referencias)
+
+    sobrescritas = sobrescritas_cenario(parametros, regime)
+    taxas = {rubrica: taxas_sobrescritas(df, rubrica, [entrada for entrada in sobrescritas if entrada[0] == rubrica]).to_numpy(dtype=float)
+             for rubrica in dict.fromkeys(entrada[0] for entrada in sobrescritas)}
+    anuenio = taxas.get('REF-ANUENIO', df['REF-ANUENIO'].to_numpy(dtype=float))
+    return {'parametros': parametros, 'pacote': pacote, 'referencias': referencias, 'teto': teto, 'taxas': taxas,
+            'anuenio': anuenio}
+
+
+# Ref de cada servidor nos meses informados (meses x servidores), contados a partir de 1
+def _referencias_meses(cenario, meses, fase, intersticio):
+    passos = (meses[:, None] - 1 + fase) // intersticio
+    return np.minimum(cenario['referencias'] + passos, cenario['teto'])
+
+
+# Avalia um lote de meses de um cenário: o eixo dos meses fica na frente do eixo dos servidores,
+# então cada operação do grafo de rubricas cobre o lote inteiro. Devolve os totais de cada mês.
+def _avaliar_meses(df, regime, cenario, meses, fases, regras):
+    fase_referencia, fase_anuenio = fases
+    unidade = ponto_percentual(regime)
+    referencias = _referencias_meses(cenario, meses, fase_referencia, regras['meses_por_referencia'])
+    anteriores = _referencias_meses(cenario, meses - 1, fase_referencia, regras['meses_por_referencia'])
+
+    anos = (meses[:, None] - 1 + fase_anuenio) // 12
+    teto_anuenio = np.maximum(regras['anuenio_maximo'] * unidade, cenario['anuenio'])
+    fontes = {
+        **cenario['taxas'],
+        'Novo Salário': buscar_salarios_lote(np.broadcast_to(cenario['pacote'], (len(meses),) + cenario['pacote'].shape),
+                                             df['Niv'].str.slice(0, 1), df['CH'], referencias),
+        'REF-ANUENIO': np.minimum(cenario['anuenio'] + anos * regras['anuenio_por_ano'] * unidade, teto_anuenio),
+    }
+    _, grafo_cenario = compilar_regime(regime)
+    rubricas = _Fontes(grafo_cenario.avaliar(_Fontes(fontes, df), {'taxa_he_noturna': cenario['parametros']['taxa_he_noturna']}),
+                       fontes)
+
+    def total(nome):
+        return np.nansum(np.broadcast_to(rubricas[nome], referencias.shape), axis=-1)
+
+    _, coluna_nova = CONFIGURACOES_REGIME[regime]['remuneracao']
+    return {
+        'progredidos': ((referencias > anteriores) & (meses[:, None] > 1)).sum(axis=-1),
+        'remuneracao': total(coluna_nova),
+        'ipm_previfor_patronal': total('nova_IPM PREVFOR-PATRONAL'),
+    }
+
+
+# Projeção mês a mês do impacto de um cenário sobre a folha (já filtrada). Em cada mês os
+# servidores avançam de Ref conforme as regras de progressão (ver REGRAS_PROGRESSAO_PADRAO; as que
+# faltam em 'regras' ficam com o valor padrão) e o anuênio cresce a cada ano; as rubricas do
+# regime e os encargos são recalculados a cada mês. O mês 1 é a folha atual, igual ao resultado de
+# simular.
+#
+# Sem 'base', a remuneração anterior é a da planilha, constante em todos os meses (como em simular);
+# com 'base' (parâmetros de outro cenário, por exemplo PARAMETROS_PADRAO para a tabela em vigor), a
+# remuneração anterior também é projetada, com as mesmas regras, e o impacto mede só a diferença
+# entre os dois cenários. Os meses são avaliados em lotes vetorizados (tamanho_lote, por padrão o
+# que cabe em LIMITE_MEMORIA_LOTE).
+#
+# Devolve uma tabela com uma linha por mês: servidores que progrediram no mês, remuneração, encargos
+# e folha mensal anterior e nova, impacto do mês e impacto acumulado.
+def projetar(parametros, df, regime='amc', meses=12, regras=None, base=None, tamanho_lote=None):
+    if meses < 1:
+        raise ValueError('A projeção precisa de pelo menos um mês')
+    regras = {**REGRAS_PROGRESSAO_PADRAO, **(regras or {})}
+    grafo_carga, grafo_cenario = compilar_regime(regime)
+    if any(nome not in df for nome in grafo_carga.posicao):
+        df = precalcular_fixos(df.copy(), regime)
+
+    fases = (_fases(df, regras['coluna_meses_referencia'], regras['meses_por_referencia']),
+             _fases(df, regras['coluna_meses_anuenio'], 12))
+    cenarios = {'novo': _preparar_cenario(df, parametros, regime, regras)}
+    if base is not None:
+        cenarios['anterior'] = _preparar_cenario(df, base, regime, regras)
+
+    if tamanho_lote is None:
+        tamanho_lote = max(1, LIMITE_MEMORIA_LOTE // (8 * len(grafo_cenario.ordem) * max(len(df), 1)))
+    todos_meses = np.arange(1, meses + 1)
+    totais = {nome: [_avaliar_meses(df, regime, cenario, todos_meses[inicio:inicio + tamanho_lote], fases, regras)
+                     for inicio in range(0, meses, tamanho_lote)]
+              for nome, cenario in cenarios.items()}
+    totais = {nome: {chave: np.concatenate([lote[chave] for lote in lotes]) for chave in lotes[0]} for nome, lotes in totais.items()}
+
+    if base is None:
+        coluna_anterior, _ = CONFIGURACOES_REGIME[regime]['remuneracao']
+        remuneracao_anterior = np.full(meses, df[coluna_anterior].sum())
+        encargos_anteriores = calcular_encargos(remuneracao_anterior, np.full(meses, df['IPM PREVFOR-PATRONAL'].sum()))
+    else:
+        remuneracao_anterior = totais['anterior']['remuneracao']
+        encargos_anteriores = calcular_encargos(remuneracao_anterior, totais['anterior']['ipm_previfor_patronal'])
+    encargos_novos = calcular_encargos(totais['novo']['remuneracao'], totais['novo']['ipm_previfor_patronal'])
+    impacto = encargos_novos['impacto_mensal'] - encargos_anteriores['impacto_mensal']
+
+    return pd.DataFrame({
+        'Servidores Progredidos': totais['novo']['progredidos'],
+        'Remuneração Anterior': remuneracao_anterior,
+        'Remuneração Nova': totais['novo']['remuneracao'],
+        'Encargos Anteriores': encargos_anteriores['encargos'],
+        'Encargos Novos': encargos_novos['encargos'],
+        'Folha Anterior': encargos_anteriores['impacto_mensal'],
+        'Folha Nova': encargos_novos['impacto_mensal'],
+        'Impacto': impacto,
+        'Impacto Acumulado': np.cumsum(impacto),
+    }, index=pd.Index(todos_meses, name='Mês'))
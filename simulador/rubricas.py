@@ -0,0 +1,335 @@
+from collections import namedtuple
+
+import numpy as np
+
+# Uma rubrica do grafo: nome da coluna gerada, operação, entradas e os dados da operação
+#  - 'soma': soma das entradas, cada uma multiplicada pelo seu peso
+#  - 'produto': primeira entrada dividida pelos divisores, vezes a constante e as demais entradas,
+#    arredondada em 'casas' decimais quando informado
+#  - 'funcao': resultado de funcao(*entradas), para expressões que não cabem nas anteriores
+Rubrica = namedtuple('Rubrica', ['nome', 'operacao', 'entradas', 'pesos', 'divisores', 'constante', 'casas', 'funcao'])
+
+
+def soma(nome, entradas, pesos=None):
+    return Rubrica(nome, 'soma', tuple(entradas), tuple(pesos or [1] * len(entradas)), (), 1.0, None, None)
+
+
+def produto(nome, entradas, constante=1.0, divisores=(), casas=None):
+    return Rubrica(nome, 'produto', tuple(entradas), (), tuple(divisores), constante, casas, None)
+
+
+def funcao(nome, entradas, expressao):
+    return Rubrica(nome, 'funcao', tuple(entradas), (), (), 1.0, None, expressao)
+
+
+# Rubricas fixas incorporadas que entram em todas as bases de cálculo
+INCORPORACOES = ['0223-VP', '0248-VPNI HEI', '0001-G.F.INC-DNI1', '0004-G.R.INC.DAS1', '0005-G.R.INC.DAS2',
+                 '0006-G.R.INC.DAS3', '0007-G.R.INC.DNS1', '0008-G.R.INC.DNS2', '0009-G.R.INC.DNS3',
+                 '0026-GR INC AT1', '0027-GR INC AT2']
+
+# Rubricas fixas que só entram no total de proventos (o 0308-DIF.AJ.PCCS também, mas já vem na base do IPM)
+OUTROS_PROVENTOS = ['0320-GAJ 9903/12', '0170-DIR.NIV.SUPE', '0174-VRB.ESP.REP',
+                    '0180-DIR.ASS.SUPE', '0190-DIR.NIV.INT.', '058-DIR GER 01', '0326-GTRTC', '0206-AB.PERMANENC']
+
+# Gratificações calculadas como taxa (coluna REF-*) sobre o novo salário
+GRATIFICACOES = {
+    'novo_0085-ITA': 'REF-ITA',
+    'novo_0107-ANUENIO': 'REF-ANUENIO',
+    'nova_105-INSALUBRIDAD': 'REF-INSALUBRIDAD',
+    'nova_0118-GR.PRODUT_': 'REF-GR.PRODUT',
+    'nova_0096-GAT': 'REF-GAT',
+    'nova_0097-GEEF-AMC': 'REF-GEEF-AMC',
+    'nova_0159-GR.R.VIDA': 'REF-GR.R.VIDA',
+    'nova_0318-GE AMC': 'REF-GE AMC',
+}
+
+
+# Monta as rubricas da folha. As somas parciais que se repetem nos totais (incorporações e
+# gratificações comuns) viram nós próprios e são calculadas uma vez só.
+# taxa_em_percentual: as colunas REF-* estão em % (divididas por 100) em vez de fração.
+# rubricas_he_noturna: regra da nova hora extra noturna, que varia entre os regimes.
+def _rubricas_folha(taxa_em_percentual, rubricas_he_noturna):
+    constante = 0.01 if taxa_em_percentual else 1.0
+    rubricas = [produto(nome, [taxa, 'Novo Salário'], constante) for nome, taxa in GRATIFICACOES.items()]
+    rubricas += [
+        soma('_incorporacoes', INCORPORACOES),
+        soma('_gratificacoes_comuns', ['Novo Salário', 'novo_0085-ITA', 'novo_0107-ANUENIO', 'nova_105-INSALUBRIDAD',
+                                       'nova_0118-GR.PRODUT_', 'nova_0318-GE AMC']),
+        soma('_gat_geef', ['nova_0096-GAT', 'nova_0097-GEEF-AMC']),
+        soma('_outros_proventos', OUTROS_PROVENTOS),
+        soma('novo_0817-B HR INC', ['_incorporacoes', '_gratificacoes_comuns', 'nova_0159-GR.R.VIDA']),
+        produto('nova_0133-HR.EXTR.INCO', ['novo_0817-B HR INC', 'REF-HR.EXTR.INCO'], 1.25, divisores=['CH'], casas=2),
+        soma('nova_0801-IPM PREVFOR', ['_gratificacoes_comuns', '_gat_geef', 'nova_0133-HR.EXTR.INCO', '_incorporacoes', '0308-DIF.AJ.PCCS']),
+        soma('novo_0996-TOT.PROVENTO', ['nova_0801-IPM PREVFOR', 'nova_0159-GR.R.VIDA', '_outros_proventos']),
+        # O VP entra duas vezes na base da hora noturna, como na planilha original
+        soma('nova_0872-B HR NOTURNA', ['novo_0817-B HR INC', '_gat_geef', 'nova_0133-HR.EXTR.INCO', '0223-VP']),
+        produto('nova_0099-HR NOTURNAS', ['nova_0872-B HR NOTURNA', 'REF-HR NOTURNAS'], 0.2, divisores=['CH']),
+        produto('nova_0183-GR SER EXTRA', ['nova_0872-B HR NOTURNA', 'REF-GR SER EXTRA'], 1.5, divisores=['CH']),
+    ] + rubricas_he_noturna + [
+        produto('nova_IPM PREVFOR-PATRONAL', ['nova_0801-IPM PREVFOR'], 0.28),
+        produto('nova_IPM PREVFOR-SERVIDOR', ['nova_0801-IPM PREVFOR'], 0.14),
+        soma('nova_base_IRPF', ['novo_0996-TOT.PROVENTO', 'nova_IPM PREVFOR-SERVIDOR'], [1, -1]),
+    ]
+    return rubricas
+
+
+# Conjuntos de fórmulas por regime. 'amc' é o usado pelo dashboard com filtros (taxas em fração e
+# reajuste editável da HE noturna); 'amc_percentual' é o do dashboard.py, com taxas em %.
+REGIMES = {
+    'amc': _rubricas_folha(False, [
+        # Fator (1 + taxa) * (1 + reajuste / 100) - 1 escrito como taxa + reajuste + taxa * reajuste,
+        # só com somas e produtos, para que a rubrica continue polinomial (ver simulador.cubo)
+        produto('_reajuste_he_noturna', ['taxa_he_noturna'], 0.01),
+        produto('_taxa_reajuste_he_noturna', ['REF-HE NOTURNA', '_reajuste_he_noturna']),
+        soma('_fator_he_noturna', ['REF-HE NOTURNA', '_reajuste_he_noturna', '_taxa_reajuste_he_noturna']),
+        produto('nova_0383-HE NOTURNA', ['nova_0872-B HR NOTURNA', '_fator_he_noturna'], 1.5 * 1.2 * 100, divisores=['CH']),
+    ]),
+    'amc_percentual': _rubricas_folha(True, [
+        produto('nova_0383-HE NOTURNA', ['nova_0872-B HR NOTURNA', 'REF-HE NOTURNA'], 1.5 * 1.2, divisores=['CH']),
+    ]),
+}
+
+
+# Valor de um ponto percentual na unidade das colunas REF-* do regime (fração ou %), tirado da
+# constante das rubricas de GRATIFICACOES
+def ponto_percentual(regime):
+    for rubrica in REGIMES[regime]:
+        if rubrica.nome in GRATIFICACOES:
+            return 0.01 / rubrica.constante
+    return 0.01
+
+
+def registrar_regime(nome, rubricas):
+    REGIMES[nome] = list(rubricas)
+
+
+# Calcula uma rubrica em 'saida' (já alocada), sem criar arrays temporários
+def _calcular_rubrica(rubrica, valor_de, saida):
+    entradas = [valor_de(nome) for nome in rubrica.entradas]
+    if rubrica.operacao == 'soma':
+        np.multiply(entradas[0], rubrica.pesos[0], out=saida)
+        for entrada, peso in zip(entradas[1:], rubrica.pesos[1:]):
+            if peso == 1:
+                np.add(saida, entrada, out=saida)
+            elif peso == -1:
+                np.subtract(saida, entrada, out=saida)
+            else:
+                saida += entrada * peso
+    elif rubrica.operacao == 'produto':
+        np.copyto(saida, entradas[0])
+        for divisor in rubrica.divisores:
+            np.divide(saida, valor_de(divisor), out=saida)
+        if rubrica.constante != 1:
+            np.multiply(saida, rubrica.constante, out=saida)
+        for entrada in entradas[1:]:
+            np.multiply(saida, entrada, out=saida)
+        if rubrica.casas is not None:
+            np.round(saida, rubrica.casas, out=saida)
+    else:
+        saida[...] = rubrica.funcao(*entradas)
+
+
+# Grafo de rubricas compilado: ordem topológica, rubricas repetidas unificadas e avaliação
+# direto em um bloco de memória alocado de uma vez
+class GrafoRubricas:
+
+    def __init__(self, rubricas):
+        rubricas = list(rubricas)
+        por_nome = {}
+        for rubrica in rubricas:
+            if rubrica.nome in por_nome:
+                raise ValueError(f'Rubrica duplicada no grafo: {rubrica.nome}')
+            por_nome[rubrica.nome] = rubrica
+
+        # Entradas que não são produzidas pelo grafo vêm da folha ou dos parâmetros
+        self.entradas_externas = sorted({entrada for rubrica in rubricas
+                                         for entrada in rubrica.entradas + rubrica.divisores
+                                         if entrada not in por_nome})
+
+        # Ordenação topológica (Kahn), mantendo a ordem de declaração entre rubricas independentes
+        dependencias = {nome: {e for e in r.entradas + r.divisores if e in por_nome} for nome, r in por_nome.items()}
+        ordem = []
+        prontas = [nome for nome in por_nome if not dependencias[nome]]
+        while prontas:
+            nome = prontas.pop(0)
+            ordem.append(nome)
+            for outro in por_nome:
+                if nome in dependencias[outro]:
+                    dependencias[outro].discard(nome)
+                    if not dependencias[outro] and outro not in ordem and outro not in prontas:
+                        prontas.append(outro)
+        if len(ordem) != len(por_nome):
+            raise ValueError('O grafo de rubricas tem dependência circular: ' + ', '.join(sorted(set(por_nome) - set(ordem))))
+
+        # Rubricas com a mesma operação sobre as mesmas entradas são calculadas uma vez só
+        self.apelidos = {}
+        vistas = {}
+        self.ordem = []
+        for nome in ordem:
+            rubrica = por_nome[nome]
+            entradas = tuple(self.apelidos.get(e, e) for e in rubrica.entradas)
+            divisores = tuple(self.apelidos.get(e, e) for e in rubrica.divisores)
+            rubrica = rubrica._replace(entradas=entradas, divisores=divisores)
+            if rubrica.operacao == 'soma':
+                assinatura = ('soma', tuple(sorted(zip(entradas, rubrica.pesos))))
+            elif rubrica.operacao == 'produto':
+                assinatura = ('produto', entradas, divisores, rubrica.constante, rubrica.casas)
+            else:
+                assinatura = ('funcao', entradas, id(rubrica.funcao))
+            if assinatura in vistas:
+                self.apelidos[nome] = vistas[assinatura]
+            else:
+                vistas[assinatura] = nome
+                self.ordem.append(rubrica)
+        self.posicao = {rubrica.nome: i for i, rubrica in enumerate(self.ordem)}
+
+    # Avalia o grafo. fontes é qualquer objeto indexável por nome (DataFrame, dicionário de arrays)
+    # com as colunas da folha; parametros guarda os valores escalares (por exemplo taxa_he_noturna).
+    # Devolve um dicionário {rubrica: array}; todas as rubricas ocupam linhas de um único bloco.
+    def avaliar(self, fontes, parametros=None):
+        parametros = parametros or {}
+        externas = {}
+        for nome in self.entradas_externas:
+            valor = parametros[nome] if nome in parametros else fontes[nome]
+            externas[nome] = np.asarray(valor, dtype=float)
+        formato = np.broadcast_shapes(*(valor.shape for valor in externas.values()))
+        bloco = np.empty((len(self.ordem),) + formato)
+
+        def valor_de(nome):
+            if nome in self.posicao:
+                return bloco[self.posicao[nome]]
+            return externas[nome]
+
+        for i, rubrica in enumerate(self.ordem):
+            _calcular_rubrica(rubrica, valor_de, bloco[i])
+
+        resultado = {rubrica.nome: bloco[i] for i, rubrica in enumerate(self.ordem)}
+        for nome, original in self.apelidos.items():
+            if original in resultado:
+                resultado[nome] = resultado[original]
+        return resultado
+
+    # Avaliação incremental: cada rubrica vira um nó do avaliador (ver simulador.incremental) e só é
+    # recalculada quando alguma entrada mudou desde a última chamada. Entradas que o avaliador
+    # conhece (por exemplo 'Novo Salário' ou uma taxa REF-* sobrescrita) usam a versão registrada
+    # nele; as demais colunas da folha dependem do nó 'base'.
+    def avaliar_incremental(self, fontes, parametros, avaliador, base='folha'):
+        parametros = parametros or {}
+        resultado = {}
+
+        def valor_de(nome):
+            if nome in resultado:
+                return resultado[nome]
+            return np.asarray(parametros[nome] if nome in parametros else fontes[nome], dtype=float)
+
+        for rubrica in self.ordem:
+            dependencias, valores_parametros = [], []
+            for entrada in rubrica.entradas + rubrica.divisores:
+                if entrada in parametros:
+                    valores_parametros.append((entrada, parametros[entrada]))
+                elif entrada in self.posicao or avaliador.conhece(entrada):
+                    dependencias.append(entrada)
+                else:
+                    dependencias.append(base)
+
+            def calcular(rubrica=rubrica):
+                entradas = [valor_de(nome) for nome in rubrica.entradas + rubrica.divisores]
+                saida = np.empty(np.broadcast_shapes(*(np.shape(valor) for valor in entradas)))
+                _calcular_rubrica(rubrica, valor_de, saida)
+                return saida
+
+            resultado[rubrica.nome] = avaliador.calcular(rubrica.nome, dependencias, calcular,
+                                                         (rubrica._replace(funcao=id(rubrica.funcao)), valores_parametros))
+
+        for nome, original in self.apelidos.items():
+            if original in resultado:
+                resultado[nome] = resultado[original]
+                avaliador.apelido(nome, original)
+        return resultado
+
+    # Avaliação parcial: separa o grafo no que só depende de entradas fixas da folha, calculado
+    # uma vez na carga, e no que depende das entradas variáveis, calculado a cada cenário. Nas
+    # somas que misturam os dois tipos, as parcelas fixas são juntadas em uma coluna '_fixo_<rubrica>'.
+    # Devolve (grafo da carga, grafo do cenário).
+    def dobrar(self, variaveis):
+        variaveis = set(variaveis)
+        fixos = set()
+        carga, cenario = [], []
+        for rubrica in self.ordem:
+            dependencias = rubrica.entradas + rubrica.divisores
+            if not any(e in variaveis or (e in self.posicao and e not in fixos) for e in dependencias):
+                fixos.add(rubrica.nome)
+                carga.append(rubrica)
+                continue
+
+            if rubrica.operacao == 'soma':
+                parcelas_fixas = [(e, p) for e, p in zip(rubrica.entradas, rubrica.pesos)
+                                  if e not in variaveis and (e not in self.posicao or e in fixos)]
+                if len(parcelas_fixas) > 1:
+                    nome_fixo = '_fixo_' + rubrica.nome
+                    carga.append(soma(nome_fixo, [e for e, _ in parcelas_fixas], [p for _, p in parcelas_fixas]))
+                    restantes = [(e, p) for e, p in zip(rubrica.entradas, rubrica.pesos) if (e, p) not in parcelas_fixas]
+                    rubrica = soma(rubrica.nome, [e for e, _ in restantes] + [nome_fixo], [p for _, p in restantes] + [1])
+            cenario.append(rubrica)
+
+        grafo_carga, grafo_cenario = GrafoRubricas(carga), GrafoRubricas(cenario)
+        grafo_cenario.apelidos.update(self.apelidos)
+        return grafo_carga, grafo_cenario
+
+
+# Entradas que mudam com os parâmetros do cenário; as demais colunas da folha são fixas
+ENTRADAS_VARIAVEIS = ('Novo Salário', 'taxa_he_noturna') + tuple(GRATIFICACOES.values())
+
+_compilados = {}
+
+
+# Compila (uma vez por processo) o grafo de rubricas de um regime, já separado em
+# (grafo da carga, grafo do cenário)
+def compilar_regime(nome):
+    if nome not in _compilados:
+        _compilados[nome] = GrafoRubricas(REGIMES[nome]).dobrar(ENTRADAS_VARIAVEIS)
+    return _compilados[nome]
+
+
+# Pré-calcula na carga as partes fixas das rubricas do regime (colunas iniciadas por '_'), que
+# não mudam com nenhum parâmetro da barra lateral. Altera o DataFrame e o devolve.
+def precalcular_fixos(df, regime):
+    grafo_carga, _ = compilar_regime(regime)
+    for nome, valores in grafo_carga.avaliar(df).items():
+        df[nome] = valores
+    return df
+
+
+# Une várias fontes de colunas (DataFrame, dicionários) em uma busca só, na ordem dada
+class _Fontes:
+
+    def __init__(self, *fontes):
+        self.fontes = fontes
+
+    def __getitem__(self, nome):
+        for fonte in self.fontes:
+            if nome in fonte:
+                return fonte[nome]
+        raise KeyError(nome)
+
+    def __contains__(self, nome):
+        return any(nome in fonte for fonte in self.fontes)
+
+
+# Calcula as rubricas do regime e as grava no DataFrame; os nós intermediários (iniciados por
+# '_') não viram colunas. Usa as partes fixas de precalcular_fixos quando o DataFrame já as
+# tem; caso contrário, calcula-as na hora. Altera o DataFrame e o devolve. Com um
+# avaliador incremental, só as rubricas cujas entradas mudaram são recalculadas.
+def calcular_rubricas(df, regime, parametros=None, avaliador=None):
+    grafo_carga, grafo_cenario = compilar_regime(regime)
+    fontes = df
+    if any(nome not in df for nome in grafo_carga.posicao):
+        fontes = _Fontes(grafo_carga.avaliar(df), df)
+    if avaliador is None:
+        resultado = grafo_cenario.avaliar(fontes, parametros)
+    else:
+        resultado = grafo_cenario.avaliar_incremental(fontes, parametros, avaliador)
+    for nome, valores in resultado.items():
+        if not nome.startswith('_'):
+            df[nome] = valores
+    return df
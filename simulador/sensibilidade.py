@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+
+from simulador.irpf import ANO_IRPF_PADRAO
+from simulador.orcamento import METAS_ORCAMENTO
+from simulador.rubricas import compilar_regime, precalcular_fixos
+from simulador.simulacao import CONFIGURACOES_REGIME, PARAMETROS_PADRAO, SALARIOS_BASE, TAXAS_CARGO_AMC
+from simulador.taxas import aplicar_sobrescritas
+from simulador.varredura import LIMITE_MEMORIA_LOTE, _rubricas_lote, _totais_lote
+
+# Rótulos dos parâmetros de um cenário na análise de sensibilidade
+ROTULOS_SENSIBILIDADE = {
+    'TC': 'Taxa de Classe',
+    'TR': 'Taxa de Referência',
+    **{campo: f"Salário-base {campo.split('_')[2].upper()} {campo.split('_')[3]}h" for campo in SALARIOS_BASE},
+    'taxa_gat': 'GAT',
+    'taxa_ge_amc': 'GE AMC',
+    'taxa_gr_r_vida': 'GR.R.VIDA',
+    'taxa_he_noturna': 'HE NOTURNA',
+    'enquadramento': 'Enquadramento',
+}
+
+# Taxas por faixa: cada valor da coluna chave (por exemplo cada grau de instrução do ITA) é uma
+# entrada própria da análise, com a coluna REF-* variando só nas linhas daquela faixa
+TAXAS_POR_FAIXA = {'ITA': ('REF-ITA', 'Grau de instrução'), 'GEEF': ('REF-GEEF-AMC', 'Enquadramento do GEEF')}
+
+
+# Entradas da análise no regime: (rótulo, parâmetro ou (coluna REF-*, coluna chave, valor), valor
+# atual, valor baixo, valor alto). Parâmetros contínuos variam 'variacao' para cada lado (ou de 0 a
+# 1 ponto, se estiverem zerados); o enquadramento varia uma referência; as faixas multiplicam a
+# taxa das suas linhas por 1 ± variacao.
+def _entradas(df, parametros, regime, variacao):
+    _, grafo_cenario = compilar_regime(regime)
+    nomes = ['TC', 'TR', *SALARIOS_BASE]
+    if CONFIGURACOES_REGIME[regime]['taxas_cargo_amc']:
+        nomes += list(TAXAS_CARGO_AMC)
+    if 'taxa_he_noturna' in grafo_cenario.entradas_externas:
+        nomes.append('taxa_he_noturna')
+
+    entradas = []
+    for nome in nomes:
+        valor = float(parametros[nome])
+        baixo, alto = (valor * (1 - variacao), valor * (1 + variacao)) if valor else (0.0, 1.0)
+        entradas.append((ROTULOS_SENSIBILIDADE[nome], nome, valor, baixo, alto))
+    enquadramento = int(parametros['enquadramento'])
+    entradas.append((ROTULOS_SENSIBILIDADE['enquadramento'], 'enquadramento', enquadramento, max(enquadramento - 1, 0), enquadramento + 1))
+    for prefixo, (coluna, coluna_chave) in TAXAS_POR_FAIXA.items():
+        if coluna not in df or coluna_chave not in df:
+            continue
+        for valor in sorted(df[coluna_chave].dropna().unique(), key=str):
+            entradas.append((f'{prefixo} {valor}', (coluna, coluna_chave, valor), 1.0, 1 - variacao, 1 + variacao))
+    return entradas
+
+
+# Análise de sensibilidade por diferenças finitas em torno do cenário 'parametros': cada entrada
+# (taxas TC e TR, os seis salários-base, as taxas dos agentes de trânsito, a taxa da HE noturna, o
+# enquadramento e as faixas do ITA e do GEEF, ver _entradas) é levada ao valor baixo e ao alto com as
+# demais fixas. Todos esses cenários, mais o atual, são avaliados juntos em lotes vetorizados (ver
+# varredura; por padrão, o que cabe em LIMITE_MEMORIA_LOTE). As sobrescritas de 'parametros' valem
+# para todos os cenários.
+#
+# Devolve uma tabela com uma linha por entrada, ordenada pela amplitude do impacto anual: valor
+# atual, baixo e alto (nas faixas, o fator aplicado às taxas) e, para cada total de METAS_ORCAMENTO,
+# a variação em relação ao cenário atual no valor baixo ('<meta>_baixo') e no alto ('<meta>_alto')
+# e o efeito marginal por unidade da entrada ('<meta>_marginal').
+def analisar_sensibilidade(df, parametros=None, regime='amc', variacao=0.1, tamanho_lote=None):
+    parametros = {**PARAMETROS_PADRAO, 'ano_irpf': ANO_IRPF_PADRAO, **(parametros or {})}
+    grafo_carga, grafo_cenario = compilar_regime(regime)
+    if any(nome not in df for nome in grafo_carga.posicao):
+        df = precalcular_fixos(df.copy(), regime)
+    if parametros.get('sobrescritas'):
+        df = aplicar_sobrescritas(df.copy(), [tuple(entrada) for entrada in parametros['sobrescritas']])
+
+    entradas = _entradas(df, parametros, regime, variacao)
+    base = {nome: valor for nome, valor in parametros.items() if nome in PARAMETROS_PADRAO}
+    # Cenário atual seguido do baixo e do alto de cada entrada; faixas guardam (coluna, máscara, fator)
+    cenarios, faixas = [base], [None]
+    for _, entrada, _, baixo, alto in entradas:
+        for valor in (baixo, alto):
+            if isinstance(entrada, tuple):
+                coluna, coluna_chave, chave = entrada
+                cenarios.append(base)
+                faixas.append((coluna, (df[coluna_chave] == chave).to_numpy(), valor))
+            else:
+                cenarios.append({**base, entrada: valor})
+                faixas.append(None)
+    cenarios = pd.DataFrame(cenarios)
+
+    if tamanho_lote is None:
+        tamanho_lote = max(1, LIMITE_MEMORIA_LOTE // (8 * len(grafo_cenario.ordem) * max(len(df), 1)))
+    totais = []
+    for inicio in range(0, len(cenarios), tamanho_lote):
+        lote = cenarios.iloc[inicio:inicio + tamanho_lote]
+        taxas = {}
+        for posicao, faixa in enumerate(faixas[inicio:inicio + tamanho_lote]):
+            if faixa is not None:
+                coluna, mascara, fator = faixa
+                if coluna not in taxas:
+                    taxas[coluna] = np.tile(df[coluna].to_numpy(dtype=float), (len(lote), 1))
+                taxas[coluna][posicao, mascara] *= fator
+        rubricas, formato = _rubricas_lote(df, regime, lote, taxas)
+        totais.append(_totais_lote(df, regime, parametros['ano_irpf'], rubricas, formato))
+    totais = pd.concat(totais, ignore_index=True)[list(METAS_ORCAMENTO)]
+
+    atual = totais.iloc[0].to_numpy()
+    baixos = totais.iloc[1::2].to_numpy() - atual
+    altos = totais.iloc[2::2].to_numpy() - atual
+    valores = np.array([(valor, baixo, alto) for _, _, valor, baixo, alto in entradas], dtype=float)
+    passos = valores[:, 2] - valores[:, 1]
+    tabela = pd.DataFrame(valores, columns=['Valor', 'Baixo', 'Alto'], index=pd.Index([entrada[0] for entrada in entradas], name='Parâmetro'))
+    for i, meta in enumerate(METAS_ORCAMENTO):
+        tabela[f'{meta}_baixo'] = baixos[:, i]
+        tabela[f'{meta}_alto'] = altos[:, i]
+        tabela[f'{meta}_marginal'] = np.divide(altos[:, i] - baixos[:, i], passos, out=np.full(len(passos), np.nan), where=passos != 0)
+    amplitude = (tabela['impacto_anual_alto'] - tabela['impacto_anual_baixo']).abs()
+    return tabela.iloc[np.argsort(-amplitude.to_numpy(), kind='stable')]
@@ -0,0 +1,243 @@
+import numpy as np
+import pandas as pd
+
+from simulador.cenario import FolhaCenario
+from simulador.encargos import calcular_encargos
+from simulador.incremental import AvaliadorIncremental
+from simulador.irpf import ANO_IRPF_PADRAO, calcular_irpf
+from simulador.rubricas import calcular_rubricas
+from simulador.tabelas import TABELAS_SALARIAIS, buscar_salarios, empacotar_tabelas, gerar_grade_salarios
+from simulador.taxas import CARGO_AMC, taxas_sobrescritas
+
+# Campos de salário-base de um cenário, na ordem de TABELAS_SALARIAIS
+SALARIOS_BASE = tuple(f'salario_base_{letra.lower()}_{ch}' for letra, ch in TABELAS_SALARIAIS)
+
+# Parâmetros de um cenário e seus valores padrão (os mesmos da barra lateral do dashboard com
+# filtros). Taxas em %.
+PARAMETROS_PADRAO = {
+    'TC': 2,
+    'TR': 2,
+    'num_classes': 5,
+    'num_referencias': 6,
+    'enquadramento': 0,
+    **dict(zip(SALARIOS_BASE, (886.29, 1160.66, 1582.67, 1181.71, 1547.55, 2110.22))),
+    'taxa_gat': 100,
+    'taxa_ge_amc': 100,
+    'taxa_gr_r_vida': 40,
+    'taxa_he_noturna': 0,
+}
+
+# Taxas editáveis que valem só para o cargo dos agentes de trânsito, com a coluna REF-* de cada uma
+TAXAS_CARGO_AMC = {'taxa_gat': 'REF-GAT', 'taxa_ge_amc': 'REF-GE AMC', 'taxa_gr_r_vida': 'REF-GR.R.VIDA'}
+
+# O que muda de um regime para outro na simulação: colunas da remuneração anterior e nova usadas
+# nos resumos e se as taxas de TAXAS_CARGO_AMC são aplicadas
+CONFIGURACOES_REGIME = {
+    'amc': {'remuneracao': ('0996-TOT.PROVENTO', 'novo_0996-TOT.PROVENTO'), 'taxas_cargo_amc': True},
+    'amc_percentual': {'remuneracao': ('VENCIMENTO BASE', 'Novo Salário'), 'taxas_cargo_amc': False},
+}
+
+# Gratificações comparadas antes e depois: coluna atual e coluna calculada
+GRATIFICACOES_COMPARADAS = {
+    'ITA': ('0085-ITA', 'novo_0085-ITA'),
+    'GAT': ('0096-GAT', 'nova_0096-GAT'),
+    'GEEF-AMC': ('0097-GEEF-AMC', 'nova_0097-GEEF-AMC'),
+    'GR.R.VIDA': ('0159-GR.R.VIDA', 'nova_0159-GR.R.VIDA'),
+    'GE AMC': ('0318-GE AMC', 'nova_0318-GE AMC'),
+}
+
+
+# coluna_quantidade: coluna com a quantidade de pessoas de cada linha (por exemplo nas células do
+# cubo); sem ela, cada linha é uma pessoa
+def contar_pessoas(df, coluna_remuneracao, coluna_quantidade=None):
+    # Contar pessoas por cargo, carga horária e referência
+    if coluna_quantidade is None:
+        quantidade_pessoas = df.groupby(['Cargo', 'CH', 'Ref'], observed=True)[coluna_remuneracao].size().reset_index(name='Quantidade')
+    else:
+        quantidade_pessoas = df.groupby(['Cargo', 'CH', 'Ref'], observed=True)[coluna_quantidade].sum().reset_index(name='Quantidade')
+
+    # Calcular o consolidado do VENCIMENTO BASE
+    consolidado_vencimento_base = df.groupby(['Cargo', 'CH', 'Ref'], observed=True)[coluna_remuneracao].sum().reset_index(name='Consolidado VENCIMENTO BASE')
+
+    # Concatenar o consolidado com a tabela de quantidade de pessoas
+    return pd.merge(quantidade_pessoas, consolidado_vencimento_base, on=['Cargo', 'CH', 'Ref'])
+
+
+# contagem: 'count' conta os nomes de cada cargo; 'sum' soma uma coluna 'Nome' que já traz a
+# quantidade de nomes (células do cubo)
+def calcular_impacto(df, coluna_anterior, coluna_nova, contagem='count'):
+    # Agrupar por cargo e calcular a quantidade de funcionários, a remuneração anterior e a remuneração nova
+    resumo_cargos = df.groupby('Cargo', observed=True).agg({'Nome': contagem, coluna_anterior: 'sum', coluna_nova: 'sum'}).reset_index()
+
+    # Calcular o impacto
+    resumo_cargos['Impacto'] = resumo_cargos[coluna_nova] - resumo_cargos[coluna_anterior]
+
+    # Renomear colunas
+    resumo_cargos.rename(columns={'Nome': 'Quantidade', coluna_anterior: 'Remuneração Anterior', coluna_nova: 'Remuneração Nova'}, inplace=True)
+
+    return resumo_cargos
+
+
+# Sobrescritas de taxa de um cenário: as taxas dos agentes de trânsito (quando o regime as usa)
+# seguidas das entradas extras de parametros['sobrescritas'] (por exemplo ITA e GEEF)
+def sobrescritas_cenario(parametros, regime='amc'):
+    sobrescritas = []
+    if CONFIGURACOES_REGIME[regime]['taxas_cargo_amc']:
+        sobrescritas = [(coluna, 'Cargo', CARGO_AMC, parametros[campo]) for campo, coluna in TAXAS_CARGO_AMC.items()]
+    return sobrescritas + [tuple(entrada) for entrada in parametros.get('sobrescritas', ())]
+
+
+# Simula um cenário sobre a folha (já filtrada) e devolve um dicionário com:
+#  - 'df': a folha do cenário (FolhaCenario) com o novo salário, as rubricas novas e o IRPF;
+#    df.quadro() a devolve como DataFrame
+#  - 'grades': as seis tabelas salariais, na ordem de TABELAS_SALARIAIS
+#  - 'quantidade_pessoas', 'tabela_novo_salario', 'resumo_cargos', 'encargos', 'suavizacoes',
+#    'gratificacoes' e 'salarios_por_cargo': as tabelas exibidas nos dashboards, numéricas e ainda
+#    sem formatação
+#  - 'totais': os totais em números (remuneração, folha com encargos, suavizações e impactos)
+# parametros usa as chaves de PARAMETROS_PADRAO (as que faltam ficam com o valor padrão), mais
+# 'ano_irpf' e 'sobrescritas'. Não altera nem copia o DataFrame recebido: as colunas do cenário
+# ficam na camada da FolhaCenario. Com um AvaliadorIncremental (por exemplo guardado na sessão do
+# Streamlit), só as etapas cujas entradas mudaram são refeitas; nesse caso chave_folha deve
+# identificar a folha recebida (planilha, filtros...).
+def simular(parametros, df, regime='amc', avaliador=None, chave_folha=None):
+    parametros = {**PARAMETROS_PADRAO, 'ano_irpf': ANO_IRPF_PADRAO, **parametros}
+    coluna_anterior, coluna_nova = CONFIGURACOES_REGIME[regime]['remuneracao']
+    if avaliador is None:
+        avaliador, chave_folha = AvaliadorIncremental(), id(df)
+    elif chave_folha is None:
+        raise ValueError('chave_folha é obrigatória quando um avaliador incremental é informado')
+    avaliador.iniciar()
+    avaliador.entrada('folha', (regime, chave_folha))
+    avaliador.entrada('enquadramento', parametros['enquadramento'])
+
+    df = FolhaCenario(df)
+    df['Ref'] = df['Ref'] + parametros['enquadramento']
+
+    # Soma de uma coluna, refeita só quando a coluna muda
+    def total(coluna):
+        dependencias = [coluna] if avaliador.conhece(coluna) else ['folha']
+        return avaliador.calcular(('total', coluna), dependencias, lambda: df[coluna].sum())
+
+    # Aplicando todas as taxas de gratificação em uma única passada por rubrica
+    sobrescritas = sobrescritas_cenario(parametros, regime)
+    for rubrica in dict.fromkeys(entrada[0] for entrada in sobrescritas):
+        entradas = [entrada for entrada in sobrescritas if entrada[0] == rubrica]
+        df[rubrica] = avaliador.calcular(rubrica, ['folha'], lambda: taxas_sobrescritas(df, rubrica, entradas), entradas)
+
+    # Seis tabelas salariais e busca do novo salário de todos os servidores de uma vez
+    configuracao_tabela = (parametros['TC'], parametros['TR'], int(parametros['num_classes']), int(parametros['num_referencias']),
+                           [parametros[campo] for campo in SALARIOS_BASE])
+    grades = avaliador.calcular('grades', [], lambda: gerar_grade_salarios(*configuracao_tabela), configuracao_tabela)
+    df['Novo Salário'] = avaliador.calcular('Novo Salário', ['folha', 'enquadramento', 'grades'], lambda: buscar_salarios(
+        empacotar_tabelas(grades), df['Niv'].str.slice(0, 1), df['CH'], df['Ref']))
+
+    # Rubricas do regime calculadas pelo grafo compilado
+    calcular_rubricas(df, regime, {'taxa_he_noturna': parametros['taxa_he_noturna']}, avaliador)
+    # Base anterior e nova passam juntas pela mesma tabela do IRPF
+    df['IRPF_calculado'], df['nova_IRPF'] = avaliador.calcular('IRPF', ['folha', 'nova_base_IRPF'], lambda: calcular_irpf(
+        np.column_stack([df['BASE IRPF'], df['nova_base_IRPF']]), parametros['ano_irpf']).T, parametros['ano_irpf'])
+    avaliador.entrada('IRPF_calculado', avaliador.versao('IRPF'))
+    avaliador.entrada('nova_IRPF', avaliador.versao('IRPF'))
+
+    quantidade_pessoas = avaliador.calcular('quantidade_pessoas', ['folha', 'enquadramento'], lambda: contar_pessoas(df[['Cargo', 'CH', 'Ref', coluna_anterior]], coluna_anterior))
+    tabela_com_novo_salario = avaliador.calcular('tabela_novo_salario', ['folha', 'enquadramento', coluna_nova],
+                                                 lambda: df[['Nome', 'Cargo', 'CH', 'Ref', coluna_anterior, coluna_nova]])
+    resumo_cargos = avaliador.calcular('resumo_cargos', ['folha', coluna_nova], lambda: calcular_impacto(
+        df[['Cargo', 'Nome', coluna_anterior, coluna_nova]], coluna_anterior, coluna_nova))
+    salarios_por_cargo = pd.DataFrame({
+        'Antes': avaliador.calcular('salarios_antes', ['folha'], lambda: df[coluna_anterior].groupby(df['Cargo'], observed=True).sum()),
+        'Depois': avaliador.calcular('salarios_depois', [coluna_nova], lambda: df[coluna_nova].groupby(df['Cargo'], observed=True).sum()),
+    })
+
+    resultados = montar_resultados(grades, quantidade_pessoas, tabela_com_novo_salario, resumo_cargos, salarios_por_cargo,
+                                   total, regime)
+    return {'df': df, **resultados}
+
+
+# Tabela de itens (descrição, valor anterior, valor novo) com o impacto de cada um, montada de uma vez
+def _tabela_itens(itens):
+    tabela = pd.DataFrame(itens, columns=['Item', 'Remuneração Anterior', 'Remuneração Nova'])
+    tabela['Impacto'] = tabela['Remuneração Nova'] - tabela['Remuneração Anterior']
+    return tabela
+
+
+# Completa as tabelas de um cenário com os totalizadores, os encargos, as suavizações e as
+# gratificações. quantidade_pessoas, tabela_novo_salario e resumo_cargos vêm como saem de
+# contar_pessoas, da seleção de colunas da folha e de calcular_impacto; total(coluna) devolve a
+# soma de uma coluna da folha. Usada por simular e pelo cubo (simulador.cubo), que calculam
+# essas somas de jeitos diferentes.
+def montar_resultados(grades, quantidade_pessoas, tabela_novo_salario, resumo_cargos, salarios_por_cargo, total, regime='amc'):
+    coluna_anterior, coluna_nova = CONFIGURACOES_REGIME[regime]['remuneracao']
+
+    # Quantidade de pessoas por cargo, carga horária e referência, com o totalizador geral
+    total_quantidade = quantidade_pessoas['Quantidade'].sum()
+    total_geral = pd.DataFrame({'Cargo': ['Total Geral'], 'Quantidade': [total_quantidade],
+                                'Consolidado VENCIMENTO BASE': [quantidade_pessoas['Consolidado VENCIMENTO BASE'].sum()]})
+    quantidade_pessoas = pd.concat([quantidade_pessoas, total_geral], ignore_index=True)
+
+    remuneracao_anterior = total(coluna_anterior)
+    remuneracao_nova = total(coluna_nova)
+    impacto_remuneracao = remuneracao_nova - remuneracao_anterior
+
+    # Tabela do novo salário com a linha de totais
+    tabela_com_novo_salario = tabela_novo_salario.copy()
+    tabela_com_novo_salario.loc['Total', [coluna_anterior, coluna_nova]] = [remuneracao_anterior, remuneracao_nova]
+
+    # Encargos
+    encargos_anteriores = calcular_encargos(remuneracao_anterior, total('IPM PREVFOR-PATRONAL'))
+    encargos_novos = calcular_encargos(remuneracao_nova, total('nova_IPM PREVFOR-PATRONAL'))
+    folha_mensal_anterior = encargos_anteriores['impacto_mensal']
+    folha_mensal_nova = encargos_novos['impacto_mensal']
+    impacto_mensal = folha_mensal_nova - folha_mensal_anterior
+
+    # Resumo dos cargos com a linha de totais; as colunas continuam numéricas (a formatação em R$
+    # fica para a exibição, ver simulador.formatacao.estilo_moeda)
+    total_cargos = pd.DataFrame({'Cargo': [''], 'Quantidade': [total_quantidade], 'Remuneração Anterior': [remuneracao_anterior],
+                                 'Remuneração Nova': [remuneracao_nova], 'Impacto': [impacto_remuneracao]}, index=['Total'])
+    resumo_cargos = pd.concat([resumo_cargos.astype({'Cargo': object}), total_cargos])
+
+    # Encargos e impacto mensal e anual, em uma tabela à parte com as mesmas colunas de valores
+    encargos = _tabela_itens(
+        [(descricao, encargos_anteriores[chave], encargos_novos[chave])
+         for descricao, chave in [('Provisão de férias', 'provisao_ferias'), ('Provisão de 13º Salário', 'provisao_decimo'),
+                                  ('Fortaleza Saúde- IPM (4%)', 'ipm_saude'), ('IPM – PREVIFOR-FIN (28%)', 'ipm_previfor_patronal')]]
+        + [('IMPACTO MENSAL', folha_mensal_anterior, folha_mensal_nova),
+           ('IMPACTO ANUAL', folha_mensal_anterior * 12, folha_mensal_nova * 12)])
+
+    # Suavizações: imposto de renda e IPM-PREVIFOR (patronal e servidor), antes e depois
+    itens = [('IMPOSTO DE RENDA', total('IRPF_calculado'), total('nova_IRPF')),
+             ('IPM-PREVIFOR (Patronal)', total('IPM PREVFOR-PATRONAL'), total('nova_IPM PREVFOR-PATRONAL')),
+             ('IPM-PREVIFOR (Servidor)', total('IPM PREVFOR-SERVIDOR'), total('nova_IPM PREVFOR-SERVIDOR'))]
+    valor_mensal_anterior = sum(anterior for _, anterior, _ in itens)
+    valor_mensal_novo = sum(nova for _, _, nova in itens)
+    suavizacoes = _tabela_itens(itens + [('VALOR MENSAL', valor_mensal_anterior, valor_mensal_novo),
+                                         ('VALOR ANUAL', valor_mensal_anterior * 12, valor_mensal_novo * 12)])
+
+    gratificacoes = pd.DataFrame({'Antes': {nome: total(anterior) for nome, (anterior, _) in GRATIFICACOES_COMPARADAS.items()},
+                                  'Depois': {nome: total(nova) for nome, (_, nova) in GRATIFICACOES_COMPARADAS.items()}})
+    return {
+        'grades': grades,
+        'quantidade_pessoas': quantidade_pessoas,
+        'tabela_novo_salario': tabela_com_novo_salario,
+        'resumo_cargos': resumo_cargos,
+        'encargos': encargos,
+        'suavizacoes': suavizacoes,
+        'gratificacoes': gratificacoes,
+        'salarios_por_cargo': salarios_por_cargo,
+        'totais': {
+            'quantidade': total_quantidade,
+            'remuneracao_anterior': remuneracao_anterior,
+            'remuneracao_nova': remuneracao_nova,
+            'encargos_anteriores': encargos_anteriores['encargos'],
+            'encargos_novos': encargos_novos['encargos'],
+            'folha_mensal_anterior': folha_mensal_anterior,
+            'folha_mensal_nova': folha_mensal_nova,
+            'impacto_mensal': impacto_mensal,
+            'impacto_anual': impacto_mensal * 12,
+            'suavizacoes_mensal_anterior': valor_mensal_anterior,
+            'suavizacoes_mensal_nova': valor_mensal_novo,
+            'impacto_suavizacoes_mensal': valor_mensal_novo - valor_mensal_anterior,
+            'impacto_suavizacoes_anual': (valor_mensal_novo - valor_mensal_anterior) * 12,
+        },
+    }
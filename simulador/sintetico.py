@@ -0,0 +1,35 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+# Colunas em R$ que não seguem o padrão '<código>-<rubrica>'
+COLUNAS_MONETARIAS = ('VENCIMENTO BASE', 'IPM PREVFOR-SERVIDOR', 'IPM PREVFOR-PATRONAL', 'BASE IRPF', 'IRPF')
+
+
+# Colunas de valores (rubricas, bases e totais) que acompanham o nível salarial do servidor
+def _colunas_monetarias(df):
+    return [coluna for coluna in df.columns
+            if df[coluna].dtype.kind == 'f' and (re.match(r'\d+-', coluna) or coluna in COLUNAS_MONETARIAS)]
+
+
+# Gera uma folha sintética com n servidores e o mesmo esquema da folha modelo (por exemplo a aba
+# 'amc'). As linhas são sorteadas do modelo, então Ref, CH, Niv, Cargo, grau de instrução,
+# enquadramento do GEEF e as taxas REF-* mantêm as combinações e proporções reais; os valores em
+# R$ de cada servidor são multiplicados por um mesmo fator aleatório em torno de 1 (dispersão
+# lognormal), o que preserva as somas entre rubricas. Prontuario, Nome e CPF são refeitos para
+# serem únicos.
+def gerar_folha(modelo, n, semente=0, dispersao=0.05):
+    gerador = np.random.default_rng(semente)
+    df = modelo.iloc[gerador.integers(0, len(modelo), n)].reset_index(drop=True)
+
+    monetarias = _colunas_monetarias(modelo)
+    df[monetarias] = df[monetarias].to_numpy() * gerador.lognormal(0, dispersao, n)[:, None]
+
+    if 'Prontuario' in df:
+        df['Prontuario'] = np.arange(1, n + 1)
+    if 'Nome' in df:
+        df['Nome'] = pd.Series(np.arange(1, n + 1)).map('SERVIDOR SINTETICO {:07d}'.format)
+    if 'CPF' in df:
+        df['CPF'] = gerador.integers(10**10, 10**11, n)
+    return df
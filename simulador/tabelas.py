@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+# Letras de nível (primeiro caractere de 'Niv') e cargas horárias que possuem tabela salarial
+LETRAS_TABELA = ('B', 'C', 'D')
+CARGAS_HORARIAS = (180, 240)
+
+# Ordem das tabelas quando geradas juntas: B, C e D de 180 horas e depois de 240 horas
+TABELAS_SALARIAIS = tuple((letra, ch) for ch in CARGAS_HORARIAS for letra in LETRAS_TABELA)
+
+
+# Gera a tabela de salários (referências x classes) como a tabela publicada: cada referência aplica
+# TR sobre a anterior e a primeira referência de uma classe aplica TC sobre a última da classe
+# anterior, sempre a partir do valor anterior arredondado em centavos (o arredondamento se acumula
+# ao longo da tabela, como no laço original). salario_base pode ser um número ou um array (por
+# exemplo, os seis salários-base de TABELAS_SALARIAIS): o laço percorre só as células e cada passo
+# cobre todos os salários-base de uma vez. O resultado tem forma salario_base.shape + (referências, classes).
+def gerar_grade_salarios(TC, TR, num_classes, num_referencias, salario_base):
+    salario_base = np.asarray(salario_base, dtype=float)
+    grade = np.empty(salario_base.shape + (num_referencias, num_classes))
+    for j in range(num_classes):
+        for i in range(num_referencias):
+            if i == 0 and j == 0:
+                grade[..., i, j] = salario_base
+            elif i == 0:
+                grade[..., i, j] = np.round(grade[..., num_referencias - 1, j - 1], 2) * (1 + TC / 100)
+            else:
+                grade[..., i, j] = np.round(grade[..., i - 1, j], 2) * (1 + TR / 100)
+    return grade
+
+
+# Empacota as grades de TABELAS_SALARIAIS (array (6, referências, classes)) em um único array
+# indexado por (letra, carga horária, Ref). Ref percorre as referências da classe 1, depois as da
+# classe 2 e assim por diante, começando em 1; a posição 0 fica como NaN.
+def empacotar_tabelas(grades):
+    grades = np.asarray(grades, dtype=float)
+    num_referencias, num_classes = grades.shape[-2:]
+    por_ref = grades.swapaxes(-1, -2).reshape(len(CARGAS_HORARIAS), len(LETRAS_TABELA), num_classes * num_referencias)
+    pacote = np.full((len(LETRAS_TABELA), len(CARGAS_HORARIAS), num_classes * num_referencias + 1), np.nan)
+    pacote[..., 1:] = por_ref.swapaxes(0, 1)
+    return pacote
+
+
+# Códigos (letra, carga horária) da tabela de cada servidor. Níveis sem tabela própria (V, A1,
+# ANS...) usam a tabela do servidor anterior, como fazia o laço original; antes do primeiro
+# servidor com tabela conhecida o código é -1.
+def _codigos_tabela(letras, cargas_horarias):
+    codigo_letra = pd.Categorical(np.asarray(letras), categories=LETRAS_TABELA).codes
+    codigo_ch = pd.Categorical(np.asarray(cargas_horarias), categories=CARGAS_HORARIAS).codes
+
+    sem_tabela = (codigo_letra < 0) | (codigo_ch < 0)
+    if sem_tabela.any():
+        codigo_tabela = pd.Series(np.where(sem_tabela, np.nan, codigo_letra * len(CARGAS_HORARIAS) + codigo_ch)).ffill()
+        codigo_tabela = codigo_tabela.fillna(-1).to_numpy(dtype=np.int64)
+        codigo_letra = np.where(codigo_tabela >= 0, codigo_tabela // len(CARGAS_HORARIAS), -1)
+        codigo_ch = np.where(codigo_tabela >= 0, codigo_tabela % len(CARGAS_HORARIAS), -1)
+    return codigo_letra, codigo_ch
+
+
+# Busca o salário de cada servidor no array empacotado com uma única indexação do NumPy.
+# Servidores com Ref fora da tabela ou sem tabela conhecida (ver _codigos_tabela) recebem NaN.
+def buscar_salarios(pacote, letras, cargas_horarias, referencias):
+    codigo_letra, codigo_ch = _codigos_tabela(letras, cargas_horarias)
+    return buscar_salarios_codigos(pacote, codigo_letra, codigo_ch, referencias)
+
+
+# Mesma busca de buscar_salarios a partir dos códigos de tabela já resolvidos (-1 = sem tabela)
+def buscar_salarios_codigos(pacote, codigo_letra, codigo_ch, referencias):
+    refs = np.asarray(referencias, dtype=float)
+
+    validos = (codigo_letra >= 0) & (codigo_ch >= 0) & (refs >= 0) & (refs < pacote.shape[-1])
+    novo_salario = np.full(refs.shape, np.nan)
+    novo_salario[validos] = pacote[codigo_letra[validos], codigo_ch[validos], refs[validos].astype(np.int64)]
+    return novo_salario
+
+
+# Versão em lote de buscar_salarios: pacotes tem forma (cenários, letras, cargas horárias, Ref) e
+# referencias (cenários, servidores); devolve o novo salário de cada servidor em cada cenário.
+# Pacotes de tamanhos diferentes podem ser completados com NaN até o mesmo número de Ref.
+def buscar_salarios_lote(pacotes, letras, cargas_horarias, referencias):
+    codigo_letra, codigo_ch = _codigos_tabela(letras, cargas_horarias)
+    refs = np.asarray(referencias, dtype=float)
+    cenarios = np.arange(refs.shape[0])[:, None]
+    codigo_letra = np.broadcast_to(codigo_letra, refs.shape)
+    codigo_ch = np.broadcast_to(codigo_ch, refs.shape)
+
+    validos = (codigo_letra >= 0) & (codigo_ch >= 0) & (refs >= 0) & (refs < pacotes.shape[-1])
+    novo_salario = np.full(refs.shape, np.nan)
+    novo_salario[validos] = pacotes[np.broadcast_to(cenarios, refs.shape)[validos], codigo_letra[validos],
+                                    codigo_ch[validos], refs[validos].astype(np.int64)]
+    return novo_salario
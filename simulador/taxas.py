@@ -0,0 +1,35 @@
+import pandas as pd
+
+# Cargo dos agentes de trânsito, único cargo que recebe as taxas editáveis de GAT, GE AMC e GR.R.VIDA
+CARGO_AMC = "AGENTE MUNIC FISCALIZ DE TRANS"
+
+
+# Monta as sobrescritas de uma rubrica a partir de um dicionário {valor da chave: taxa (%)}.
+# Taxas vazias ou zeradas são ignoradas e a linha mantém a taxa atual da planilha.
+def sobrescritas_por_chave(rubrica, coluna_chave, taxas):
+    return [(rubrica, coluna_chave, valor, taxa) for valor, taxa in taxas.items() if taxa]
+
+
+# Calcula a nova coluna de taxas de uma rubrica a partir das entradas da tabela de sobrescritas
+# que se referem a ela, com um map por coluna chave e um único where; se duas entradas atingem a
+# mesma linha, vale a última. Não altera o DataFrame.
+def taxas_sobrescritas(df, rubrica, sobrescritas):
+    por_coluna = {}
+    for rubrica_entrada, coluna_chave, valor, taxa in sobrescritas:
+        if rubrica_entrada == rubrica:
+            por_coluna.setdefault(coluna_chave, {})[valor] = taxa / 100
+
+    novas_taxas = pd.Series(float('nan'), index=df.index)
+    for coluna_chave, mapa in por_coluna.items():
+        novas_taxas = df[coluna_chave].map(mapa).astype(float).combine_first(novas_taxas)
+    return novas_taxas.fillna(df[rubrica])
+
+
+# Aplica uma tabela declarativa de sobrescritas de taxa. Cada entrada é uma tupla
+# (rubrica, coluna chave, valor da chave, taxa em %): as linhas em que a coluna chave tem aquele
+# valor passam a usar a taxa na coluna da rubrica (por exemplo 'REF-ITA'). Cada rubrica é
+# atualizada de uma vez (ver taxas_sobrescritas). Altera o DataFrame e o devolve.
+def aplicar_sobrescritas(df, sobrescritas):
+    for rubrica in dict.fromkeys(entrada[0] for entrada in sobrescritas):
+        df[rubrica] = taxas_sobrescritas(df, rubrica, sobrescritas)
+    return df
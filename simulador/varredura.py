@@ -0,0 +1,134 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from simulador.encargos import calcular_encargos
+from simulador.irpf import ANO_IRPF_PADRAO, calcular_irpf
+from simulador.rubricas import _Fontes, compilar_regime, precalcular_fixos
+from simulador.simulacao import CONFIGURACOES_REGIME, PARAMETROS_PADRAO, SALARIOS_BASE, TAXAS_CARGO_AMC
+from simulador.tabelas import buscar_salarios_lote, empacotar_tabelas, gerar_grade_salarios
+from simulador.taxas import CARGO_AMC
+
+# Memória máxima (aproximada) do bloco de rubricas de um lote de cenários
+LIMITE_MEMORIA_LOTE = 256 * 2**20
+
+
+# Produto cartesiano dos valores informados, um cenário por linha. Ex.:
+# grade_cenarios(TC=[1, 2, 3], TR=[1, 2], enquadramento=[0, 1]) gera 12 cenários.
+def grade_cenarios(**valores):
+    nomes = list(valores)
+    return pd.DataFrame(list(itertools.product(*(valores[nome] for nome in nomes))), columns=nomes)
+
+
+# Rubricas de um lote de cenários calculadas de uma vez: o eixo dos cenários fica na frente do eixo
+# dos servidores, então cada operação do grafo cobre o lote inteiro. 'taxas' ({coluna REF-*: array
+# (cenários, servidores)}) substitui colunas de taxas em cada cenário e 'deslocamentos' (array
+# (cenários, servidores)) soma Refs a cada servidor, além do enquadramento. Devolve as rubricas
+# (junto com o novo salário e as taxas do lote) e o formato (cenários, servidores).
+def _rubricas_lote(df, regime, lote, taxas=None, deslocamentos=None):
+    pacotes = [empacotar_tabelas(gerar_grade_salarios(cenario['TC'], cenario['TR'], int(cenario['num_classes']),
+                                                      int(cenario['num_referencias']),
+                                                      [cenario[campo] for campo in SALARIOS_BASE]))
+               for cenario in lote.to_dict('records')]
+    pacote_lote = np.full((len(pacotes),) + pacotes[0].shape[:-1] + (max(p.shape[-1] for p in pacotes),), np.nan)
+    for i, pacote in enumerate(pacotes):
+        pacote_lote[i, ..., :pacote.shape[-1]] = pacote
+
+    referencias = df['Ref'].to_numpy(dtype=float) + lote['enquadramento'].to_numpy(dtype=float)[:, None]
+    if deslocamentos is not None:
+        referencias = referencias + deslocamentos
+    fontes = {'Novo Salário': buscar_salarios_lote(pacote_lote, df['Niv'].str.slice(0, 1), df['CH'], referencias)}
+    if CONFIGURACOES_REGIME[regime]['taxas_cargo_amc']:
+        cargo_amc = (df['Cargo'] == CARGO_AMC).to_numpy()
+        for campo, coluna in TAXAS_CARGO_AMC.items():
+            fontes[coluna] = np.where(cargo_amc, lote[campo].to_numpy(dtype=float)[:, None] / 100, df[coluna].to_numpy(dtype=float))
+    fontes.update(taxas or {})
+
+    _, grafo_cenario = compilar_regime(regime)
+    rubricas = grafo_cenario.avaliar(_Fontes(fontes, df), {'taxa_he_noturna': lote['taxa_he_noturna'].to_numpy(dtype=float)[:, None]})
+    return _Fontes(rubricas, fontes), referencias.shape
+
+
+# Totais de cada cenário do lote a partir das rubricas de _rubricas_lote: remuneração e encargos
+# antes e depois, impacto mensal e anual, IRPF e o impacto líquido das suavizações (IRPF e
+# IPM-PREVIFOR patronal e do servidor), como nos totais líquidos dos dashboards
+def _totais_lote(df, regime, ano_irpf, rubricas, formato):
+    coluna_anterior, coluna_nova = CONFIGURACOES_REGIME[regime]['remuneracao']
+
+    def total(nome):
+        return np.nansum(np.broadcast_to(rubricas[nome], formato), axis=-1)
+
+    remuneracao_anterior = df[coluna_anterior].sum()
+    remuneracao_nova = total(coluna_nova)
+    encargos_anteriores = calcular_encargos(remuneracao_anterior, df['IPM PREVFOR-PATRONAL'].sum())
+    encargos_novos = calcular_encargos(remuneracao_nova, total('nova_IPM PREVFOR-PATRONAL'))
+    irpf_anterior = calcular_irpf(df['BASE IRPF'], ano_irpf).sum()
+    irpf_novo = calcular_irpf(rubricas['nova_base_IRPF'], ano_irpf).sum(axis=-1)
+    impacto_mensal = encargos_novos['impacto_mensal'] - encargos_anteriores['impacto_mensal']
+    impacto_suavizacoes = (irpf_novo + total('nova_IPM PREVFOR-PATRONAL') + total('nova_IPM PREVFOR-SERVIDOR')
+                           - irpf_anterior - df['IPM PREVFOR-PATRONAL'].sum() - df['IPM PREVFOR-SERVIDOR'].sum())
+
+    return pd.DataFrame({
+        'remuneracao_anterior': remuneracao_anterior,
+        'remuneracao_nova': remuneracao_nova,
+        'encargos_anteriores': encargos_anteriores['encargos'],
+        'encargos_novos': encargos_novos['encargos'],
+        'impacto_mensal': impacto_mensal,
+        'impacto_anual': impacto_mensal * 12,
+        'irpf_anterior': irpf_anterior,
+        'irpf_novo': irpf_novo,
+        'impacto_irpf': irpf_novo - irpf_anterior,
+        'impacto_liquido_mensal': impacto_mensal - impacto_suavizacoes,
+        'impacto_liquido_anual': (impacto_mensal - impacto_suavizacoes) * 12,
+    })
+
+
+def _avaliar_lote(df, regime, ano_irpf, lote):
+    rubricas, formato = _rubricas_lote(df, regime, lote)
+    return _totais_lote(df, regime, ano_irpf, rubricas, formato)
+
+
+_folha_processo = None
+
+
+def _iniciar_processo(df, regime, ano_irpf):
+    global _folha_processo
+    _folha_processo = (df, regime, ano_irpf)
+
+
+def _avaliar_lote_processo(lote):
+    return _avaliar_lote(*_folha_processo, lote)
+
+
+# Avalia uma grade de cenários (DataFrame ou lista de dicionários com parâmetros de
+# PARAMETROS_PADRAO; os que faltam usam o valor padrão) sobre a folha inteira e devolve uma tabela
+# com uma linha por cenário: parâmetros, remuneração e encargos antes e depois, impacto mensal e
+# anual, IRPF e impacto líquido. Os cenários são avaliados em lotes vetorizados (tamanho_lote, por
+# padrão o que cabe em LIMITE_MEMORIA_LOTE); com processos > 1 os lotes são divididos entre processos.
+def varrer_cenarios(df, cenarios, regime='amc', ano_irpf=ANO_IRPF_PADRAO, processos=None, tamanho_lote=None):
+    cenarios = pd.DataFrame(cenarios).reset_index(drop=True)
+    desconhecidos = set(cenarios.columns) - set(PARAMETROS_PADRAO)
+    if desconhecidos:
+        raise ValueError(f'Parâmetros desconhecidos: {sorted(desconhecidos)}')
+    for nome, valor in PARAMETROS_PADRAO.items():
+        if nome not in cenarios:
+            cenarios[nome] = valor
+
+    grafo_carga, grafo_cenario = compilar_regime(regime)
+    if any(nome not in df for nome in grafo_carga.posicao):
+        df = precalcular_fixos(df.copy(), regime)
+
+    if tamanho_lote is None:
+        tamanho_lote = max(1, LIMITE_MEMORIA_LOTE // (8 * len(grafo_cenario.ordem) * max(len(df), 1)))
+    lotes = [cenarios.iloc[inicio:inicio + tamanho_lote] for inicio in range(0, len(cenarios), tamanho_lote)]
+    if not lotes:
+        return cenarios
+
+    if processos and processos > 1 and len(lotes) > 1:
+        with ProcessPoolExecutor(processos, initializer=_iniciar_processo, initargs=(df, regime, ano_irpf)) as executor:
+            resultados = list(executor.map(_avaliar_lote_processo, lotes))
+    else:
+        resultados = [_avaliar_lote(df, regime, ano_irpf, lote) for lote in lotes]
+    return pd.concat([cenarios, pd.concat(resultados, ignore_index=True)], axis=1)
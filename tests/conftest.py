@@ -0,0 +1,20 @@
+import os
+
+import pytest
+
+from simulador.carga import DECIMAL_PLANILHAS, carregar_planilha
+from simulador.rubricas import precalcular_fixos
+
+PLANILHA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'planilha_impacto_salarial.xlsx')
+
+
+# Aba 'amc' da planilha de exemplo, lida como nos dashboards, com as partes fixas das rubricas
+@pytest.fixture(scope='session')
+def folha():
+    return precalcular_fixos(carregar_planilha(PLANILHA, 'amc', decimal=DECIMAL_PLANILHAS), 'amc')
+
+
+# Caminho da planilha de exemplo
+@pytest.fixture(scope='session')
+def planilha():
+    return PLANILHA
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+
+from simulador.cache_cenarios import CacheCenarios, chave_cenario
+from simulador.execucao import Cancelado
+
+
+def test_descarta_o_usado_ha_mais_tempo():
+    cache = CacheCenarios(capacidade=2)
+    cache.obter('a', lambda: 1)
+    cache.obter('b', lambda: 2)
+    assert cache.obter('a', lambda: pytest.fail('a deveria estar no cache')) == 1
+    cache.obter('c', lambda: 3)
+    assert 'a' in cache and 'c' in cache and 'b' not in cache
+    assert len(cache) == 2
+    assert (cache.acertos, cache.faltas) == (1, 3)
+
+
+# Dispara 'quantidade' pedidos simultâneos da mesma chave; o primeiro cálculo espera 'liberar'
+def pedidos_simultaneos(cache, quantidade, funcao):
+    resultados, erros = [], []
+
+    def pedir():
+        try:
+            resultados.append(cache.obter('chave', funcao))
+        except BaseException as erro:
+            erros.append(erro)
+
+    threads = [threading.Thread(target=pedir) for _ in range(quantidade)]
+    for thread in threads:
+        thread.start()
+    return threads, resultados, erros
+
+
+def test_pedidos_simultaneos_calculam_uma_vez():
+    cache = CacheCenarios()
+    liberar, chamadas = threading.Event(), []
+
+    def calcular():
+        chamadas.append(1)
+        liberar.wait(5)
+        return object()
+
+    threads, resultados, erros = pedidos_simultaneos(cache, 8, calcular)
+    time.sleep(0.1)
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+    assert not erros and len(chamadas) == 1
+    assert len(resultados) == 8 and all(resultado is resultados[0] for resultado in resultados)
+
+
+def test_erro_chega_a_todos_e_nao_fica_no_cache():
+    cache = CacheCenarios()
+    liberar = threading.Event()
+
+    def falhar():
+        liberar.wait(5)
+        raise ValueError('falhou')
+
+    threads, resultados, erros = pedidos_simultaneos(cache, 4, falhar)
+    time.sleep(0.1)
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+    assert not resultados and len(erros) == 4 and all(isinstance(erro, ValueError) for erro in erros)
+    assert 'chave' not in cache
+    assert cache.obter('chave', lambda: 1) == 1
+
+
+def test_cancelado_passa_o_calculo_para_quem_espera():
+    cache = CacheCenarios()
+    comecou, liberar = threading.Event(), threading.Event()
+
+    def cancelar():
+        comecou.set()
+        liberar.wait(5)
+        raise Cancelado('chave')
+
+    primeiro = threading.Thread(target=lambda: pytest.raises(Cancelado, cache.obter, 'chave', cancelar))
+    primeiro.start()
+    comecou.wait(5)
+    resultado = []
+    segundo = threading.Thread(target=lambda: resultado.append(cache.obter('chave', lambda: 42)))
+    segundo.start()
+    time.sleep(0.1)
+    liberar.set()
+    primeiro.join(5)
+    segundo.join(5)
+    assert resultado == [42] and cache.obter('chave', lambda: 0) == 42
+
+
+def test_chave_cenario_canonica():
+    assert chave_cenario({'TC': 2}) == chave_cenario({'TC': 2.0})
+    assert chave_cenario({'TC': 2}, selecoes={'Niv': ['C1', 'B1'], 'CH': []}) == chave_cenario({'TC': 2}, selecoes={'Niv': ['B1', 'C1']})
+    assert chave_cenario({'TC': 2}) != chave_cenario({'TC': 3})
+    assert chave_cenario({'TC': 2}, 'amc', 'folha1') != chave_cenario({'TC': 2}, 'amc', 'folha2')
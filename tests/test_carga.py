@@ -0,0 +1,23 @@
+import os
+import shutil
+
+import pytest
+
+from simulador import carga
+from simulador.carga import DECIMAL_PLANILHAS, carregar_planilha
+
+
+# A cópia feita pela linha de comando, com as opções padrão, é a mesma que os dashboards leem
+def test_linha_de_comando_converte_a_copia_dos_dashboards(planilha, tmp_path, monkeypatch):
+    copia = str(tmp_path / os.path.basename(planilha))
+    shutil.copy(planilha, copia)
+    esperado = carregar_planilha(planilha, 'amc', decimal=DECIMAL_PLANILHAS)
+    carga.main([copia, 'amc', '--bloco', '100'])
+
+    def converter(*args, **kwargs):
+        raise AssertionError('a cópia da linha de comando não foi reaproveitada')
+
+    monkeypatch.setattr(carga, 'converter_em_blocos', converter)
+    monkeypatch.setattr(carga, 'converter_planilha', converter)
+    df = carregar_planilha(copia, 'amc', em_blocos=True, decimal=DECIMAL_PLANILHAS)
+    assert df['REF-ITA'].to_numpy() == pytest.approx(esperado['REF-ITA'].to_numpy())
@@ -0,0 +1,46 @@
+import pytest
+
+from simulador.cubo import CuboFolha
+from simulador.simulacao import PARAMETROS_PADRAO, simular
+
+CENARIOS = [
+    {'TC': 5, 'enquadramento': 1},
+    {'TC': 3, 'TR': 1.5, 'taxa_gat': 60, 'taxa_he_noturna': 0},
+]
+
+TOTAIS = ('remuneracao_nova', 'encargos_novos', 'impacto_mensal', 'impacto_suavizacoes_mensal')
+
+
+@pytest.fixture(scope='module')
+def cubo(folha):
+    return CuboFolha(folha, 'amc')
+
+
+# Cargos da folha pelo nome sem os espaços de preenchimento da planilha
+def cargos(folha, *nomes):
+    return [cargo for cargo in folha['Cargo'].cat.categories if cargo.strip() in nomes]
+
+
+def test_cubo_reproduz_a_folha_no_cenario_padrao(cubo):
+    assert abs(cubo.simular(PARAMETROS_PADRAO)['totais']['impacto_mensal']) < 0.05
+
+
+@pytest.mark.parametrize('parametros', CENARIOS)
+def test_cubo_igual_a_simular(folha, cubo, parametros):
+    esperado = simular(parametros, folha)['totais']
+    obtido = cubo.simular(parametros)['totais']
+    for chave in TOTAIS:
+        assert obtido[chave] == pytest.approx(esperado[chave], rel=1e-9), chave
+
+
+@pytest.mark.parametrize('parametros', CENARIOS)
+def test_cubo_com_selecao_igual_a_simular_na_folha_filtrada(folha, cubo, parametros):
+    selecoes = {'Cargo': cargos(folha, 'AGENTE MUNIC FISCALIZ DE TRANS', 'AGENTE COMUNITARIO DE SAUDE'), 'CH': [240]}
+    filtrada = folha[folha['Cargo'].isin(selecoes['Cargo']) & folha['CH'].isin(selecoes['CH'])]
+    assert len(selecoes['Cargo']) == 2
+    assert filtrada['Cargo'].nunique() == 2 and len(filtrada) < len(folha)
+
+    esperado = simular(parametros, filtrada)['totais']
+    obtido = cubo.simular(parametros, selecoes)['totais']
+    for chave in TOTAIS:
+        assert obtido[chave] == pytest.approx(esperado[chave], rel=1e-9), chave
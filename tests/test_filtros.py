@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulador.filtros import COLUNAS_FILTRO, IndiceFiltros
+
+
+# Seleção feita direto no pandas, como o dashboard fazia antes do índice
+def mascara_pandas(df, selecoes):
+    mascara = pd.Series(True, index=df.index)
+    for coluna, valores in selecoes.items():
+        if valores:
+            mascara &= df[coluna].isin(valores)
+    return mascara.to_numpy()
+
+
+@pytest.fixture(scope='module')
+def indice(folha):
+    return IndiceFiltros(folha)
+
+
+def test_opcoes_na_ordem_da_folha(folha, indice):
+    for coluna in COLUNAS_FILTRO:
+        assert indice.opcoes(coluna) == list(pd.unique(folha[coluna].dropna()))
+
+
+def test_linhas_iguais_a_mascara_do_pandas(folha, indice):
+    gerador = np.random.default_rng(0)
+    for _ in range(100):
+        selecoes = {}
+        for coluna in COLUNAS_FILTRO:
+            opcoes = indice.opcoes(coluna)
+            quantidade = int(gerador.integers(0, min(len(opcoes), 3) + 1))
+            selecoes[coluna] = [opcoes[i] for i in gerador.choice(len(opcoes), quantidade, replace=False)]
+        np.testing.assert_array_equal(indice.linhas(selecoes), np.flatnonzero(mascara_pandas(folha, selecoes)))
+
+
+def test_selecoes_vazias_e_valores_desconhecidos(folha, indice):
+    np.testing.assert_array_equal(indice.linhas(), np.arange(len(folha)))
+    np.testing.assert_array_equal(indice.linhas({'Niv': [], 'CH': None}), np.arange(len(folha)))
+    assert len(indice.linhas({'Niv': ['não existe']})) == 0
+    np.testing.assert_array_equal(indice.linhas({'Niv': ['não existe', indice.opcoes('Niv')[0]]}),
+                                  np.flatnonzero(mascara_pandas(folha, {'Niv': [indice.opcoes('Niv')[0]]})))
+
+
+def test_coluna_categorica_mantem_a_ordem_da_folha():
+    df = pd.DataFrame({coluna: pd.Categorical(['z', 'a', 'm', 'a']) for coluna in COLUNAS_FILTRO})
+    assert IndiceFiltros(df).opcoes('Ambiente') == ['z', 'a', 'm']
+
+
+def test_tamanho_fora_do_multiplo_de_oito():
+    df = pd.DataFrame({'Ambiente': list('abcabcabcab'), 'Cat': list('xxyyxxyyxxy'), 'Niv': ['C1'] * 11, 'CH': [240] * 11})
+    indice = IndiceFiltros(df)
+    np.testing.assert_array_equal(indice.linhas({'Ambiente': ['b'], 'Cat': ['y']}), [7, 10])
+    assert indice.selecionar().shape == (11,)
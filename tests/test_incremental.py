@@ -0,0 +1,48 @@
+import pytest
+
+from simulador.incremental import AvaliadorIncremental
+from simulador.simulacao import simular
+
+
+def test_so_recalcula_os_nos_abaixo_da_entrada_alterada():
+    avaliador = AvaliadorIncremental()
+    chamadas = []
+
+    def executar(a, b):
+        avaliador.iniciar()
+        avaliador.entrada('a', a)
+        avaliador.entrada('b', b)
+        x = avaliador.calcular('x', ['a'], lambda: chamadas.append('x') or a * 2)
+        y = avaliador.calcular('y', ['b'], lambda: chamadas.append('y') or b * 3)
+        return avaliador.calcular('z', ['x', 'y'], lambda: chamadas.append('z') or x + y)
+
+    assert executar(1, 1) == 5
+    assert executar(1, 1) == 5
+    assert avaliador.recalculados == set()
+    assert executar(2, 1) == 7
+    assert avaliador.recalculados == {'x', 'z'}
+    assert chamadas == ['x', 'y', 'z', 'x', 'z']
+    assert avaliador.dependentes('a') == {'x', 'z'}
+
+
+def test_parametros_do_no_tambem_invalidam():
+    avaliador = AvaliadorIncremental()
+    avaliador.iniciar()
+    avaliador.entrada('a', 1)
+    assert avaliador.calcular('x', ['a'], lambda: 1, parametros=(1,)) == 1
+    assert avaliador.calcular('x', ['a'], lambda: 2, parametros=(1,)) == 1
+    assert avaliador.calcular('x', ['a'], lambda: 3, parametros=(2,)) == 3
+
+
+def test_simular_incremental_igual_ao_completo(folha):
+    avaliador = AvaliadorIncremental()
+    cenarios = [{'TC': 5}, {'TC': 5, 'enquadramento': 1}, {'TC': 3, 'enquadramento': 1}]
+    for parametros in cenarios:
+        incremental = simular(parametros, folha, 'amc', avaliador, 'amostra')['totais']
+        completo = simular(parametros, folha)['totais']
+        for chave, valor in completo.items():
+            assert incremental[chave] == pytest.approx(valor, rel=1e-12), chave
+    # Mudar só o enquadramento refaz a busca dos salários, mas não a tabela nem as taxas
+    simular({'TC': 3}, folha, 'amc', avaliador, 'amostra')
+    assert 'Novo Salário' in avaliador.recalculados
+    assert 'grades' not in avaliador.recalculados and 'REF-GE AMC' not in avaliador.recalculados
@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from simulador.irpf import TABELAS_IRPF, calcular_irpf
+
+# Tabelas publicadas, na forma do cálculo original linha a linha: (limite, alíquota, parcela a
+# deduzir) da faixa mais alta para a mais baixa; quem não passa do último limite é isento
+FAIXAS_PUBLICADAS = {
+    2015: [(4664.68, 0.275, 869.36), (3751.05, 0.225, 636.13), (2826.65, 0.15, 354.80), (1903.98, 0.075, 142.80)],
+    2023: [(4664.68, 0.275, 884.96), (3751.05, 0.225, 651.73), (2826.65, 0.15, 370.40), (2112.00, 0.075, 158.40)],
+    2024: [(4664.68, 0.275, 896.00), (3751.05, 0.225, 662.77), (2826.65, 0.15, 381.44), (2259.20, 0.075, 169.44)],
+}
+
+
+def irpf_original(base_irpf, ano):
+    for limite, aliquota, deducao in FAIXAS_PUBLICADAS[ano]:
+        if base_irpf > limite:
+            return base_irpf * aliquota - deducao
+    return 0
+
+
+@pytest.mark.parametrize('ano', sorted(FAIXAS_PUBLICADAS))
+def test_irpf_igual_ao_calculo_original(ano):
+    limites, _, _ = TABELAS_IRPF[ano]
+    bases = np.concatenate([[0.0], limites, limites - 0.01, limites + 0.01, np.linspace(0, 10_000, 1001)])
+    esperado = [irpf_original(base, ano) for base in bases]
+    assert calcular_irpf(bases, ano) == pytest.approx(esperado, abs=1e-9)
+
+
+@pytest.mark.parametrize('ano', sorted(FAIXAS_PUBLICADAS))
+def test_base_no_limite_fica_na_faixa_de_baixo(ano):
+    # O cálculo original usa '>': a base igual ao limite ainda não entra na faixa seguinte
+    for (limite, aliquota, deducao), abaixo in zip(FAIXAS_PUBLICADAS[ano], FAIXAS_PUBLICADAS[ano][1:] + [(0, 0, 0)]):
+        assert calcular_irpf(limite, ano) == pytest.approx(limite * abaixo[1] - abaixo[2], abs=1e-9)
+        assert calcular_irpf(limite + 0.01, ano) == pytest.approx((limite + 0.01) * aliquota - deducao, abs=1e-9)
+
+
+def test_bases_vazias_nao_pagam_e_a_forma_e_mantida():
+    bases = np.array([[np.nan, 5000.0], [1000.0, np.nan]])
+    resultado = calcular_irpf(bases, 2015)
+    assert resultado.shape == bases.shape
+    assert resultado[0, 0] == 0 and resultado[1, 1] == 0 and resultado[1, 0] == 0
+    assert resultado[0, 1] == pytest.approx(5000 * 0.275 - 869.36)
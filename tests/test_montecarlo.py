@@ -0,0 +1,39 @@
+import pytest
+
+from simulador.montecarlo import simular_monte_carlo
+from simulador.rubricas import precalcular_fixos
+from simulador.simulacao import simular
+
+CENARIOS = [
+    {'TC': 5, 'enquadramento': 1},
+    {'TC': 3, 'TR': 1.5, 'taxa_gat': 60, 'taxa_he_noturna': 0},
+]
+
+# Incertezas sem sorteio de fato: a simulação de Monte Carlo vira o próprio cenário
+SEM_INCERTEZA = {'enquadramento': {0: 1}, 'deslocamentos_referencia': {0: 1}, 'transicoes_instrucao': {}}
+
+
+@pytest.mark.parametrize('parametros', CENARIOS)
+def test_sem_incerteza_igual_a_simular(folha, parametros):
+    esperado = simular(parametros, folha)['totais']['impacto_mensal']
+    monte_carlo = simular_monte_carlo(folha, parametros, amostras=2, incertezas=SEM_INCERTEZA)
+    assert monte_carlo['amostras']['impacto_mensal'].to_numpy() == pytest.approx([esperado] * 2, rel=1e-9)
+
+
+def test_resultado_nao_depende_do_tamanho_do_lote(folha):
+    inteiro = simular_monte_carlo(folha, CENARIOS[0], amostras=7, semente=3)['amostras']
+    em_lotes = simular_monte_carlo(folha, CENARIOS[0], amostras=7, semente=3, tamanho_lote=2)['amostras']
+    assert em_lotes.to_numpy() == pytest.approx(inteiro.to_numpy(), rel=1e-12)
+    assert inteiro['enquadramento'].nunique() > 1
+
+
+# Transição certa: todos os graduados viram especialistas, como na folha com a taxa trocada
+def test_transicao_certa_igual_a_folha_alterada(folha):
+    incertezas = {**SEM_INCERTEZA, 'transicoes_instrucao': {'Graduação': {'Especialização': 1}}, 'taxas_instrucao': {'Especialização': 20}}
+    monte_carlo = simular_monte_carlo(folha, CENARIOS[0], amostras=1, incertezas=incertezas)['amostras']
+
+    alterada = folha.copy()
+    alterada.loc[(alterada['Grau de instrução'] == 'Graduação').to_numpy(), 'REF-ITA'] = 0.2
+    esperado = simular(CENARIOS[0], precalcular_fixos(alterada, 'amc'))['totais']['impacto_mensal']
+    assert monte_carlo['impacto_mensal'].iloc[0] == pytest.approx(esperado, rel=1e-9)
+    assert monte_carlo['servidores_titulados'].iloc[0] == (folha['Grau de instrução'] == 'Graduação').sum()
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from simulador.orcamento import resolver_orcamento
+from simulador.simulacao import simular
+
+
+def test_respeita_o_limite_e_chega_perto_dele(folha):
+    padrao = simular({}, folha)['totais']['impacto_anual']
+    limite = padrao + 1_000_000
+    resultado = resolver_orcamento(folha, limite, {'TC': (0, 10)})
+    assert resultado['viavel']
+    assert resultado['valor'] <= limite
+    assert resultado['valor'] > limite - 0.01 * abs(limite)
+    assert simular(resultado['parametros'], folha)['totais']['impacto_anual'] == pytest.approx(resultado['valor'], rel=1e-9)
+
+
+def test_minimo_impossivel_nao_e_viavel(folha):
+    resultado = resolver_orcamento(folha, np.inf, {'TC': (0, 1)}, aumento_minimo=1000)
+    assert not resultado['viavel']
+
+
+# Servidores sem cargo não entram na remuneração de nenhum cargo
+def test_servidores_sem_cargo_ficam_fora_dos_aumentos(folha):
+    sem_cargo = folha.copy()
+    linhas = sem_cargo.index[:5]
+    sem_cargo.loc[linhas, 'Cargo'] = np.nan
+    aumentos = resolver_orcamento(sem_cargo, np.inf, {'TC': (5, 5)})['aumentos']
+    esperado = resolver_orcamento(folha.drop(linhas), np.inf, {'TC': (5, 5)})['aumentos']
+    assert len(aumentos) > 1
+    assert aumentos.to_numpy() == pytest.approx(esperado.reindex(aumentos.index).to_numpy(), rel=1e-9)
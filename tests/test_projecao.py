@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from simulador.projecao import projetar
+from simulador.simulacao import PARAMETROS_PADRAO, simular
+
+CENARIOS = [
+    {'TC': 5, 'enquadramento': 1},
+    {'TC': 3, 'TR': 1.5, 'taxa_gat': 60, 'taxa_he_noturna': 0},
+]
+
+
+@pytest.mark.parametrize('parametros', CENARIOS)
+def test_primeiro_mes_igual_a_simular(folha, parametros):
+    totais = simular(parametros, folha)['totais']
+    projecao = projetar(parametros, folha, meses=1)
+    assert projecao['Impacto'].iloc[0] == pytest.approx(totais['impacto_mensal'], rel=1e-9)
+    assert projecao['Remuneração Nova'].iloc[0] == pytest.approx(totais['remuneracao_nova'], rel=1e-9)
+
+
+def test_com_base_mede_so_a_diferenca_entre_os_cenarios(folha):
+    projecao = projetar(CENARIOS[0], folha, meses=1, base=PARAMETROS_PADRAO)
+    esperado = simular(CENARIOS[0], folha)['totais']['impacto_mensal'] - simular(PARAMETROS_PADRAO, folha)['totais']['impacto_mensal']
+    assert projecao['Impacto'].iloc[0] == pytest.approx(esperado, rel=1e-9)
+
+
+def test_progressao_ao_longo_dos_meses(folha):
+    projecao = projetar(CENARIOS[0], folha, meses=36)
+    assert projecao['Servidores Progredidos'].iloc[0] == 0
+    # Sem coluna de interstício os servidores ficam espalhados pelos 24 meses: alguém progride todo mês
+    assert (projecao['Servidores Progredidos'].iloc[1:] > 0).all()
+    assert (np.diff(projecao['Remuneração Nova']) >= 0).all()
+    assert projecao['Impacto Acumulado'].iloc[-1] == pytest.approx(projecao['Impacto'].sum())
+
+
+def test_lotes_de_meses_nao_mudam_o_resultado(folha):
+    inteiro = projetar(CENARIOS[0], folha, meses=14)
+    em_lotes = projetar(CENARIOS[0], folha, meses=14, tamanho_lote=5)
+    assert em_lotes.to_numpy() == pytest.approx(inteiro.to_numpy(), rel=1e-12)
@@ -0,0 +1,26 @@
+import pytest
+
+from simulador.sensibilidade import analisar_sensibilidade
+from simulador.simulacao import simular
+
+PARAMETROS = {'TC': 5, 'enquadramento': 1}
+
+
+def test_extremos_iguais_a_simular(folha):
+    tabela = analisar_sensibilidade(folha, PARAMETROS)
+    atual = simular(PARAMETROS, folha)['totais']['impacto_anual']
+    for rotulo, parametro in (('Taxa de Classe', 'TC'), ('Enquadramento', 'enquadramento')):
+        linha = tabela.loc[rotulo]
+        for extremo in ('Baixo', 'Alto'):
+            esperado = simular({**PARAMETROS, parametro: linha[extremo]}, folha)['totais']['impacto_anual'] - atual
+            assert linha[f'impacto_anual_{extremo.lower()}'] == pytest.approx(esperado, rel=1e-9, abs=1e-6)
+
+
+def test_resultado_nao_depende_do_tamanho_do_lote(folha):
+    inteiro = analisar_sensibilidade(folha, PARAMETROS)
+    em_lotes = analisar_sensibilidade(folha, PARAMETROS, tamanho_lote=3)
+    assert em_lotes.index.tolist() == inteiro.index.tolist()
+    assert em_lotes.to_numpy() == pytest.approx(inteiro.to_numpy(), rel=1e-12, nan_ok=True)
+    # Ordenada pela amplitude do impacto anual
+    amplitude = (inteiro['impacto_anual_alto'] - inteiro['impacto_anual_baixo']).abs()
+    assert amplitude.is_monotonic_decreasing
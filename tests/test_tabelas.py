@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from simulador.simulacao import PARAMETROS_PADRAO, simular
+from simulador.tabelas import gerar_grade_salarios
+
+
+# Laço original: cada célula parte do valor anterior já arredondado em centavos
+def grade_original(TC, TR, num_classes, num_referencias, salario_base):
+    tabela = pd.DataFrame(index=range(1, num_referencias + 1), columns=range(1, num_classes + 1))
+    valores = {}
+    for j in range(1, num_classes + 1):
+        for i in range(1, num_referencias + 1):
+            if i == 1 and j == 1:
+                valor = salario_base
+            elif i == 1:
+                valor = float(tabela.loc[num_referencias, j - 1]) * (1 + (TC / 100))
+            else:
+                valor = float(tabela.loc[i - 1, j]) * (1 + (TR / 100))
+            valores[(i, j)] = valor
+            tabela.loc[i, j] = f"{valor:.2f}"
+    return np.array([[valores[(i, j)] for j in range(1, num_classes + 1)] for i in range(1, num_referencias + 1)])
+
+
+def test_grade_arredonda_em_centavos_como_o_laco_original():
+    gerador = np.random.default_rng(0)
+    for _ in range(50):
+        TC, TR = gerador.uniform(0, 10, 2)
+        num_classes, num_referencias = (int(valor) for valor in gerador.integers(1, 8, 2))
+        salarios_base = gerador.uniform(1000, 5000, 6).round(2)
+        grades = gerar_grade_salarios(TC, TR, num_classes, num_referencias, salarios_base)
+        assert grades.shape == (6, num_referencias, num_classes)
+        for grade, salario_base in zip(grades, salarios_base):
+            np.testing.assert_array_equal(grade, grade_original(TC, TR, num_classes, num_referencias, salario_base))
+
+
+def test_cenario_padrao_reproduz_a_folha(folha):
+    assert abs(simular(PARAMETROS_PADRAO, folha)['totais']['impacto_mensal']) < 0.05
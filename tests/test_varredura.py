@@ -0,0 +1,26 @@
+import pytest
+
+from simulador.simulacao import simular
+from simulador.varredura import grade_cenarios, varrer_cenarios
+
+
+def test_varredura_igual_a_simular_em_cada_cenario(folha):
+    cenarios = grade_cenarios(TC=[2, 5], TR=[1.5, 2], enquadramento=[0, 1], taxa_gat=[40, 60])
+    varredura = varrer_cenarios(folha, cenarios)
+    assert len(varredura) == 16
+    for parametros, linha in zip(cenarios.to_dict('records'), varredura.to_dict('records')):
+        totais = simular(parametros, folha)['totais']
+        for chave in ('remuneracao_nova', 'encargos_novos', 'impacto_mensal', 'impacto_anual'):
+            assert linha[chave] == pytest.approx(totais[chave], rel=1e-9), (parametros, chave)
+
+
+def test_resultado_nao_depende_do_tamanho_do_lote(folha):
+    cenarios = grade_cenarios(TC=[1, 2, 3, 4, 5], enquadramento=[0, 2])
+    inteiro = varrer_cenarios(folha, cenarios)
+    em_lotes = varrer_cenarios(folha, cenarios, tamanho_lote=3)
+    assert em_lotes['impacto_liquido_anual'].to_numpy() == pytest.approx(inteiro['impacto_liquido_anual'].to_numpy(), rel=1e-12)
+
+
+def test_parametro_desconhecido(folha):
+    with pytest.raises(ValueError):
+        varrer_cenarios(folha, [{'TX': 1}])